@@ -1,29 +1,166 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Blueprint, render_template, request, jsonify, session, g, Response, stream_with_context
 from itertools import islice
-from components.topics.processor import process_new_reviews
+from components.topics.processor import refresh_top_topics
 from components.database import topic_store
-from components.retriever import create_qa_chain
-from common.logger import get_logger
+from components.retriever import generate_summary
+from components.singleflight import single_flight, normalize_key
+from config.config import TOPICS_LEASE_SECONDS, DEFAULT_SUMMARY_QUESTIONS, WEB_HOST, WEB_PORT, FLASK_SECRET_KEY, FLASK_DEBUG, ASK_BATCH_MAX_ITEMS, BULK_INGEST_MAX_RECORDS
+from components.summaries.materializer import get_materialized_summary, is_default_question
+from components.summaries.batch import ask_batch, parse_batch_item
+from common.logger import get_logger, set_request_id, reset_request_id
 from common.custom_exception import CustomException
+from common.metrics import span, set_endpoint, reset_endpoint, render_metrics, REQUEST_SECONDS
+from common.profiler import RequestProfiler, profile_trigger, save_profile, load_profile, is_admin
 from collections import Counter
 import re
-from components.vector_store import load_vector_store
+from components.retriever import fetch_reviews
 from components.database import reviews_collection
+from components.review_records import prepare_review, validate_bulk_reviews, iter_ndjson, iter_json_array
+from components.review_ingest import review_write_buffer
 logger = get_logger(__name__)
 from components.chatbot.chain import chat_with_reviews
+from components.chatbot.session_store import session_store
+from components.admission import admission, AdmissionRejected
 from flask import session
+from functools import wraps, partial
 import uuid
+import time
+import json
+import secrets
 
 
-app = Flask(__name__)
-app.secret_key = "dev-secret-key-123"
+# Routes live on a blueprint; create_app() builds the Flask app around it
+bp = Blueprint("api", __name__)
+
+
+def _endpoint_name():
+    return (request.endpoint or "unknown").rsplit(".", 1)[-1]
+
+
+# ===============================
+# Request metrics
+# ===============================
+@bp.before_app_request
+def start_request_metrics():
+    g.metrics_start = time.perf_counter()
+    g.metrics_token = set_endpoint(_endpoint_name())
+
+    # Every log line of this request carries the id; callers may pass their own
+    g.request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    g.request_id_token = set_request_id(g.request_id)
+
+    trigger = profile_trigger(request.headers.get("X-Profile"))
+    if trigger:
+        g.profiler = RequestProfiler(g.request_id, trigger).start()
+
+
+@bp.after_app_request
+def record_request_metrics(response):
+    if "request_id" in g:
+        response.headers["X-Request-ID"] = g.request_id
+
+    profiler = g.pop("profiler", None)
+    if profiler is not None:
+        response.headers["X-Profile-Id"] = profiler.profile_id
+
+    finish = partial(
+        _finish_request, g.pop("metrics_start", None), profiler,
+        _endpoint_name(), request.method, request.path, response.status_code
+    )
+    if response.is_streamed:
+        # Streamed bodies (/ask/batch) are produced after this hook returns
+        response.call_on_close(finish)
+    else:
+        finish()
+    return response
+
+
+def _finish_request(start, profiler, endpoint, method, path, status):
+    if start is not None and endpoint != "metrics":
+        REQUEST_SECONDS.labels(endpoint, method, status).observe(time.perf_counter() - start)
+
+    if profiler is not None:
+        profiler.stop()
+        try:
+            save_profile(profiler, endpoint=endpoint, method=method, path=path, status=status)
+        except OSError:
+            logger.warning("Failed to save request profile", exc_info=True)
+
+
+@bp.teardown_app_request
+def reset_request_metrics(exc):
+    token = g.pop("metrics_token", None)
+    if token is not None:
+        reset_endpoint(token)
+
+    token = g.pop("request_id_token", None)
+    if token is not None:
+        reset_request_id(token)
+
+
+# ===============================
+# Per-WSID admission control
+# ===============================
+def admission_controlled(endpoint_class):
+    """
+    Run the view under the calling WSID's slot for `endpoint_class`.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            data = request.get_json(force=True, silent=True) or {}
+            wsid = str(data.get("wsid") or data.get("WSID") or request.args.get("wsid") or "unknown")
+            return admission.run(endpoint_class, wsid, lambda: view(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+@bp.app_errorhandler(AdmissionRejected)
+def admission_rejected(e):
+    logger.warning(
+        "Admission rejected | class=%s | wsid=%s | reason=%s | retry_after=%ds",
+        e.endpoint_class, e.wsid, e.reason, e.retry_after
+    )
+    response = jsonify({"error": "Too many requests for this store, retry later", "reason": e.reason})
+    response.status_code = 429
+    response.headers["Retry-After"] = str(e.retry_after)
+    return response
+
+
+@bp.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Prometheus scrape endpoint
+    """
+    body, content_type = render_metrics()
+    return Response(body, content_type=content_type)
+
+
+@bp.route("/admin/profiles/<profile_id>", methods=["GET"])
+def get_profile(profile_id):
+    """
+    Stored profile of one request, by its X-Profile-Id: wall/CPU summary
+    as JSON, or ?format=folded for flamegraph input. Profiles live on the
+    worker host that served the request.
+    """
+    if not is_admin(request.headers.get("X-Admin-Token")):
+        return jsonify({"error": "Forbidden"}), 403
+
+    fmt = request.args.get("format", "json")
+    profile = load_profile(profile_id, fmt)
+    if profile is None:
+        return jsonify({"error": "Profile not found"}), 404
+
+    if fmt == "folded":
+        return Response(profile, content_type="text/plain; charset=utf-8")
+    return jsonify(profile)
 
 
 
 # ===============================
 # Home Page
 # ===============================
-@app.route("/", methods=["GET"])
+@bp.route("/", methods=["GET"])
 def index():
     """
     Renders the frontend UI
@@ -31,29 +168,94 @@ def index():
     return render_template("index.html")
 
 # -------------------------------------------------------------------------------
-@app.route("/reviews", methods=["POST"])
+@bp.route("/reviews", methods=["POST"])
+@admission_controlled("ingest")
 def add_review():
     try:
         data = request.get_json(force=True)
 
-        required = ["review_id", "product_id", "product_name", "wsid", "rating", "review_text"]
+        try:
+            prepare_review(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        for field in required:
-            if field not in data:
-                return jsonify({"error": f"{field} is required"}), 400
-            
-        data["rating"] = int(data["rating"])
-        data["embedded"] = False  # so listener embeds it
-        reviews_collection.insert_one(data)
+        # Shares insert_many round trips with concurrent posts; re-posting
+        # the same review is a no-op
+        status = review_write_buffer.write(data)
+        if status == "failed":
+            return jsonify({"error": "Failed to insert review"}), 500
 
-        return jsonify({"status": "ok"}), 200
+        return jsonify({"status": "ok", "created": status == "created", "review_id": data["review_id"]}), 200
 
     except Exception as e:
-        print(e)
+        logger.error("Add review failed", exc_info=True)
         return jsonify({"error": "Failed to insert review"}), 500
+
+
+NDJSON_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+
+@bp.route("/reviews/bulk", methods=["POST"])
+def add_reviews_bulk():
+    """
+    Many reviews per request, as NDJSON (one review per line) or a JSON
+    array. Records are validated as the body streams in and written
+    through the shared insert_many buffer. Returns a status per record:
+    created, duplicate, invalid or failed.
+    """
+    # The body is consumed as a stream, so the store comes from the query string
+    wsid = request.args.get("wsid")
+    if not wsid:
+        return jsonify({"error": "wsid query parameter is required"}), 400
+    return admission.run("ingest", wsid, partial(_ingest_bulk, wsid))
+
+
+def _ingest_bulk(wsid):
+    if request.mimetype in NDJSON_TYPES:
+        records = iter_ndjson(request.stream)
+    else:
+        records = iter_json_array(request.stream)
+
+    results = []
+    pending = []
+    error = None
+
+    try:
+        for index, raw, record_error in validate_bulk_reviews(records, wsid):
+            if index >= BULK_INGEST_MAX_RECORDS:
+                error = f"At most {BULK_INGEST_MAX_RECORDS} records per request; the rest were not read"
+                break
+
+            if record_error is not None:
+                results.append({"index": index, "status": "invalid", "error": record_error})
+                continue
+
+            row = {"index": index, "review_id": raw["review_id"]}
+            results.append(row)
+            pending.append((row, review_write_buffer.add(raw)))
+    except ValueError as e:
+        error = f"Malformed JSON array: {e}"
+
+    for row, future in pending:
+        try:
+            row["status"] = future.result()
+        except Exception:
+            row["status"] = "failed"
+
+    counts = Counter(row["status"] for row in results)
+    logger.info(
+        "Bulk ingest | records=%d | created=%d | duplicate=%d | invalid=%d | failed=%d",
+        len(results), counts["created"], counts["duplicate"], counts["invalid"], counts["failed"]
+    )
+
+    body = {"counts": dict(counts), "results": results}
+    if error is not None:
+        body["error"] = error
+        return jsonify(body), 400
+    return jsonify(body), 200
     
 
-@app.route("/reviews/<product_id>", methods=["GET"])
+@bp.route("/reviews/<product_id>", methods=["GET"])
 def get_reviews(product_id):
     try:
         wsid = request.args.get("wsid")
@@ -61,18 +263,7 @@ def get_reviews(product_id):
         if not wsid:
             return jsonify({"error": "wsid is required"}), 400
 
-        vectorstore = load_vector_store()
-        if not vectorstore:
-            return jsonify({"error": "Vector store not available"}), 500
-
-        docs = vectorstore.similarity_search(
-            query="review",   # neutral query
-            k=50,
-            filter={
-                "WSID": str(wsid),
-                "product_id": str(product_id)
-            }
-        )
+        docs = fetch_reviews("review", wsid, product_id, k=50)   # neutral query
 
         results = []
         for d in docs:
@@ -95,7 +286,8 @@ def get_reviews(product_id):
 # ===============================
 # Ask / Summarize Endpoint
 # ===============================
-@app.route("/ask", methods=["POST"])
+@bp.route("/ask", methods=["POST"])
+@admission_controlled("interactive")
 def ask():
     """
     Accepts a question and returns the product review summary
@@ -112,7 +304,10 @@ def ask():
         if not wsid or not product_id:
             return jsonify({"error": "WSID and product_id required"}), 400
         
-        if not question:
+        if summary_type not in ["neutral", "positive", "negative"]:
+            summary_type = "neutral"
+
+        if not question and summary_type != "neutral":
             return jsonify({"error": "Question is required"}), 400
 
         # if not isinstance(question, str):
@@ -123,59 +318,21 @@ def ask():
                 if not question or not isinstance(question, str):
                     return jsonify({"error": "Question is required for this summary type"}), 400
         
-        if summary_type not in ["neutral", "positive", "negative"]:
-            summary_type = "neutral"
+        # Default page-load summaries come straight from the materialized store
+        if is_default_question(summary_type, question):
+            with span("materialized_lookup"):
+                stored = get_materialized_summary(wsid, product_id, summary_type)
+            if stored is not None:
+                logger.info(f"Serving materialized summary | summary_type={summary_type} | wsid={wsid} | product_id={product_id}")
+                return jsonify(stored)
+            question = DEFAULT_SUMMARY_QUESTIONS[summary_type]
 
         # logger.info(f"Creating QA chain | summary_type={summary_type}")
-        logger.info(
-    f"Invoking chain | summary_type={summary_type} | wsid={wsid} | product_id={product_id}"
-)
-
-
-        qa_chain = create_qa_chain(
-            summary_type=summary_type,
-            wsid=wsid,
-            product_id=product_id
+        response = single_flight.do(
+            normalize_key("ask", wsid, product_id, summary_type, question=question),
+            lambda: generate_summary(summary_type, wsid, product_id, question)
         )
 
-        if qa_chain is None:
-            raise CustomException("QA chain creation failed")
-
-        logger.info("Running QA chain")
-
-
-        result = qa_chain.invoke(question)
-
-        response = {
-            "answer": "",
-            "topics": []
-        }
-        logger.info(f"RAW LLM RESULT: {result}")
-        if summary_type == "neutral":
-
-            # 🔹 If LLM returned STRING (StrOutputParser)
-            if isinstance(result, str):
-                response["answer"] = result.strip()
-
-            # 🔹 If LLM returned DICT (JsonOutputParser)
-            elif isinstance(result, dict) and "summary" in result:
-                response["answer"] = result["summary"].strip()
-
-            else:
-                response["answer"] = ""
-
-        # =========================
-        # POSITIVE / NEGATIVE
-        # =========================
-        else:
-            if isinstance(result, dict) and "topics" in result:
-                response["topics"] = [
-                    t for t in result["topics"]
-                    if t.get("summary") and t["summary"].strip()
-                ]
-
-  
-
         return jsonify(response)
 
     except Exception as e:
@@ -183,44 +340,84 @@ def ask():
         return jsonify({
             "error": "Failed to generate summary"
         }), 500
-    
 
 
-@app.route("/topics/top", methods=["POST"])
+@bp.route("/ask/batch", methods=["POST"])
+def ask_batch_endpoint():
+    """
+    Summaries for many products of one store in one request. Body:
+    {"items": [{"wsid", "product_id", "summary_type", "question"?}, ...]},
+    all with the same wsid. Streams one NDJSON
+    line per item as it completes ({"index", ..., "result"} or
+    {"index", ..., "error"}); materialized summaries come first.
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    raw_items = data.get("items") if isinstance(data, dict) else None
+
+    if not isinstance(raw_items, list) or not raw_items:
+        return jsonify({"error": "items must be a non-empty list"}), 400
+    if len(raw_items) > ASK_BATCH_MAX_ITEMS:
+        return jsonify({"error": f"At most {ASK_BATCH_MAX_ITEMS} items per batch"}), 400
+
+    items = []
+    for index, raw in enumerate(raw_items):
+        try:
+            items.append(parse_batch_item(raw))
+        except ValueError as e:
+            return jsonify({"error": f"items[{index}]: {e}"}), 400
+
+    # Admission is per WSID, so a batch may only ask for one store
+    if len({item[0] for item in items}) > 1:
+        return jsonify({"error": "All items in a batch must share one wsid"}), 400
+
+    def generate():
+        for indexes, source, result, error in ask_batch(items):
+            for index in indexes:
+                wsid, product_id, summary_type, _ = items[index]
+                line = {"index": index, "wsid": wsid, "product_id": product_id, "summary_type": summary_type}
+                if error is None:
+                    line.update(source=source, result=result)
+                else:
+                    line["error"] = "Failed to generate summary"
+                yield json.dumps(line) + "\n"
+
+    response = Response(stream_with_context(generate()), content_type="application/x-ndjson")
+
+    # The slot is held until the stream is closed, not just until the view
+    # returns
+    if admission.enabled:
+        store = items[0][0]
+        admission.acquire("batch", store)
+        start = time.monotonic()
+        response.call_on_close(lambda: admission.release("batch", store, time.monotonic() - start))
+
+    return response
+
+
+
+@bp.route("/topics/top", methods=["POST"])
+@admission_controlled("heavy")
 def get_top_topics():
     try:
         data = request.get_json(force=True)
         WSID = data.get("WSID")
         product_id = data.get("product_id")
 
-        print("DEBUG: WSID =", WSID)
-        print("DEBUG: product_id =", product_id)
-
         if not WSID or not product_id:
             raise ValueError("WSID or product_id missing")
 
-        from components.topics.processor import process_new_reviews
-        process_new_reviews(WSID, product_id)
-
-        from components.database import topic_store
-        topics = list(
-            topic_store.find(
-                {"wsid": WSID, "product_id": product_id},
-                {"_id": 0, "topic": 1, "count": 1}
-            )
-            .sort("count", -1)
-            .limit(10)
+        topics = single_flight.do(
+            normalize_key("topics", WSID, product_id),
+            lambda: refresh_top_topics(WSID, product_id),
+            lease_seconds=TOPICS_LEASE_SECONDS
         )
 
-        print("DEBUG: topics found =", topics)
+        logger.debug("Top topics | wsid=%s | product_id=%s | topics=%d", WSID, product_id, len(topics))
 
         return jsonify({"topics": topics})
 
     except Exception as e:
-        import traceback
-        print("\n🔥🔥🔥 ERROR IN /topics/top 🔥🔥🔥")
-        traceback.print_exc()
-        print("🔥🔥🔥 END ERROR 🔥🔥🔥\n")
+        logger.error("Top topics endpoint failed", exc_info=True)
 
         return jsonify({
             "error": str(e)
@@ -228,7 +425,7 @@ def get_top_topics():
     
     
      
-@app.route("/api/reviews-by-topic", methods=["GET"])
+@bp.route("/api/reviews-by-topic", methods=["GET"])
 def get_reviews_by_topic():
     topic = request.args.get("topic")
     wsid = request.args.get("wsid")
@@ -258,7 +455,8 @@ def get_reviews_by_topic():
 
     return jsonify({"reviews": reviews})
 
-@app.route("/chat", methods=["POST"])
+@bp.route("/chat", methods=["POST"])
+@admission_controlled("interactive")
 def chat():
     data = request.get_json(force=True)
 
@@ -270,51 +468,69 @@ def chat():
         return jsonify({"error": "Missing parameters"}), 400
 
     # -------------------------------------
-    # Create session ID (per browser session)
+    # Session ID cookie -> server-side history
     # -------------------------------------
 
-    if "chat_history" not in session:
-        # session["chat_id"] = str(uuid.uuid4())
-        session["chat_history"] = []
+    if "chat_id" not in session:
+        session["chat_id"] = str(uuid.uuid4())
 
-    chat_history = session["chat_history"]
+    session_id = session["chat_id"]
+    with span("session_load"):
+        history = session_store.load(session_id)
 
     # Call chatbot
     response = chat_with_reviews(
         wsid=wsid,
         product_id=product_id,
         question=question,
-        chat_history=chat_history
+        chat_history=history["messages"],
+        history_summary=history["summary"]
     )
 
     # Store conversation
-    chat_history.append({
-        "role": "user",
-        "content": question
-    })
-    chat_history.append({
-        "role": "assistant",
-        "content": response["answer"]
-    })
-
-    session["chat_history"] = chat_history
+    with span("session_save"):
+        session_store.append_turn(session_id, question, response["answer"])
 
     return jsonify(response)
 
 
-@app.route("/reset-session", methods=["POST"])
+@bp.route("/reset-session", methods=["POST"])
 def reset_session():
+    if "chat_id" in session:
+        session_store.clear(session["chat_id"])
     session.clear()
     return jsonify({"status": "session cleared"})
 
 
 
 # ===============================
-# Run App
+# App factory
+# ===============================
+def create_app():
+    """
+    Build the Flask app. Under gunicorn (see gunicorn.conf.py) this runs
+    once in the master, so models and compiled chains are loaded before
+    the workers fork and their memory is shared copy-on-write.
+    """
+    app = Flask(__name__)
+
+    if FLASK_SECRET_KEY:
+        app.secret_key = FLASK_SECRET_KEY
+    else:
+        # Generated before fork, so all workers agree; sessions reset on restart
+        app.secret_key = secrets.token_hex(32)
+        logger.warning("FLASK_SECRET_KEY is not set; using a random key for this run")
+
+    app.register_blueprint(bp)
+    return app
+
+
+# ===============================
+# Run App (development server)
 # ===============================
 if __name__ == "__main__":
-    app.run(
-        host="0.0.0.0",
-        port=5000,
-        debug=True
+    create_app().run(
+        host=WEB_HOST,
+        port=WEB_PORT,
+        debug=FLASK_DEBUG
     )
@@ -0,0 +1,47 @@
+"""
+Per-request overhead of building the /ask chain vs reusing the compiled one.
+No network calls are made: only client and runnable construction is timed.
+
+    GROQ_API_KEY=dummy python -m benchmarks.bench_chain_cache --iterations 200
+"""
+import argparse
+import json
+import time
+
+from components.llm import load_llm
+from components.retriever import build_qa_chain, get_qa_chain, SUMMARY_TYPES
+
+
+def time_per_call(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    def rebuild(i):
+        # what /ask used to do: new ChatGroq (+ HTTP client), prompt, parser, runnable
+        summary_type = SUMMARY_TYPES[i % len(SUMMARY_TYPES)]
+        build_qa_chain(summary_type, llm=load_llm())
+
+    def cached(i):
+        get_qa_chain(SUMMARY_TYPES[i % len(SUMMARY_TYPES)])
+
+    for summary_type in SUMMARY_TYPES:
+        get_qa_chain(summary_type)   # warm
+
+    rebuild_ms = time_per_call(rebuild, args.iterations)
+    cached_ms = time_per_call(cached, args.iterations)
+
+    result = {
+        "iterations": args.iterations,
+        "rebuild_ms_per_request": round(rebuild_ms, 3),
+        "cached_ms_per_request": round(cached_ms, 4),
+        "saved_ms_per_request": round(rebuild_ms - cached_ms, 3)
+    }
+    print(json.dumps(result, indent=2))
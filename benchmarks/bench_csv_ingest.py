@@ -0,0 +1,69 @@
+"""
+CSV → review records throughput: old df.iterrows() loop vs the vectorized,
+chunked path. Mongo writes are excluded unless --mongo is given.
+
+    python -m benchmarks.bench_csv_ingest --file data/datas.csv
+    python -m benchmarks.bench_csv_ingest --file data/datas.csv --mongo
+"""
+import argparse
+import json
+import time
+import uuid
+
+import pandas as pd
+
+from benchmarks.datasets import DATA_DIR
+
+
+def iterrows_records(df):
+    # The pre-vectorization loop, kept here as the baseline
+    records = []
+    for _, row in df.iterrows():
+        records.append({
+            "review_id": str(uuid.uuid4()),
+            "wsid": row["WSID"],
+            "product_id": str(row["product_id"]),
+            "product_name": row["product_name"],
+            "review_title": row["review_title"],
+            "review_text": row["review_text"],
+            "rating": int(row["rating"]),
+            "embedded": False
+        })
+    return records
+
+
+def vectorized_records(path, chunksize):
+    from components.review_records import normalize_review_frame
+
+    rows = 0
+    for chunk in pd.read_csv(path, chunksize=chunksize, dtype=str, encoding="utf-8-sig"):
+        rows += len(normalize_review_frame(chunk).to_dict("records"))
+    return rows
+
+
+def timed(fn):
+    start = time.perf_counter()
+    rows = fn()
+    elapsed = time.perf_counter() - start
+    return {"rows": rows, "seconds": round(elapsed, 3), "rows_per_sec": round(rows / elapsed)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default=str(DATA_DIR / "datas.csv"))
+    parser.add_argument("--chunksize", type=int, default=5000)
+    parser.add_argument("--mongo", action="store_true",
+                        help="also time the full load_csv_file_to_db into MONGO_URI")
+    args = parser.parse_args()
+
+    results = {
+        "iterrows": timed(lambda: len(iterrows_records(pd.read_csv(args.file)))),
+        "vectorized": timed(lambda: vectorized_records(args.file, args.chunksize))
+    }
+
+    if args.mongo:
+        from components.csv_loader import load_csv_file_to_db
+        results["vectorized_with_mongo"] = timed(lambda: load_csv_file_to_db(args.file, args.chunksize))
+
+    results["speedup"] = round(results["vectorized"]["rows_per_sec"] / results["iterrows"]["rows_per_sec"], 1)
+    print(json.dumps(results, indent=2))
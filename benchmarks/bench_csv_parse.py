@@ -0,0 +1,64 @@
+"""
+Parse time and peak Python memory: CSVLoader + key/value re-parse (old
+specialized_csv_load) vs the streaming csv.DictReader loader.
+
+    python -m benchmarks.bench_csv_parse --file data/datas.csv
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from langchain_community.document_loaders.csv_loader import CSVLoader
+
+from benchmarks.datasets import DATA_DIR
+from components.csv_loader import iter_csv_documents
+
+CONTENT_COLUMNS = ["product_name", "review_title", "review_text"]
+
+
+def old_parse(path):
+    # Single successful encoding attempt; the old loader could try up to four
+    docs = CSVLoader(file_path=path, encoding="utf-8-sig",
+                     csv_args={"delimiter": ",", "quotechar": '"'}).load()
+    for doc in docs:
+        content_lines = []
+        for line in doc.page_content.split("\n"):
+            if ":" not in line:
+                continue
+            key, value = line.split(":", 1)
+            if key.strip() in CONTENT_COLUMNS:
+                content_lines.append(f"{key.strip()}: {value.strip()}")
+        doc.page_content = "\n".join(content_lines)
+    return len(docs)
+
+
+def new_parse(path):
+    # Consumed as a stream, the way iter_text_chunks / save_vector_store use it
+    return sum(1 for _ in iter_csv_documents(path, CONTENT_COLUMNS))
+
+
+def measure(fn, path):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = fn(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"rows": rows, "seconds": round(elapsed, 3), "peak_mb": round(peak / 1e6, 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file", default=str(DATA_DIR / "datas.csv"))
+    args = parser.parse_args()
+
+    old = measure(old_parse, args.file)
+    new = measure(new_parse, args.file)
+
+    print(json.dumps({
+        "csvloader_reparse": old,
+        "streaming": new,
+        "speedup": round(old["seconds"] / new["seconds"], 2),
+        "memory_ratio": round(old["peak_mb"] / max(new["peak_mb"], 0.1), 1)
+    }, indent=2))
@@ -0,0 +1,457 @@
+"""
+End-to-end latency of /ask, /chat, /topics/top and POST /reviews, fully
+offline. The Flask app runs against the stand-ins in benchmarks.fakes
+(in-memory Mongo or a local MONGO_URI, fake Pinecone, hashed embeddings,
+fake Groq with configurable latency) plus a local product-page server.
+
+Products and request bodies come from data/*.csv. Each virtual user opens
+a product page (default summary), sometimes switches tab or asks a custom
+question, chats for a few turns, and occasionally loads topics or posts a
+review. Per concurrency level the report has throughput, per-endpoint
+p50/p95/p99 and a per-stage breakdown. Stages nest: "llm" (gateway:
+queueing, rate limits, retries) includes "llm_generate" (the model call).
+
+    python -m benchmarks.bench_e2e --products 10 --requests 300 --concurrency 1 8 32
+    python -m benchmarks.bench_e2e --llm-ttft-ms 800 --llm-rps 5          # production-like quota
+    python -m benchmarks.bench_e2e --compare benchmarks/results/baseline.json
+"""
+import argparse
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.datasets import DATA_DIR, REVIEW_FILES, iter_review_rows
+from benchmarks import fakes
+from benchmarks.fakes import stage_timer
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+CUSTOM_QUESTIONS = [
+    "Is the print quality good?",
+    "Does it leak or smudge?",
+    "How long does a cartridge last?",
+    "Is it worth the price?"
+]
+
+CHAT_QUESTIONS = [
+    "How is the print quality?",
+    "Does it work with my printer?",
+    "Do customers have problems with the chip being recognized?",
+    "Is shipping fast?"
+]
+
+SPEC_QUESTIONS = [
+    "What is the page yield of the {code}?",
+    "Is this compatible with {code}?",
+    "What is the price of {code}?"
+]
+
+FOLLOW_UPS = [
+    "What about the price?",
+    "And the other one?",
+    "Does it last long?",
+    "Any complaints about that?"
+]
+
+CODE_RE = re.compile(r"\b(?=\w*\d)(?=\w*[A-Za-z])\w{3,}\b")
+
+
+# --------------------------------------------------
+# Environment
+# --------------------------------------------------
+def install_fakes(args):
+    """
+    Patch the service clients before the app is imported, then import it.
+    Returns the Flask app.
+    """
+    os.environ.setdefault("PINECONE_API_KEY", "bench")
+    os.environ.setdefault("PINECONE_INDEX", "reviews")
+    os.environ.setdefault("GROQ_API_KEY", "bench")
+    os.environ["LLM_MAX_RPS"] = str(args.llm_rps)
+    os.environ["LLM_MAX_TPM"] = str(args.llm_tpm)
+
+    import pinecone
+    fakes.FakePinecone.latency = args.pinecone_latency_ms / 1000.0
+    pinecone.Pinecone = fakes.FakePinecone
+
+    if not args.real_embeddings:
+        import sentence_transformers
+        sentence_transformers.SentenceTransformer = fakes.FakeSentenceTransformer
+
+    if args.mongo_uri:
+        os.environ["MONGO_URI"] = args.mongo_uri
+        os.environ["MONGO_DB_NAME"] = f"review_bench_{os.getpid()}"
+    else:
+        import pymongo
+        fakes.FakeMongoClient.latency = args.mongo_latency_ms / 1000.0
+        pymongo.MongoClient = fakes.FakeMongoClient
+
+    import components.llm
+    components.llm._shared_llm = fakes.FakeChatModel(
+        ttft_ms=args.llm_ttft_ms,
+        tokens_per_second=args.llm_tokens_per_sec,
+        failure_rate=args.llm_failure_rate
+    )
+
+    from application import create_app
+    app = create_app()
+
+    # Stage timers around the app's own entry points into each service
+    import components.chatbot.chain as chain
+    from components.llm_gateway import llm_gateway
+    from components.embedding_service import embedding_service
+    from components.keyword_index import keyword_index
+
+    llm_gateway.call = stage_timer.wrap("llm", llm_gateway.call)
+    embedding_service.embed = stage_timer.wrap("embed", embedding_service.embed)
+    keyword_index.search = stage_timer.wrap("keyword", keyword_index.search)
+    keyword_index.web_passages = stage_timer.wrap("keyword", keyword_index.web_passages)
+    chain.get_website_content = stage_timer.wrap("website", chain.get_website_content)
+
+    return app
+
+
+def pick_products(n: int):
+    """
+    The `n` most-reviewed products: [(wsid, product_id, product_name, [review texts])].
+    """
+    from components.review_records import normalize_product_id
+
+    counts = Counter()
+    names, texts = {}, defaultdict(list)
+    for row in iter_review_rows():
+        key = (row.get("WSID"), normalize_product_id(row.get("product_id")))
+        counts[key] += 1
+        names[key] = row.get("product_name") or ""
+        if len(texts[key]) < 50:
+            texts[key].append(row.get("review_text") or "")
+
+    return [(wsid, pid, names[(wsid, pid)], texts[(wsid, pid)]) for (wsid, pid), _ in counts.most_common(n)]
+
+
+def seed(products, materialize: bool):
+    """
+    Load the chosen products' reviews through the real ingest path, embed
+    them into the fake index and (optionally) precompute summaries.
+    """
+    import pandas as pd
+    from components.csv_loader import load_csv_to_db
+    from components.database import reviews_collection
+    from components.dedup import create_near_duplicate_index
+    from components.directory_ingest import EmbedUpsertStage
+    from components.embed_new_reviews import PENDING_FILTER
+    from components.review_records import normalize_product_id
+
+    keys = {f"{wsid}|{pid}" for wsid, pid, _, _ in products}
+    setup = {}
+
+    start = time.perf_counter()
+    dedup_index = create_near_duplicate_index()
+    rows = inserted = 0
+    for name in REVIEW_FILES:
+        df = pd.read_csv(DATA_DIR / name, dtype=str, encoding="utf-8-sig")
+        df = df[(df["WSID"].fillna("") + "|" + df["product_id"].map(normalize_product_id)).isin(keys)]
+        rows += len(df)
+        inserted += load_csv_to_db(df, dedup_index)
+    elapsed = time.perf_counter() - start
+    setup["ingest"] = {"rows": rows, "inserted": inserted, "seconds": round(elapsed, 3),
+                       "rows_per_sec": round(rows / elapsed) if elapsed else None}
+
+    start = time.perf_counter()
+    stage = EmbedUpsertStage()
+    stage.add(list(reviews_collection.find(PENDING_FILTER, {"_id": 0})))
+    stage.close()
+    setup["embed"] = {"reviews": stage.embedded, "seconds": round(time.perf_counter() - start, 3)}
+
+    if materialize:
+        from components.summaries.materializer import materialize_summaries
+        start = time.perf_counter()
+        refreshed = materialize_summaries()
+        setup["materialize"] = {"products": refreshed, "seconds": round(time.perf_counter() - start, 3)}
+
+    return setup
+
+
+# --------------------------------------------------
+# Request mix
+# --------------------------------------------------
+def plan_visit(rng, product, args):
+    """
+    One user's page visit: [(label, path, body)], sent in order with one
+    cookie jar.
+    """
+    wsid, product_id, name, texts = product
+    base = {"wsid": wsid, "product_id": product_id}
+    codes = CODE_RE.findall(name) or ["this cartridge"]
+
+    requests = [("ask:default", "/ask", {**base, "summary_type": "neutral"})]
+
+    if rng.random() < 0.5:
+        requests.append(("ask:default", "/ask", {**base, "summary_type": rng.choice(["positive", "negative"])}))
+
+    if rng.random() < args.custom_ask_rate:
+        requests.append(("ask:custom", "/ask", {
+            **base,
+            "summary_type": rng.choice(["neutral", "positive", "negative"]),
+            "question": rng.choice(CUSTOM_QUESTIONS)
+        }))
+
+    for turn in range(rng.randint(0, 2 * args.chat_turns)):
+        if turn == 0:
+            question = rng.choice(CHAT_QUESTIONS + [q.format(code=rng.choice(codes)) for q in SPEC_QUESTIONS])
+        else:
+            question = rng.choice(FOLLOW_UPS)
+        requests.append(("chat", "/chat", {**base, "question": question}))
+
+    if rng.random() < args.topics_rate:
+        requests.append(("topics", "/topics/top", {"WSID": wsid, "product_id": product_id}))
+
+    if rng.random() < args.post_rate:
+        requests.append(("reviews:post", "/reviews", {
+            **base,
+            "product_name": name,
+            "rating": rng.randint(1, 5),
+            "review_text": f"{rng.choice(texts)} ({uuid.uuid4().hex[:8]})",
+            "reviewer_name": f"bench-{rng.randint(0, 10 ** 6)}"
+        }))
+
+    return requests
+
+
+def run_worker(app, products, args, seed_value: int, budget: int):
+    rng = random.Random(seed_value)
+    samples = []
+
+    while len(samples) < budget:
+        client = app.test_client()      # fresh session cookie per visit
+        for label, path, body in plan_visit(rng, rng.choice(products), args):
+            if len(samples) >= budget:
+                break
+
+            stage_timer.begin()
+            start = time.perf_counter()
+            try:
+                status = client.post(path, json=body).status_code
+            except Exception:
+                status = 599
+            elapsed = time.perf_counter() - start
+
+            samples.append({"endpoint": label, "status": status, "seconds": elapsed, "stages": stage_timer.end()})
+
+    return samples
+
+
+def run_level(app, products, args, concurrency: int, total: int, seed_value: int):
+    budgets = [total // concurrency + (1 if i < total % concurrency else 0) for i in range(concurrency)]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(run_worker, app, products, args, seed_value * 1000 + i, budget)
+            for i, budget in enumerate(budgets) if budget
+        ]
+        samples = [s for f in futures for s in f.result()]
+    wall = time.perf_counter() - start
+
+    return samples, wall
+
+
+# --------------------------------------------------
+# Reporting
+# --------------------------------------------------
+def percentiles(values: list) -> dict:
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(p):
+        return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+    return {
+        "p50": round(rank(50) * 1000, 2),
+        "p95": round(rank(95) * 1000, 2),
+        "p99": round(rank(99) * 1000, 2),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+        "max": round(ordered[-1] * 1000, 2)
+    }
+
+
+def summarize(samples: list, wall: float, concurrency: int) -> dict:
+    by_endpoint = defaultdict(list)
+    for s in samples:
+        by_endpoint[s["endpoint"]].append(s)
+
+    endpoints = {}
+    for label, rows in sorted(by_endpoint.items()):
+        stage_times = defaultdict(list)
+        stage_calls = Counter()
+        for row in rows:
+            for stage, value in row["stages"].items():
+                stage_times[stage].append(value["seconds"])
+                stage_calls[stage] += value["calls"]
+
+        endpoints[label] = {
+            "count": len(rows),
+            "errors": sum(1 for r in rows if r["status"] >= 400),
+            "latency_ms": percentiles([r["seconds"] for r in rows]),
+            "stages": {
+                stage: {
+                    "requests": len(times),
+                    "calls_per_request": round(stage_calls[stage] / len(times), 2),
+                    "latency_ms": percentiles(times)
+                }
+                for stage, times in sorted(stage_times.items())
+            }
+        }
+
+    return {
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "seconds": round(wall, 3),
+        "throughput_rps": round(len(samples) / wall, 2) if wall else None,
+        "errors": sum(1 for s in samples if s["status"] >= 400),
+        "latency_ms": percentiles([s["seconds"] for s in samples]),
+        "endpoints": endpoints
+    }
+
+
+def compare(result: dict, baseline: dict, threshold: float) -> list:
+    """
+    Endpoint p50 / p95 regressions beyond `threshold` (fractional) against
+    a previous run at the same concurrency.
+    """
+    regressions = []
+    previous = {run["concurrency"]: run for run in baseline.get("runs", [])}
+
+    for run in result["runs"]:
+        base = previous.get(run["concurrency"])
+        if not base:
+            continue
+        for label, current in run["endpoints"].items():
+            before = base["endpoints"].get(label)
+            if not before:
+                continue
+            for p in ("p50", "p95"):
+                old, new = before["latency_ms"].get(p), current["latency_ms"].get(p)
+                if not old or not new:
+                    continue
+                change = (new - old) / old
+                line = f"c={run['concurrency']:<3} {label:<14} {p}: {old:>9.1f} → {new:>9.1f} ms ({change:+.0%})"
+                if change > threshold:
+                    regressions.append(line)
+                    print(f"⚠️  {line}")
+                else:
+                    print(f"   {line}")
+    return regressions
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def print_run(run: dict):
+    print(f"\n📊 concurrency={run['concurrency']} | requests={run['requests']} | "
+          f"throughput={run['throughput_rps']} req/s | errors={run['errors']}")
+    for label, data in run["endpoints"].items():
+        lat = data["latency_ms"]
+        stages = ", ".join(
+            f"{stage}={s['latency_ms']['p50']}ms" for stage, s in data["stages"].items()
+        )
+        print(f"   {label:<14} n={data['count']:<5} p50={lat['p50']:>8}ms p95={lat['p95']:>8}ms "
+              f"p99={lat['p99']:>8}ms | p50 by stage: {stages}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline end-to-end latency benchmark")
+    parser.add_argument("--products", type=int, default=10, help="most-reviewed products to load")
+    parser.add_argument("--requests", type=int, default=300, help="requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--warmup", type=int, default=20, help="unrecorded requests before the first level")
+    parser.add_argument("--seed", type=int, default=7)
+
+    mix = parser.add_argument_group("request mix (per visit)")
+    mix.add_argument("--custom-ask-rate", type=float, default=0.3)
+    mix.add_argument("--chat-turns", type=int, default=2, help="mean chat turns")
+    mix.add_argument("--topics-rate", type=float, default=0.1)
+    mix.add_argument("--post-rate", type=float, default=0.1)
+
+    deps = parser.add_argument_group("stand-ins")
+    deps.add_argument("--mongo-uri", default=None, help="use a local Mongo (throwaway db) instead of the in-memory fake")
+    deps.add_argument("--keep-db", action="store_true")
+    deps.add_argument("--mongo-latency-ms", type=float, default=0.0)
+    deps.add_argument("--pinecone-latency-ms", type=float, default=25.0)
+    deps.add_argument("--real-embeddings", action="store_true", help="load the real sentence-transformers model")
+    deps.add_argument("--llm-ttft-ms", type=float, default=300.0)
+    deps.add_argument("--llm-tokens-per-sec", type=float, default=500.0)
+    deps.add_argument("--llm-failure-rate", type=float, default=0.0)
+    deps.add_argument("--llm-rps", type=float, default=100.0, help="gateway request limit (LLM_MAX_RPS)")
+    deps.add_argument("--llm-tpm", type=float, default=10_000_000, help="gateway token limit (LLM_MAX_TPM)")
+    deps.add_argument("--site-latency-ms", type=float, default=300.0)
+    deps.add_argument("--no-materialize", action="store_true", help="leave default summaries to be generated live")
+
+    parser.add_argument("--out", default=None, help="JSON output path (default benchmarks/results/e2e_<time>.json)")
+    parser.add_argument("--compare", default=None, help="previous result JSON to diff against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="regression threshold for --compare")
+    args = parser.parse_args()
+
+    with fakes.ProductSiteServer(latency_ms=args.site_latency_ms) as site:
+        app = install_fakes(args)
+
+        import components.chatbot.chain as chain
+        chain.BASE_PRODUCT_URL = site.base_url
+
+        products = pick_products(args.products)
+        print(f"🚀 Seeding {len(products)} products")
+        setup = seed(products, materialize=not args.no_materialize)
+        print(f"✅ Setup | {json.dumps(setup)}")
+
+        if args.warmup:
+            run_level(app, products, args, concurrency=1, total=args.warmup, seed_value=args.seed - 1)
+
+        runs = []
+        for level in args.concurrency:
+            samples, wall = run_level(app, products, args, level, args.requests, seed_value=args.seed)
+            runs.append(summarize(samples, wall, level))
+            print_run(runs[-1])
+
+        if args.mongo_uri and not args.keep_db:
+            from components.database import client, db
+            client.drop_database(db.name)
+
+    result = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_revision": git_revision(),
+            "args": vars(args),
+            "products": [{"wsid": w, "product_id": p, "product_name": n} for w, p, n, _ in products],
+            "setup": setup
+        },
+        "runs": runs
+    }
+
+    out = Path(args.out) if args.out else RESULTS_DIR / f"e2e_{datetime.now():%Y%m%d_%H%M%S}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(result, indent=2, default=str))
+    print(f"\n💾 Saved {out}")
+
+    if args.compare:
+        print(f"\n🔍 Compared with {args.compare}")
+        regressions = compare(result, json.loads(Path(args.compare).read_text()), args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) over {args.threshold:.0%}")
+            sys.exit(1)
+        print("✅ No regressions")
@@ -0,0 +1,52 @@
+"""
+Encode throughput of the multi-process embedding pool vs worker count.
+
+    python -m benchmarks.bench_embedding_pool --limit 8000 --workers 1 2 4 8
+"""
+import argparse
+import json
+import os
+import time
+
+from benchmarks.datasets import load_review_texts
+from components.embedding_pool import encode_in_pool
+
+
+def run(texts, workers: int, shard_size: int, batch_size: int):
+    items = list(enumerate(texts))
+
+    start = time.perf_counter()
+    encoded = sum(
+        len(shard)
+        for shard in encode_in_pool(items, workers=workers, shard_size=shard_size,
+                                    batch_size=batch_size, torch_threads=1)
+    )
+    elapsed = time.perf_counter() - start
+
+    return {"workers": workers, "reviews": encoded, "seconds": round(elapsed, 2),
+            "reviews_per_sec": round(encoded / elapsed, 1)}
+
+
+if __name__ == "__main__":
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, cpus} & set(range(1, cpus + 1)))
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--limit", type=int, default=8000)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    parser.add_argument("--shard-size", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=128)
+    args = parser.parse_args()
+
+    texts = load_review_texts(limit=args.limit)
+    results = [run(texts, w, args.shard_size, args.batch_size) for w in args.workers]
+
+    # Pool start-up (model load per worker) is included, as in a real backfill.
+    baseline = results[0]["reviews_per_sec"]
+    for r in results:
+        r["speedup"] = round(r["reviews_per_sec"] / baseline, 2)
+        r["efficiency"] = round(r["speedup"] / r["workers"], 2)
+        print(f"workers={r['workers']:>2}  {r['reviews_per_sec']:>8} reviews/s  "
+              f"speedup={r['speedup']}x  efficiency={r['efficiency']}")
+
+    print(json.dumps(results, indent=2))
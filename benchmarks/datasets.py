@@ -0,0 +1,26 @@
+import csv
+from pathlib import Path
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+REVIEW_FILES = ["datas.csv", "store1.csv", "store2.csv"]
+
+
+def iter_review_rows(files=REVIEW_FILES, limit: int = None):
+    """
+    Yield raw CSV rows (dicts) from the sample exports in data/.
+    """
+    count = 0
+    for name in files:
+        with open(DATA_DIR / name, newline="", encoding="utf-8-sig") as f:
+            for row in csv.DictReader(f):
+                yield row
+                count += 1
+                if limit and count >= limit:
+                    return
+
+
+def load_review_texts(limit: int = None):
+    return [
+        f"{row.get('review_title') or ''} {row.get('review_text') or ''}"
+        for row in iter_review_rows(limit=limit)
+    ]
@@ -0,0 +1,874 @@
+"""
+In-process stand-ins for the external services, used by bench_e2e:
+
+- FakeMongoClient: in-memory collections covering the query / update
+  operators the app uses, with equality indexes on create_index() fields
+- FakePinecone: brute-force cosine index with metadata filters
+- FakeSentenceTransformer: deterministic hashed bag-of-words embeddings
+- FakeChatModel: prompt-aware canned replies with configurable latency
+- ProductSiteServer: local HTTP server rendering product pages
+
+Every fake reports its time to the active StageTimer, so a request's
+latency can be broken down by stage.
+"""
+import copy
+import hashlib
+import http.server
+import json
+import re
+import threading
+import time
+import uuid
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+# --------------------------------------------------
+# Per-request stage timing
+# --------------------------------------------------
+class StageTimer:
+    """
+    Thread-local accumulator: the driver opens one context per request and
+    instrumented calls add their elapsed time under a stage name.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def begin(self):
+        self._local.stages = defaultdict(float)
+        self._local.calls = defaultdict(int)
+
+    def end(self) -> dict:
+        stages = getattr(self._local, "stages", None) or {}
+        calls = getattr(self._local, "calls", None) or {}
+        self._local.stages = None
+        return {name: {"seconds": seconds, "calls": calls[name]} for name, seconds in stages.items()}
+
+    def add(self, stage: str, seconds: float):
+        stages = getattr(self._local, "stages", None)
+        if stages is not None:
+            stages[stage] += seconds
+            self._local.calls[stage] += 1
+
+    def wrap(self, stage: str, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+
+stage_timer = StageTimer()
+
+_sleep = time.sleep
+
+
+# --------------------------------------------------
+# Mongo
+# --------------------------------------------------
+_MISSING = object()
+
+
+def _get_path(doc, path: str):
+    value = doc
+    for part in path.split("."):
+        if isinstance(value, dict) and part in value:
+            value = value[part]
+        else:
+            return _MISSING
+    return value
+
+
+def _set_path(doc, path: str, value):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _compare(value, op: str, operand) -> bool:
+    if op == "$exists":
+        return (value is not _MISSING) == bool(operand)
+    if op == "$eq":
+        return _equals(value, operand)
+    if op == "$ne":
+        return not _equals(value, operand)
+    if op == "$in":
+        return any(_equals(value, o) for o in operand)
+    if op == "$nin":
+        return not any(_equals(value, o) for o in operand)
+
+    if value is _MISSING or value is None:
+        return False
+    values = value if isinstance(value, list) else [value]
+    try:
+        if op == "$lt":
+            return any(v < operand for v in values)
+        if op == "$lte":
+            return any(v <= operand for v in values)
+        if op == "$gt":
+            return any(v > operand for v in values)
+        if op == "$gte":
+            return any(v >= operand for v in values)
+    except TypeError:
+        return False
+    raise NotImplementedError(f"FakeCollection: unsupported operator {op}")
+
+
+def _equals(value, operand) -> bool:
+    # Missing fields equal None; arrays match any of their elements
+    if value is _MISSING:
+        return operand is None
+    if isinstance(value, list) and not isinstance(operand, list):
+        return operand in value
+    return value == operand
+
+
+def _matches(doc, query) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$or":
+            if not any(_matches(doc, q) for q in condition):
+                return False
+            continue
+        if key == "$and":
+            if not all(_matches(doc, q) for q in condition):
+                return False
+            continue
+
+        value = _get_path(doc, key)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            if not all(_compare(value, op, operand) for op, operand in condition.items()):
+                return False
+        elif not _equals(value, condition):
+            return False
+    return True
+
+
+def _project(doc, projection):
+    if not projection:
+        return copy.deepcopy(doc)
+
+    include = {k for k, v in projection.items() if v and k != "_id"}
+    keep_id = projection.get("_id", 1)
+
+    if include:
+        out = {}
+        for path in include:
+            value = _get_path(doc, path)
+            if value is not _MISSING:
+                _set_path(out, path, copy.deepcopy(value))
+    else:
+        excluded = {k for k, v in projection.items() if not v}
+        out = {k: copy.deepcopy(v) for k, v in doc.items() if k not in excluded}
+
+    if keep_id and "_id" in doc:
+        out["_id"] = doc["_id"]
+    elif not keep_id:
+        out.pop("_id", None)
+    return out
+
+
+def _sort_key(value):
+    # Mongo orders missing / null before everything else
+    if value is _MISSING or value is None:
+        return (0, 0)
+    return (1, value)
+
+
+class _Result:
+    def __init__(self, matched_count=0, modified_count=0, upserted_id=None, deleted_count=0, inserted_id=None):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+        self.upserted_id = upserted_id
+        self.deleted_count = deleted_count
+        self.inserted_id = inserted_id
+
+
+class FakeCursor:
+
+    def __init__(self, docs):
+        self._docs = docs
+
+    def sort(self, key_or_list, direction=1):
+        keys = key_or_list if isinstance(key_or_list, list) else [(key_or_list, direction)]
+        for key, order in reversed(keys):
+            self._docs.sort(key=lambda d: _sort_key(_get_path(d, key)), reverse=order < 0)
+        return self
+
+    def limit(self, n: int):
+        if n:
+            self._docs = self._docs[:n]
+        return self
+
+    def __iter__(self):
+        return iter(self._docs)
+
+
+class FakeCollection:
+
+    def __init__(self, name: str, latency: float = 0.0):
+        self.name = name
+        self.latency = latency
+        self._docs = {}                       # _id -> doc
+        self._indexes = {}                    # field -> {value: set(_id)}
+        self._unique = {}                     # (fields) -> {key: _id}
+        self._lock = threading.RLock()
+
+    # ---------- indexes ----------
+    def create_index(self, keys, unique: bool = False, **kwargs):
+        fields = [keys] if isinstance(keys, str) else [k for k, _ in keys]
+        with self._lock:
+            if fields[0] not in self._indexes:
+                self._indexes[fields[0]] = defaultdict(set)
+                for _id, doc in self._docs.items():
+                    self._index_doc(_id, doc, fields[0])
+            if unique:
+                keys = self._unique.setdefault(tuple(fields), {})
+                for _id, doc in self._docs.items():
+                    keys[_unique_key(doc, fields)] = _id
+        return "_".join(fields)
+
+    def _index_doc(self, _id, doc, field):
+        value = _get_path(doc, field)
+        for v in (value if isinstance(value, list) else [value]):
+            if v is not _MISSING and _hashable(v):
+                self._indexes[field][v].add(_id)
+
+    def _unindex_doc(self, _id, doc):
+        for field, index in self._indexes.items():
+            value = _get_path(doc, field)
+            for v in (value if isinstance(value, list) else [value]):
+                if v is not _MISSING and _hashable(v):
+                    index[v].discard(_id)
+        for fields, keys in self._unique.items():
+            key = _unique_key(doc, fields)
+            if keys.get(key) == _id:
+                del keys[key]
+
+    def _candidates(self, query):
+        query = query or {}
+        if "_id" in query:
+            condition = query["_id"]
+            if isinstance(condition, dict) and "$in" in condition:
+                return [i for i in condition["$in"] if _hashable(i) and i in self._docs]
+            if _hashable(condition):
+                return [condition] if condition in self._docs else []
+
+        for field, index in self._indexes.items():
+            condition = query.get(field, _MISSING)
+            if condition is _MISSING:
+                continue
+            if isinstance(condition, dict) and "$in" in condition:
+                ids = set()
+                for v in condition["$in"]:
+                    ids |= index.get(v, set()) if _hashable(v) else set()
+                return list(ids)
+            if not isinstance(condition, dict) and condition is not None and _hashable(condition):
+                return list(index.get(condition, ()))
+        return list(self._docs)
+
+    def _check_unique(self, doc, ignore_id=None):
+        if doc["_id"] in self._docs and doc["_id"] != ignore_id:
+            raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} _id: {doc['_id']!r}")
+        for fields, keys in self._unique.items():
+            other_id = keys.get(_unique_key(doc, fields))
+            if other_id is not None and other_id != ignore_id:
+                raise DuplicateKeyError(f"E11000 duplicate key error collection: {self.name} index: {fields}")
+
+    def _store(self, doc, old=None):
+        if old is not None:
+            self._unindex_doc(doc["_id"], old)
+        self._docs[doc["_id"]] = doc
+        for field in self._indexes:
+            self._index_doc(doc["_id"], doc, field)
+        for fields, keys in self._unique.items():
+            keys[_unique_key(doc, fields)] = doc["_id"]
+
+    def _timed(self, started):
+        if self.latency:
+            _sleep(self.latency)
+        stage_timer.add("mongo", time.perf_counter() - started)
+
+    # ---------- reads ----------
+    def _find(self, query, projection=None):
+        with self._lock:
+            return [
+                _project(self._docs[_id], projection)
+                for _id in self._candidates(query)
+                if _id in self._docs and _matches(self._docs[_id], query)
+            ]
+
+    def find(self, filter=None, projection=None, sort=None, limit=0, **kwargs):
+        started = time.perf_counter()
+        cursor = FakeCursor(self._find(filter, projection))
+        if sort:
+            cursor.sort(sort)
+        cursor.limit(limit)
+        self._timed(started)
+        return cursor
+
+    def find_one(self, filter=None, projection=None, sort=None, **kwargs):
+        for doc in self.find(filter, projection, sort=sort, limit=1):
+            return doc
+        return None
+
+    def count_documents(self, filter, limit: int = 0, **kwargs):
+        started = time.perf_counter()
+        with self._lock:
+            count = sum(1 for _id in self._candidates(filter) if _matches(self._docs[_id], filter))
+        self._timed(started)
+        return min(count, limit) if limit else count
+
+    def aggregate(self, pipeline, **kwargs):
+        started = time.perf_counter()
+        docs = self._find({})
+        for stage in pipeline:
+            if "$match" in stage:
+                docs = [d for d in docs if _matches(d, stage["$match"])]
+            elif "$group" in stage:
+                docs = _group(docs, stage["$group"])
+            else:
+                raise NotImplementedError(f"FakeCollection: unsupported stage {list(stage)}")
+        self._timed(started)
+        return iter(docs)
+
+    def watch(self, *args, **kwargs):
+        raise NotImplementedError("FakeCollection does not support change streams")
+
+    # ---------- writes ----------
+    def insert_one(self, document, **kwargs):
+        started = time.perf_counter()
+        with self._lock:
+            doc = copy.deepcopy(document)
+            doc.setdefault("_id", uuid.uuid4().hex)
+            self._check_unique(doc)
+            self._store(doc)
+        document.setdefault("_id", doc["_id"])
+        self._timed(started)
+        return _Result(inserted_id=doc["_id"])
+
+    def insert_many(self, documents, ordered: bool = True, **kwargs):
+        errors = []
+        for i, document in enumerate(documents):
+            try:
+                self.insert_one(document)
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": len(documents) - len(errors)})
+
+    def _update(self, filter, update, upsert: bool, many: bool):
+        with self._lock:
+            ids = [_id for _id in self._candidates(filter) if _matches(self._docs[_id], filter)]
+            if not many:
+                ids = ids[:1]
+
+            for _id in ids:
+                old = self._docs[_id]
+                doc = copy.deepcopy(old)
+                _apply_update(doc, update, inserting=False)
+                self._check_unique(doc, ignore_id=_id)
+                self._store(doc, old)
+
+            if ids or not upsert:
+                return _Result(matched_count=len(ids), modified_count=len(ids))
+
+            doc = {
+                k: v for k, v in (filter or {}).items()
+                if not k.startswith("$") and not (isinstance(v, dict) and any(o.startswith("$") for o in v))
+            }
+            _apply_update(doc, update, inserting=True)
+            doc.setdefault("_id", uuid.uuid4().hex)
+            self._check_unique(doc)
+            self._store(doc)
+            return _Result(upserted_id=doc["_id"])
+
+    def update_one(self, filter, update, upsert: bool = False, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._update(filter, update, upsert, many=False)
+        finally:
+            self._timed(started)
+
+    def update_many(self, filter, update, upsert: bool = False, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._update(filter, update, upsert, many=True)
+        finally:
+            self._timed(started)
+
+    def bulk_write(self, requests, ordered: bool = True, **kwargs):
+        started = time.perf_counter()
+        errors = []
+        for i, op in enumerate(requests):
+            try:
+                # pymongo's UpdateOne keeps its arguments on private attributes
+                self._update(op._filter, op._doc, op._upsert, many=False)
+            except DuplicateKeyError as e:
+                errors.append({"index": i, "code": 11000, "errmsg": str(e)})
+                if ordered:
+                    break
+        self._timed(started)
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+        return _Result(matched_count=len(requests))
+
+    def _delete(self, filter, many: bool):
+        started = time.perf_counter()
+        with self._lock:
+            ids = [_id for _id in self._candidates(filter) if _matches(self._docs[_id], filter)]
+            if not many:
+                ids = ids[:1]
+            for _id in ids:
+                self._unindex_doc(_id, self._docs.pop(_id))
+        self._timed(started)
+        return _Result(deleted_count=len(ids))
+
+    def delete_one(self, filter, **kwargs):
+        return self._delete(filter, many=False)
+
+    def delete_many(self, filter, **kwargs):
+        return self._delete(filter, many=True)
+
+    def estimated_document_count(self):
+        return len(self._docs)
+
+
+def _unique_key(doc, fields) -> str:
+    # Missing and null collide, as in a non-sparse Mongo unique index
+    return json.dumps(
+        [None if (v := _get_path(doc, f)) is _MISSING else v for f in fields],
+        sort_keys=True, default=str
+    )
+
+
+def _hashable(value) -> bool:
+    try:
+        hash(value)
+        return True
+    except TypeError:
+        return False
+
+
+def _apply_update(doc, update, inserting: bool):
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            for path, value in fields.items():
+                _set_path(doc, path, copy.deepcopy(value))
+        elif op == "$setOnInsert":
+            continue
+        elif op == "$inc":
+            for path, amount in fields.items():
+                current = _get_path(doc, path)
+                _set_path(doc, path, (0 if current is _MISSING else current) + amount)
+        elif op == "$addToSet":
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                current = [] if current is _MISSING else current
+                values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                current.extend(v for v in values if v not in current)
+                _set_path(doc, path, current)
+        elif op == "$push":
+            for path, value in fields.items():
+                current = _get_path(doc, path)
+                current = [] if current is _MISSING else current
+                values = value["$each"] if isinstance(value, dict) and "$each" in value else [value]
+                current.extend(values)
+                _set_path(doc, path, current)
+        elif op == "$unset":
+            for path in fields:
+                parent = _get_path(doc, path.rsplit(".", 1)[0]) if "." in path else doc
+                if isinstance(parent, dict):
+                    parent.pop(path.rsplit(".", 1)[-1], None)
+        else:
+            raise NotImplementedError(f"FakeCollection: unsupported update operator {op}")
+
+
+def _group_value(doc, spec):
+    if isinstance(spec, str) and spec.startswith("$"):
+        value = _get_path(doc, spec[1:])
+        return None if value is _MISSING else value
+    if isinstance(spec, dict):
+        return {k: _group_value(doc, v) for k, v in spec.items()}
+    return spec
+
+
+def _group(docs, spec):
+    groups = {}
+    for doc in docs:
+        key = _group_value(doc, spec["_id"])
+        frozen = json.dumps(key, sort_keys=True, default=str)
+        row = groups.setdefault(frozen, {"_id": key})
+        for field, accumulator in spec.items():
+            if field == "_id":
+                continue
+            (op, operand), = accumulator.items()
+            if op != "$sum":
+                raise NotImplementedError(f"FakeCollection: unsupported accumulator {op}")
+            row[field] = row.get(field, 0) + (_group_value(doc, operand) or 0)
+    return list(groups.values())
+
+
+class FakeDatabase:
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._collections = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        with self._lock:
+            if name not in self._collections:
+                self._collections[name] = FakeCollection(name, self.latency)
+            return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
+
+
+class FakeMongoClient:
+    """
+    Drop-in for pymongo.MongoClient; all clients share one in-memory server.
+    Set FakeMongoClient.latency (seconds per operation) to model the network.
+    """
+
+    latency = 0.0
+    _databases = {}
+    _lock = threading.Lock()
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def __getitem__(self, name: str) -> FakeDatabase:
+        with self._lock:
+            if name not in self._databases:
+                self._databases[name] = FakeDatabase(self.latency)
+            return self._databases[name]
+
+    def close(self):
+        pass
+
+
+# --------------------------------------------------
+# Pinecone
+# --------------------------------------------------
+class _Match:
+
+    def __init__(self, id, score, metadata):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+
+
+class _QueryResponse:
+
+    def __init__(self, matches):
+        self.matches = matches
+
+
+def _metadata_matches(metadata: dict, filter: dict) -> bool:
+    for key, condition in (filter or {}).items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+class FakeIndex:
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._vectors = {}     # id -> (unit vector, metadata)
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors=None, namespace=None, **kwargs):
+        started = time.perf_counter()
+        with self._lock:
+            for v in vectors or []:
+                if isinstance(v, dict):
+                    vector_id, values, metadata = v["id"], v["values"], v.get("metadata") or {}
+                else:
+                    vector_id, values, metadata = v[0], v[1], (v[2] if len(v) > 2 else {})
+                array = np.asarray(values, dtype=np.float32)
+                norm = np.linalg.norm(array) or 1.0
+                self._vectors[vector_id] = (array / norm, dict(metadata))
+        _sleep(self.latency)
+        stage_timer.add("pinecone", time.perf_counter() - started)
+        return {"upserted_count": len(vectors or [])}
+
+    def query(self, vector=None, top_k: int = 10, filter=None, include_metadata: bool = False, namespace=None, **kwargs):
+        started = time.perf_counter()
+        with self._lock:
+            candidates = [(i, v, m) for i, (v, m) in self._vectors.items() if _metadata_matches(m, filter)]
+
+        matches = []
+        if candidates:
+            query = np.asarray(vector, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+            scores = np.stack([c[1] for c in candidates]) @ query
+            for idx in np.argsort(-scores)[:top_k]:
+                vector_id, _, metadata = candidates[idx]
+                matches.append(_Match(vector_id, float(scores[idx]), dict(metadata) if include_metadata else {}))
+
+        _sleep(self.latency)
+        stage_timer.add("pinecone", time.perf_counter() - started)
+        return _QueryResponse(matches)
+
+    def delete(self, ids=None, delete_all: bool = False, **kwargs):
+        with self._lock:
+            if delete_all:
+                self._vectors.clear()
+            for vector_id in ids or []:
+                self._vectors.pop(vector_id, None)
+
+    def describe_index_stats(self, **kwargs):
+        return {"dimension": 384, "total_vector_count": len(self._vectors)}
+
+
+class _IndexInfo:
+
+    def __init__(self, name):
+        self.name = name
+
+
+class FakePinecone:
+    """
+    Drop-in for pinecone.Pinecone; every client sees the same named indexes.
+    """
+
+    latency = 0.0
+    _indexes = {}
+    _lock = threading.Lock()
+
+    def __init__(self, api_key=None, **kwargs):
+        pass
+
+    def Index(self, name=None, **kwargs):
+        with self._lock:
+            if name not in self._indexes:
+                self._indexes[name] = FakeIndex(self.latency)
+            return self._indexes[name]
+
+    def list_indexes(self):
+        return [_IndexInfo(name) for name in self._indexes]
+
+    def create_index(self, name, **kwargs):
+        self.Index(name)
+
+
+# --------------------------------------------------
+# Sentence embeddings
+# --------------------------------------------------
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+class FakeSentenceTransformer:
+    """
+    Hashed bag-of-words vectors: same dimension as all-MiniLM-L6-v2 and
+    deterministic, so texts sharing words still score as similar.
+    """
+
+    dimension = 384
+
+    def __init__(self, model_name_or_path=None, **kwargs):
+        self.model_name = model_name_or_path
+
+    def _encode_one(self, text: str):
+        vector = np.zeros(self.dimension, dtype=np.float32)
+        for word in _WORD_RE.findall((text or "").lower()):
+            h = zlib.crc32(word.encode("utf-8"))
+            vector[h % self.dimension] += 1.0 if (h >> 16) & 1 else -1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, batch_size: int = 32, **kwargs):
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        return np.stack([self._encode_one(s) for s in sentences]) if sentences else np.zeros((0, self.dimension))
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+
+# --------------------------------------------------
+# Groq chat model
+# --------------------------------------------------
+TOPIC_VOCABULARY = {
+    "print quality": ("print", "prints", "printing", "quality", "sharp", "crisp", "streak", "faded"),
+    "ink yield": ("yield", "pages", "lasts", "lasted", "last"),
+    "compatibility": ("compatible", "recognized", "recognize", "fit", "fits", "chip", "printer"),
+    "price": ("price", "cheap", "value", "cost", "money", "pricing"),
+    "shipping": ("shipping", "delivery", "arrived", "fast", "quick"),
+    "customer service": ("service", "support", "company", "customer"),
+    "leaking": ("leak", "leaked", "leaking", "mess")
+}
+
+
+def _field(prompt: str, label: str) -> str:
+    # Text following "label:" up to the next blank line
+    match = re.search(rf"{re.escape(label)}:?\s*\n(.*?)(\n\s*\n|$)", prompt, re.S)
+    return match.group(1).strip() if match else ""
+
+
+def _topics_for(text: str, n: int) -> list:
+    words = set(_WORD_RE.findall(text.lower()))
+    ranked = sorted(TOPIC_VOCABULARY, key=lambda t: -len(words.intersection(TOPIC_VOCABULARY[t])))
+    return ranked[:n]
+
+
+class FakeChatModel:
+    """
+    Stands in for ChatGroq: recognizes each prompt the app sends and returns
+    a well-formed reply after `ttft + output_tokens / tokens_per_second`.
+    Set `failure_rate` to exercise the gateway's retries.
+    """
+
+    def __init__(self, ttft_ms: float = 300, tokens_per_second: float = 500, failure_rate: float = 0.0, seed: int = 0):
+        self.ttft = ttft_ms / 1000.0
+        self.tokens_per_second = tokens_per_second
+        self.failure_rate = failure_rate
+        self._counter = seed
+        self._lock = threading.Lock()
+
+    def _reply(self, prompt: str) -> str:
+        if "rewrites follow-up questions" in prompt:
+            return _field(prompt, "Latest question") or "What do customers say?"
+
+        if "Extract concise product topics" in prompt:
+            return json.dumps(_topics_for(prompt.split("Review:")[-1], 2))
+
+        if "condensing a batch" in prompt or "merging partial notes" in prompt:
+            return "\n".join(f"- Many customers mention {t}." for t in _topics_for(prompt, 6))
+
+        if '"topics": [' in prompt:
+            return json.dumps({"topics": [
+                {"topic": t.title(), "summary": f"Customers say this product does well on {t}."}
+                for t in _topics_for(prompt, 4)
+            ]})
+
+        if '"summary": "Customers say' in prompt:
+            topics = ", ".join(_topics_for(prompt, 3))
+            return json.dumps({"summary": f"Customers say the product is reliable, mentioning {topics}."})
+
+        if "intelligent product assistant" in prompt:
+            topics = " and ".join(_topics_for(prompt, 2))
+            return f"Based on customer reviews, buyers are mostly satisfied, especially with {topics}. " * 3
+
+        return "OK"
+
+    def invoke(self, prompt_value, *args, **kwargs):
+        from langchain_core.messages import AIMessage
+
+        started = time.perf_counter()
+        prompt = prompt_value.to_string() if hasattr(prompt_value, "to_string") else str(prompt_value)
+        reply = self._reply(prompt)
+
+        with self._lock:
+            self._counter += 1
+            fail = self.failure_rate and (
+                int(hashlib.md5(str(self._counter).encode()).hexdigest(), 16) % 1000 < self.failure_rate * 1000
+            )
+
+        _sleep(self.ttft + (len(reply) / 4) / self.tokens_per_second)
+        stage_timer.add("llm_generate", time.perf_counter() - started)
+
+        if fail:
+            raise FakeRateLimitError("429 rate limited (fake)")
+        return AIMessage(content=reply)
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+# --------------------------------------------------
+# Product website
+# --------------------------------------------------
+_CODE_RE = re.compile(r"\b(?=[a-z0-9]*\d)(?=[a-z0-9]*[a-z])[a-z0-9]{3,}\b")
+
+
+def render_product_page(slug: str) -> str:
+    words = slug.replace("-", " ")
+    codes = [c.upper() for c in _CODE_RE.findall(words)] or ["GENERIC"]
+    seed = zlib.crc32(slug.encode("utf-8"))
+
+    nav = "\n".join(f"<li><a href='/c/{i}'>Category {i}</a></li>" for i in range(40))
+    specs = "\n".join([
+        f"<li>Price: ${10 + seed % 60}.99</li>",
+        f"<li>Page Yield: {1000 + seed % 9000} pages at 5% coverage</li>",
+        f"<li>Warranty: {1 + seed % 3} year satisfaction guarantee</li>",
+        f"<li>OEM Numbers: {', '.join(codes)}</li>",
+        f"<li>Compatible with: {words.title()} series printers</li>",
+        "<li>Shipping: Free shipping on orders over $50</li>"
+    ])
+    return f"""<html><head><title>{words.title()}</title>
+<script>var tracking = "ignored";</script><style>body {{}}</style></head>
+<body><ul>{nav}</ul>
+<h1>{words.title()}</h1>
+<ul>{specs}</ul>
+<p>{"Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 30}</p>
+<footer>{"Terms | Privacy | Contact | Returns " * 20}</footer>
+</body></html>"""
+
+
+class _ProductPageHandler(http.server.BaseHTTPRequestHandler):
+
+    latency = 0.0
+
+    def do_GET(self):
+        _sleep(self.latency)
+        if not self.path.startswith("/product/"):
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        body = render_product_page(self.path[len("/product/"):].strip("/")).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ProductSiteServer:
+    """
+    Local stand-in for the storefront; pages are generated from the URL slug.
+    """
+
+    def __init__(self, latency_ms: float = 0.0):
+        handler = type("ProductPageHandler", (_ProductPageHandler,), {"latency": latency_ms / 1000.0})
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/product/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -1,21 +1,223 @@
+import atexit
+import contextvars
+import json
 import logging
-import sys
+import logging.handlers
 import os
-from datetime import datetime
+import queue
+import random
+import threading
+import time
+from datetime import datetime, timezone
+
+from config.config import (
+    LOG_LEVEL,
+    LOG_LEVELS,
+    LOG_FORMAT,
+    LOG_QUEUE_SIZE,
+    LOG_MAX_MESSAGE_CHARS,
+    LOG_HOT_SAMPLE_RATE,
+    LOG_HOT_PER_SECOND
+)
 
 LOGS_DIR = "logs"
-os.makedirs(LOGS_DIR,exist_ok=True)
 
 LOG_FILE = os.path.join(LOGS_DIR,f"log_{datetime.now().strftime('%Y-%m-%d')}.log")
 
-logging.basicConfig(
-    filename=LOG_FILE,
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s"
+# Correlates every line logged while serving one request
+_request_id = contextvars.ContextVar("request_id", default=None)
+
+log_stats = {"dropped": 0}
+
+_listener = None
+_queue = None
+_setup_lock = threading.Lock()
+
+
+def set_request_id(request_id):
+    return _request_id.set(request_id)
+
+
+def reset_request_id(token):
+    _request_id.reset(token)
+
+
+def current_request_id():
+    return _request_id.get()
+
+
+def truncate(text: str, limit: int = LOG_MAX_MESSAGE_CHARS) -> str:
+    text = str(text)
+    if limit and len(text) > limit:
+        return f"{text[:limit]}... [{len(text) - limit} chars truncated]"
+    return text
+
+
+# --------------------------------------------------
+# Producer side (request threads)
+# --------------------------------------------------
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    Only stamps, truncates and enqueues; formatting and disk I/O happen on
+    the listener thread. A full queue drops the record rather than block.
+    """
+
+    def prepare(self, record):
+        record.request_id = _request_id.get()
+        record.msg = truncate(record.getMessage())
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_stats["dropped"] += 1
+
+
+# --------------------------------------------------
+# Writer side (listener thread)
+# --------------------------------------------------
+class JsonFormatter(logging.Formatter):
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.msg,
+            "request_id": getattr(record, "request_id", None),
+            "thread": record.threadName
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def _formatter():
+    if LOG_FORMAT == "text":
+        return logging.Formatter("%(asctime)s - %(levelname)s - %(request_id)s - %(message)s")
+    return JsonFormatter()
+
+
+def _parse_levels(spec: str) -> dict:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging():
+    """
+    Route every logger through one bounded queue to a background writer.
+    Safe to call repeatedly; call again after fork to restart the writer.
+    """
+    global _listener, _queue
+
+    with _setup_lock:
+        if _listener is not None and _listener._thread is not None and _listener._thread.is_alive():
+            return
+
+        os.makedirs(LOGS_DIR,exist_ok=True)
+
+        file_handler = logging.FileHandler(LOG_FILE, encoding="utf-8")
+        file_handler.setFormatter(_formatter())
+
+        _queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _listener = logging.handlers.QueueListener(_queue, file_handler, respect_handler_level=True)
+        _listener.start()
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if isinstance(handler, _QueueHandler):
+                root.removeHandler(handler)
+        root.addHandler(_QueueHandler(_queue))
+        root.setLevel(LOG_LEVEL.upper())
+
+        for name, level in _parse_levels(LOG_LEVELS).items():
+            logging.getLogger(name).setLevel(level)
+
+
+def shutdown_logging():
+    """
+    Flush queued records; registered at exit.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+def queue_depth() -> int:
+    return _queue.qsize() if _queue is not None else 0
+
+
+def _restart_after_fork():
+    """
+    The writer thread does not survive fork: give the child its own queue,
+    writer and file handle (records still queued in the parent stay there).
+    """
+    global _listener, _setup_lock
+
+    _setup_lock = threading.Lock()
+    if _listener is None:
+        return
+
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    setup_logging()
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_after_fork)
 
-)
 
 def get_logger(name):
-    logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    return logger
\ No newline at end of file
+    setup_logging()
+    return logging.getLogger(name)
+
+
+# --------------------------------------------------
+# Sampling for hot lines
+# --------------------------------------------------
+class LogSampler:
+    """
+    Gate for log lines emitted per item or per request: keeps a
+    `probability` share of them, and at most `per_second` per second.
+
+        if hot_log.allow(logger):
+            logger.debug("review_id=%s", review_id)
+    """
+
+    def __init__(self, probability: float = LOG_HOT_SAMPLE_RATE, per_second: float = LOG_HOT_PER_SECOND):
+        self.probability = probability
+        self.per_second = per_second
+        self._window = int(time.monotonic())
+        self._count = 0
+        self.suppressed = 0
+
+    def allow(self, logger: logging.Logger = None, level: int = logging.DEBUG) -> bool:
+        if logger is not None and not logger.isEnabledFor(level):
+            return False
+
+        if self.probability < 1.0 and random.random() >= self.probability:
+            self.suppressed += 1
+            return False
+
+        if self.per_second:
+            now = int(time.monotonic())
+            if now != self._window:
+                self._window, self._count = now, 0
+            if self._count >= self.per_second:
+                self.suppressed += 1
+                return False
+            self._count += 1
+
+        return True
@@ -0,0 +1,207 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from config.config import METRICS_ENABLED
+from common.logger import log_stats, queue_depth
+
+# Endpoint of the request the current thread is serving; work done outside
+# a request (listener, backfills, worker threads) is labelled "background"
+_endpoint = contextvars.ContextVar("metrics_endpoint", default="background")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUEST_SECONDS = Histogram(
+    "review_request_seconds",
+    "HTTP request latency",
+    ["endpoint", "method", "status"],
+    buckets=LATENCY_BUCKETS
+)
+
+STAGE_SECONDS = Histogram(
+    "review_stage_seconds",
+    "Time spent in one stage of a request (stages nest)",
+    ["endpoint", "stage"],
+    buckets=LATENCY_BUCKETS
+)
+
+STAGE_ERRORS = Counter(
+    "review_stage_errors_total",
+    "Stages that raised",
+    ["endpoint", "stage"]
+)
+
+LLM_TOKENS = Counter(
+    "review_llm_tokens_total",
+    "LLM tokens reported by the provider (estimated when it reports none)",
+    ["priority", "kind"]
+)
+
+LISTENER_EVENTS = Counter(
+    "review_listener_events_total",
+    "Change events handled by the Mongo listener",
+    ["outcome"]
+)
+
+LISTENER_LAG = Gauge(
+    "review_listener_lag_seconds",
+    "Age of the last change event processed by the Mongo listener"
+)
+
+
+# --------------------------------------------------
+# Request context
+# --------------------------------------------------
+def set_endpoint(name: str):
+    return _endpoint.set(name or "unknown")
+
+
+def reset_endpoint(token):
+    _endpoint.reset(token)
+
+
+def current_endpoint() -> str:
+    return _endpoint.get()
+
+
+# --------------------------------------------------
+# Spans
+# --------------------------------------------------
+def observe_stage(stage: str, seconds: float):
+    if METRICS_ENABLED:
+        STAGE_SECONDS.labels(_endpoint.get(), stage).observe(seconds)
+
+
+@contextmanager
+def span(stage: str):
+    """
+    Time a block as `stage` of the current endpoint:
+
+        with span("pinecone"):
+            res = index.query(...)
+    """
+    if not METRICS_ENABLED:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(_endpoint.get(), stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(_endpoint.get(), stage).observe(time.perf_counter() - start)
+
+
+def timed(stage: str):
+    """
+    Decorator form of span().
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --------------------------------------------------
+# Component stats, read at scrape time
+# --------------------------------------------------
+class StatsCollector:
+    """
+    Exposes the `stats` dicts components already keep, so counting on the
+    hot path stays a dict increment. Each source returns {field: value},
+    or {label_value: {field: value}} when registered with a `label`
+    (a tuple of label names takes tuple keys). Fields listed in `gauges`
+    are exported as gauges, the rest as counters.
+    """
+
+    def __init__(self):
+        self._sources = []
+
+    def register(self, name: str, read, gauges=(), label=None):
+        if isinstance(label, str):
+            label = (label,)
+        self._sources.append((name, read, set(gauges), tuple(label) if label else None))
+
+    def collect(self):
+        for name, read, gauges, label in self._sources:
+            try:
+                values = read()
+            except Exception:
+                continue
+
+            rows = values.items() if label else [(None, values)]
+            families = {}
+
+            for label_value, fields in rows:
+                for field, value in fields.items():
+                    if not isinstance(value, (int, float)):
+                        continue
+
+                    family = families.get(field)
+                    if family is None:
+                        metric = f"review_{name}_{field}"
+                        labels = list(label) if label else []
+                        if field in gauges:
+                            family = GaugeMetricFamily(metric, f"{name} {field}", labels=labels)
+                        else:
+                            family = CounterMetricFamily(metric, f"{name} {field}", labels=labels)
+                        families[field] = family
+
+                    if not label:
+                        label_values = []
+                    elif len(label) == 1:
+                        label_values = [str(label_value)]
+                    else:
+                        label_values = [str(v) for v in label_value]
+                    family.add_metric(label_values, value)
+
+            yield from families.values()
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+stats_collector.register("logging", lambda: {**log_stats, "queue_depth": queue_depth()}, gauges={"queue_depth"})
+
+
+def register_stats(name: str, read, gauges=(), label=None):
+    stats_collector.register(name, read, gauges=gauges, label=label)
+
+
+_scrape_registry = None
+
+
+def _registry():
+    """
+    Under gunicorn (PROMETHEUS_MULTIPROC_DIR set) histograms and counters
+    are merged across workers; component stats are those of the worker
+    answering the scrape.
+    """
+    global _scrape_registry
+
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+
+    if _scrape_registry is None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(stats_collector)
+        _scrape_registry = registry
+    return _scrape_registry
+
+
+def render_metrics():
+    """
+    (body, content_type) for the /metrics endpoint.
+    """
+    return generate_latest(_registry()), CONTENT_TYPE_LATEST
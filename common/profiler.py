@@ -0,0 +1,221 @@
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from config.config import (
+    PROFILE_ADMIN_TOKEN,
+    PROFILE_SAMPLE_RATE,
+    PROFILE_INTERVAL_MS,
+    PROFILE_DIR,
+    PROFILE_MAX_FILES
+)
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+MAX_STACK_DEPTH = 128
+TOP_FUNCTIONS = 25
+
+
+def profile_trigger(header_value):
+    """
+    "admin" when the X-Profile header carries the admin token, "sampled"
+    when the request falls in PROFILE_SAMPLE_RATE, else None. Costs a
+    comparison when off. The token is never read from the query string,
+    which ends up in access logs and browser history.
+    """
+    if is_admin(header_value):
+        return "admin"
+
+    if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+        return "sampled"
+
+    return None
+
+
+def is_admin(token) -> bool:
+    # Compared as bytes: compare_digest rejects non-ASCII str
+    return bool(
+        PROFILE_ADMIN_TOKEN and token
+        and hmac.compare_digest(token.encode("utf-8"), PROFILE_ADMIN_TOKEN.encode("utf-8"))
+    )
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    return f"{module}:{code.co_name}"
+
+
+def _folded_stack(frame) -> str:
+    labels = []
+    while frame is not None and len(labels) < MAX_STACK_DEPTH:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+# --------------------------------------------------
+# Sampler
+# --------------------------------------------------
+class RequestProfiler:
+    """
+    Samples one thread's Python stack every `interval_ms` from a helper
+    thread, so the profiled request runs unmodified (no tracing hooks).
+    start()/stop() must be called on the profiled thread: CPU time is that
+    thread's thread_time(), and wall minus CPU is time spent waiting
+    (LLM, Mongo, Pinecone, website fetch, locks).
+
+    Each sample is weighted by the time since the previous one: while the
+    request thread holds the GIL the sampler wakes late, and plain counts
+    would under-weight CPU-bound code.
+    """
+
+    def __init__(self, request_id: str, trigger: str, interval_ms: float = PROFILE_INTERVAL_MS):
+        # Profiles are stored under a server-generated id; the request id
+        # may come from the client and is kept for correlation only
+        self.profile_id = uuid.uuid4().hex
+        self.request_id = request_id
+        self.trigger = trigger
+        self.interval = interval_ms / 1000.0
+        self.stacks = Counter()     # folded stack -> seconds
+        self.samples = 0
+        self._thread_id = None
+        self._stop = threading.Event()
+        self._sampler = None
+
+    def start(self):
+        self._thread_id = threading.get_ident()
+        self.started_at = datetime.now(timezone.utc)
+        self._wall_start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+
+        self._sampler = threading.Thread(target=self._run, name=f"profiler-{self.profile_id}", daemon=True)
+        self._sampler.start()
+        return self
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                return
+            self.stacks[_folded_stack(frame)] += now - last
+            self.samples += 1
+            last = now
+            del frame
+
+    def stop(self):
+        self.wall_seconds = time.perf_counter() - self._wall_start
+        self.cpu_seconds = time.thread_time() - self._cpu_start
+        self._stop.set()
+        self._sampler.join()
+        return self
+
+    # ---------- output ----------
+    def folded(self) -> str:
+        """
+        Brendan Gregg's folded format ("a;b;c weight"), readable by
+        flamegraph.pl, speedscope and inferno. Weights are microseconds.
+        """
+        return "\n".join(
+            f"{stack} {round(seconds * 1e6)}" for stack, seconds in self.stacks.most_common()
+        ) + "\n"
+
+    def top_functions(self, limit: int = TOP_FUNCTIONS) -> list:
+        """
+        [{function, self_ms, total_ms}] by time at the top of the stack.
+        """
+        self_time, total_time = Counter(), Counter()
+        for stack, seconds in self.stacks.items():
+            frames = stack.split(";")
+            self_time[frames[-1]] += seconds
+            for label in set(frames):
+                total_time[label] += seconds
+
+        return [
+            {"function": label, "self_ms": round(seconds * 1000, 2), "total_ms": round(total_time[label] * 1000, 2)}
+            for label, seconds in self_time.most_common(limit)
+        ]
+
+    def summary(self, **context) -> dict:
+        wall_ms = self.wall_seconds * 1000
+        cpu_ms = self.cpu_seconds * 1000
+        return {
+            "profile_id": self.profile_id,
+            "request_id": self.request_id,
+            "trigger": self.trigger,
+            "started_at": self.started_at.isoformat(),
+            **context,
+            "wall_ms": round(wall_ms, 2),
+            "cpu_ms": round(cpu_ms, 2),
+            "off_cpu_ms": round(max(0.0, wall_ms - cpu_ms), 2),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "top_functions": self.top_functions()
+        }
+
+
+# --------------------------------------------------
+# Storage
+# --------------------------------------------------
+def _safe_id(profile_id: str) -> str:
+    return "".join(c for c in str(profile_id) if c.isalnum() or c in "-_")[:64]
+
+
+def save_profile(profiler: RequestProfiler, **context) -> dict:
+    """
+    Write <profile_id>.folded and <profile_id>.json under PROFILE_DIR.
+    """
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = _safe_id(profiler.profile_id)
+    summary = profiler.summary(**context)
+
+    with open(os.path.join(PROFILE_DIR, f"{name}.folded"), "w", encoding="utf-8") as f:
+        f.write(profiler.folded())
+    with open(os.path.join(PROFILE_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    _prune()
+    logger.info(
+        "Request profiled | profile_id=%s | trigger=%s | wall_ms=%.1f | cpu_ms=%.1f | samples=%d",
+        profiler.profile_id, profiler.trigger, summary["wall_ms"], summary["cpu_ms"], profiler.samples
+    )
+    return summary
+
+
+def _prune():
+    try:
+        summaries = sorted(
+            (e for e in os.scandir(PROFILE_DIR) if e.name.endswith(".json")),
+            key=lambda e: e.stat().st_mtime
+        )
+    except FileNotFoundError:
+        return
+
+    for entry in summaries[:max(0, len(summaries) - PROFILE_MAX_FILES)]:
+        for path in (entry.path, entry.path[:-len(".json")] + ".folded"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def load_profile(profile_id: str, fmt: str = "json"):
+    """
+    Stored summary (dict) or folded stacks (str); None when not on this host.
+    """
+    path = os.path.join(PROFILE_DIR, f"{_safe_id(profile_id)}.{'folded' if fmt == 'folded' else 'json'}")
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read() if fmt == "folded" else json.load(f)
+    except FileNotFoundError:
+        return None
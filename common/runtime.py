@@ -0,0 +1,76 @@
+import gc
+import os
+
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Process lifecycle for preforking servers: the master imports the app once
+# (models, compiled chains, caches), then forks workers that share those
+# pages copy-on-write.
+_prefork_hooks = []
+_postfork_hooks = []
+_share_hooks = []
+
+
+def register_prefork(fn):
+    """
+    fn() runs once in the master after the app is loaded, before workers fork.
+    """
+    _prefork_hooks.append(fn)
+    return fn
+
+
+def register_postfork(fn):
+    """
+    fn() runs in every forked child.
+    """
+    _postfork_hooks.append(fn)
+    return fn
+
+
+def register_worker_share(fn):
+    """
+    fn(workers) runs in each worker once the worker count is known, so
+    process-local limits can take their share of a global budget.
+    """
+    _share_hooks.append(fn)
+    return fn
+
+
+def apply_worker_share(workers: int):
+    workers = max(1, int(workers))
+    for fn in _share_hooks:
+        try:
+            fn(workers)
+        except Exception:
+            logger.warning("Worker share hook failed | hook=%s", getattr(fn, "__qualname__", fn), exc_info=True)
+    logger.info("Limits split across workers | pid=%d | workers=%d", os.getpid(), workers)
+
+
+def prepare_for_fork():
+    """
+    Run the prefork hooks (close connections opened while loading), then
+    move everything allocated so far out of the garbage collector's reach,
+    so collections in the workers do not write to shared pages.
+    """
+    for fn in _prefork_hooks:
+        try:
+            fn()
+        except Exception:
+            logger.warning("Prefork hook failed | hook=%s", getattr(fn, "__qualname__", fn), exc_info=True)
+
+    gc.collect()
+    gc.freeze()
+    logger.info("Ready to fork | pid=%d | frozen_objects=%d", os.getpid(), gc.get_freeze_count())
+
+
+def _after_fork_in_child():
+    for fn in _postfork_hooks:
+        try:
+            fn()
+        except Exception:
+            logger.warning("Postfork hook failed | hook=%s", getattr(fn, "__qualname__", fn), exc_info=True)
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
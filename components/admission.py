@@ -0,0 +1,177 @@
+import math
+import threading
+import time
+from collections import defaultdict
+
+from config.config import ADMISSION_ENABLED, ADMISSION_LIMITS, ADMISSION_MAX_TRACKED_WSIDS
+from common.logger import get_logger
+from common.metrics import observe_stage, register_stats
+from common.runtime import register_worker_share
+
+logger = get_logger(__name__)
+
+# Initial guess at how long a request holds its slot, per endpoint class;
+# replaced by a moving average as requests complete
+INITIAL_HOLD_SECONDS = {"interactive": 2.0, "heavy": 30.0, "ingest": 1.0, "batch": 10.0}
+HOLD_EWMA_ALPHA = 0.2
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a WSID's queue for an endpoint class is full or the
+    request waited longer than the class allows. Maps to HTTP 429.
+    """
+
+    def __init__(self, endpoint_class: str, wsid: str, reason: str, retry_after: int):
+        self.endpoint_class = endpoint_class
+        self.wsid = wsid
+        self.reason = reason
+        self.retry_after = retry_after
+        super().__init__(f"{endpoint_class} admission rejected for {wsid}: {reason}")
+
+
+class _Slot:
+    def __init__(self, lock):
+        self.active = 0
+        self.waiting = 0
+        self.cond = threading.Condition(lock)
+
+
+# --------------------------------------------------
+# Controller
+# --------------------------------------------------
+class AdmissionController:
+    """
+    One bounded, deadline-limited queue per (endpoint class, WSID), so a
+    store sweeping topics or bulk-importing only ever queues behind itself.
+    Requests over the queue cap are rejected at once; queued requests give
+    up after the class's max wait.
+    """
+
+    def __init__(self, limits: dict = ADMISSION_LIMITS, enabled: bool = ADMISSION_ENABLED):
+        self.configured_limits = limits
+        self.limits = limits
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._hold = dict(INITIAL_HOLD_SECONDS)
+        self._stats = defaultdict(lambda: {
+            "admitted": 0,
+            "rejected_queue_full": 0,
+            "rejected_timeout": 0,
+            "wait_seconds": 0.0
+        })
+
+    def set_worker_share(self, workers: int):
+        """
+        Each gunicorn worker admits its share of the per-WSID limits.
+        Rounded up, so a limit below the worker count stays 1 per worker.
+        """
+        with self._lock:
+            self.limits = {
+                name: (max(1, math.ceil(limit / workers)), max(1, math.ceil(queue / workers)), max_wait)
+                for name, (limit, queue, max_wait) in self.configured_limits.items()
+            }
+
+    def _stats_key(self, endpoint_class: str, wsid: str):
+        key = (endpoint_class, wsid)
+        if key not in self._stats and len(self._stats) >= ADMISSION_MAX_TRACKED_WSIDS:
+            key = (endpoint_class, "other")
+        return key
+
+    def _retry_after(self, endpoint_class: str, slot: _Slot, limit: int) -> int:
+        # Time for the requests ahead of this one to drain, at least a second
+        hold = self._hold.get(endpoint_class, 1.0)
+        return max(1, math.ceil(hold * (slot.waiting + 1) / max(1, limit)))
+
+    def acquire(self, endpoint_class: str, wsid: str) -> float:
+        """
+        Take a slot or raise AdmissionRejected; returns seconds queued.
+        """
+        limit, max_queue, max_wait = self.limits[endpoint_class]
+        key = (endpoint_class, wsid)
+        start = time.monotonic()
+
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is None:
+                slot = self._slots[key] = _Slot(self._lock)
+            stats = self._stats[self._stats_key(endpoint_class, wsid)]
+
+            if slot.active < limit and not slot.waiting:
+                slot.active += 1
+                stats["admitted"] += 1
+                return 0.0
+
+            if slot.waiting >= max_queue:
+                stats["rejected_queue_full"] += 1
+                raise AdmissionRejected(endpoint_class, wsid, "queue full", self._retry_after(endpoint_class, slot, limit))
+
+            slot.waiting += 1
+            deadline = start + max_wait
+            while slot.active >= limit:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    slot.waiting -= 1
+                    stats["rejected_timeout"] += 1
+                    raise AdmissionRejected(
+                        endpoint_class, wsid, "queue wait exceeded", self._retry_after(endpoint_class, slot, limit)
+                    )
+                slot.cond.wait(remaining)
+
+            slot.waiting -= 1
+            slot.active += 1
+            waited = time.monotonic() - start
+            stats["admitted"] += 1
+            stats["wait_seconds"] += waited
+
+        observe_stage("admission_wait", waited)
+        return waited
+
+    def release(self, endpoint_class: str, wsid: str, held_seconds: float = None):
+        key = (endpoint_class, wsid)
+        with self._lock:
+            if held_seconds is not None:
+                previous = self._hold.get(endpoint_class, held_seconds)
+                self._hold[endpoint_class] = previous + HOLD_EWMA_ALPHA * (held_seconds - previous)
+
+            slot = self._slots.get(key)
+            if slot is None:
+                return
+            slot.active -= 1
+            if slot.waiting:
+                slot.cond.notify()
+            elif slot.active == 0:
+                del self._slots[key]
+
+    def run(self, endpoint_class: str, wsid: str, fn):
+        """
+        fn() under the WSID's slot for `endpoint_class`.
+        """
+        if not self.enabled or endpoint_class not in self.limits:
+            return fn()
+
+        self.acquire(endpoint_class, wsid)
+        start = time.monotonic()
+        try:
+            return fn()
+        finally:
+            self.release(endpoint_class, wsid, time.monotonic() - start)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            rows = {key: dict(values) for key, values in self._stats.items()}
+            for key in rows:
+                rows[key].update(active=0, queued=0)
+            for key, slot in self._slots.items():
+                row = rows.setdefault(self._stats_key(*key), {"active": 0, "queued": 0})
+                row["active"] += slot.active
+                row["queued"] += slot.waiting
+            return rows
+
+
+admission = AdmissionController()
+
+register_worker_share(admission.set_worker_share)
+
+register_stats("admission", admission.metrics, gauges=("active", "queued"), label=("endpoint_class", "wsid"))
@@ -1,11 +1,18 @@
-from components.database import reviews_collection
-from components.embedding_worker import embed_single_review
+import argparse
 import time
 
+# Heavy imports (Mongo, Pinecone, the model) live inside the functions:
+# pool workers are spawned and re-import this module.
+
+
 def backfill_reviews():
+    from components.database import reviews_collection
+    from components.embedding_worker import embed_single_review
+    from components.embed_new_reviews import PENDING_FILTER
+
     print("🚀 Starting MongoDB → Pinecone embedding")
 
-    cursor = reviews_collection.find({"embedded": False})
+    cursor = reviews_collection.find(PENDING_FILTER)
     count = 0
 
     for review in cursor:
@@ -18,5 +25,61 @@ def backfill_reviews():
 
     print(f"🎉 Done. Total embedded: {count}")
 
+
+def backfill_reviews_parallel(workers: int = None, shard_size: int = None):
+    """
+    Shard pending reviews across a process pool; this process is the
+    single writer that upserts each encoded shard and marks it embedded.
+    """
+    from config.config import EMBED_POOL_WORKERS, EMBED_POOL_SHARD_SIZE
+    from components.database import reviews_collection
+    from components.embedding_pool import encode_in_pool
+    from components.embedding_worker import review_text, review_metadata
+    from components.embed_new_reviews import PENDING_FILTER
+    from components.vector_store import get_index, upsert_vectors, acked_ids
+
+    workers = workers or EMBED_POOL_WORKERS
+    shard_size = shard_size or EMBED_POOL_SHARD_SIZE
+
+    print(f"🚀 Starting parallel MongoDB → Pinecone embedding | workers={workers}")
+
+    pending = {}
+    for review in reviews_collection.find(PENDING_FILTER, {"_id": 0}):
+        pending[review["review_id"]] = (review_text(review), review_metadata(review))
+
+    items = ((review_id, text) for review_id, (text, _) in pending.items())
+
+    start = time.perf_counter()
+    count = 0
+
+    for encoded in encode_in_pool(items, workers=workers, shard_size=shard_size):
+        vectors = [
+            (review_id, vector, pending[review_id][1])
+            for review_id, vector in encoded
+        ]
+        embedded_ids = acked_ids(upsert_vectors(vectors, index=get_index()))
+
+        reviews_collection.update_many(
+            {"review_id": {"$in": embedded_ids}},
+            {"$set": {"embedded": True}}
+        )
+
+        count += len(embedded_ids)
+        print(f"✅ Embedded {count}/{len(pending)} reviews")
+
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed else 0.0
+    print(f"🎉 Done. Total embedded: {count} | {elapsed:.1f}s | {rate:.0f} reviews/s")
+
+
 if __name__ == "__main__":
-    backfill_reviews()
+    parser = argparse.ArgumentParser(description="Embed pending reviews into Pinecone")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="encode in a pool of N processes (0 = serial)")
+    parser.add_argument("--shard-size", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.workers:
+        backfill_reviews_parallel(workers=args.workers, shard_size=args.shard_size)
+    else:
+        backfill_reviews()
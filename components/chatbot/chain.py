@@ -1,39 +1,31 @@
 import os
 from dotenv import load_dotenv
-from pinecone import Pinecone
 from components.web_fallback import get_website_content
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from components.embeddings import embed_text
-from components.llm import load_llm
-from common.logger import get_logger
-from langchain_community.chat_message_histories import ChatMessageHistory
+from components.chatbot.rewrite_gate import rewrite_gate
+from components.retriever import fetch_reviews
+from components.keyword_index import keyword_index
+from config.config import WEB_PASSAGES_K
+from components.llm import get_llm
+from components.llm_gateway import llm_gateway
+from common.logger import get_logger, LogSampler
+from common.metrics import span
 import re
 from components.database import reviews_collection
 
 logger = get_logger(__name__)
+
+hot_log = LogSampler()
 # --------------------------------------------------
 # Setup
 # --------------------------------------------------
 
 load_dotenv()
 
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.getenv("PINECONE_INDEX"))
-
 EMBEDDING_DIM = 384  # must match Pinecone index
 
-llm = load_llm()
-
-# -----------------------------
-# Global session memory store
-# -----------------------------
-session_store = {}
-
-def get_session_history(session_id: str):
-    if session_id not in session_store:
-        session_store[session_id] = ChatMessageHistory()
-    return session_store[session_id]
+llm = get_llm()
 
 # --------------------------------------------------
 # Rewrite Prompt (Conversational Retrieval)
@@ -78,7 +70,7 @@ rewrite_prompt = PromptTemplate(
     input_variables=["history", "question"]
 )
 
-rewrite_chain = rewrite_prompt | llm | StrOutputParser()
+rewrite_chain = rewrite_prompt | llm_gateway.runnable(llm, priority="interactive") | StrOutputParser()
 
 # --------------------------------------------------
 # Prompt
@@ -148,6 +140,8 @@ prompt = PromptTemplate(
 
 parser = StrOutputParser()
 
+answer_chain = prompt | llm_gateway.runnable(llm, priority="interactive") | parser
+
 BASE_PRODUCT_URL = "https://www.swiftink.com/product/"
 
 
@@ -156,7 +150,7 @@ def generate_product_url(product_name: str):
     Convert product_name to website slug URL.
     """
 
-    logger.info("Generating product URL from product_name=%s", product_name)
+    logger.debug("Generating product URL from product_name=%s", product_name)
 
     slug = product_name.lower().strip()
     slug = slug.replace(" ", "-")
@@ -164,23 +158,45 @@ def generate_product_url(product_name: str):
 
     product_url = f"{BASE_PRODUCT_URL}{slug}/"
 
-    logger.info("Generated product URL=%s", product_url)
+    logger.debug("Generated product URL=%s", product_url)
 
     return product_url
 
+def get_website_context(wsid: str, product_id: str, product_name: str, question: str):
+    """
+    Website passages most relevant to the question, served from the local
+    keyword index. The page is only fetched when its passages are missing
+    or older than WEB_PASSAGE_TTL_HOURS.
+    """
+    if not keyword_index.web_is_fresh(wsid, product_id):
+        logger.info("Fetching website content for product: %s", product_name)
+
+        product_url = generate_product_url(product_name)
+        with span("website_fetch"):
+            content = get_website_content(product_url)
+
+        if content:
+            keyword_index.index_web_passages(wsid, product_id, product_url, content)
+
+    with span("keyword"):
+        passages = keyword_index.web_passages(wsid, product_id, question, k=WEB_PASSAGES_K)
+    return "\n\n".join(passages)
+
+
 def compute_negative_percentage(product_id: str):
     """
     Compute negative review percentage using rating <= 2.
     """
 
-    total_reviews = reviews_collection.count_documents({
-        "product_id": str(product_id)
-    })
+    with span("mongo_counts"):
+        total_reviews = reviews_collection.count_documents({
+            "product_id": str(product_id)
+        })
 
-    negative_reviews = reviews_collection.count_documents({
-        "product_id": str(product_id),
-        "rating": {"$lte": 2}
-    })
+        negative_reviews = reviews_collection.count_documents({
+            "product_id": str(product_id),
+            "rating": {"$lte": 2}
+        })
 
     if total_reviews == 0:
         return 0.0
@@ -190,7 +206,7 @@ def compute_negative_percentage(product_id: str):
         2
     )
 
-    logger.info(
+    logger.debug(
         "Negative stats | total=%d | negative=%d | percentage=%.2f%%",
         total_reviews,
         negative_reviews,
@@ -209,7 +225,7 @@ def is_negative_question(question: str):
     ]
     return any(k in q for k in keywords)
 
-def chat_with_reviews(wsid: str, product_id: str, question: str,chat_history: list = None):
+def chat_with_reviews(wsid: str, product_id: str, question: str,chat_history: list = None, history_summary: str = ""):
 
 
 
@@ -224,51 +240,39 @@ def chat_with_reviews(wsid: str, product_id: str, question: str,chat_history: li
 
     history_text = ""
 
+    if history_summary:
+        history_text += f"Earlier conversation (summary): {history_summary}\n"
+
     if chat_history:
-        for msg in chat_history[-4:]:  # limit last 8 messages
+        # The session store keeps the last CHAT_SESSION_MAX_TURNS turns and
+        # folds older ones into history_summary, so render all of them
+        for msg in chat_history:
             history_text += f"{msg['role']}: {msg['content']}\n"
 
     # --------------------------------------------------
     # Rewrite question using history (if exists)
     # --------------------------------------------------
 
-    standalone_question = question
-
-    if history_text.strip():
-        standalone_question = rewrite_chain.invoke({
-            "history": history_text,
-            "question": question
-        }).strip()
+    with span("rewrite"):
+        standalone_question = rewrite_gate.rewrite(
+            history_text,
+            question,
+            lambda history, q: rewrite_chain.invoke({
+                "history": history,
+                "question": q
+            })
+        )
 
     logger.info(f"Standalone question: {standalone_question}")
 
     # --------------------------------------------------
-    # Embed rewritten question
-    # --------------------------------------------------
-
-    query_embedding = embed_text(question)
-    logger.info("Embedding generated using ORIGINAL user question")
-    # --------------------------------------------------
-    # Step 2: Query Pinecone
+    # Step 2: Hybrid retrieval (Pinecone + BM25, fused)
     # --------------------------------------------------
-    res = index.query(
-        vector=query_embedding,
-        top_k=5,
-        filter={
-            "WSID": str(wsid),
-            "product_id": str(product_id)
-        },
-        include_metadata=True
-    )
-
-    top_score = res.matches[0].score if res.matches else 0.0
-
-    logger.info(
-        "Pinecone query completed | fetched_docs=%d | top_score=%.4f",
-        len(res.matches),
-        top_score
-    )
+    # Embedded using the ORIGINAL user question
+    with span("retrieve"):
+        docs = fetch_reviews(question, wsid, product_id, k=5)
 
+    logger.debug("Hybrid retrieval completed | fetched_docs=%d", len(docs))
 
     # --------------------------------------------------
     # Step 3: Extract reviews
@@ -277,39 +281,29 @@ def chat_with_reviews(wsid: str, product_id: str, question: str,chat_history: li
     reviews_for_ui = []
 
     product_name = None
-    for i, m in enumerate(res.matches, start=1):
-        review_text = m.metadata.get("review_text") or m.metadata.get("text")
-        rating = m.metadata.get("rating")
-        
-            
+    for i, doc in enumerate(docs, start=1):
+        review_text = doc.page_content
+        rating = doc.metadata.get("rating")
 
         if not product_name:
-            product_name = m.metadata.get("product_name")
-            logger.info("Product name extracted from metadata: %s", product_name)
-
-        logger.info(
-            "DOC_%d | score=%.4f | has_text=%s",
-            i,
-            (m.score or 0.0),
-            bool(review_text)
-        )
-        if not product_name:
-            logger.warning("No product_name found in Pinecone metadata")
-        
-        if review_text:
-            reviews_for_llm.append(review_text)
-            reviews_for_ui.append({
-                "review_text": review_text,
-                "rating": rating,
-                "product_name": product_name
-            })
+            product_name = doc.metadata.get("product_name")
+
+        if hot_log.allow(logger):
+            logger.debug("DOC_%d | id=%s | has_text=%s", i, doc.id, bool(review_text))
+
+        reviews_for_llm.append(review_text)
+        reviews_for_ui.append({
+            "review_text": review_text,
+            "rating": rating,
+            "product_name": product_name
+        })
 
     if product_name:
-        logger.info("Product name extracted from metadata: %s", product_name)
+        logger.debug("Product name extracted from metadata: %s", product_name)
     else:
         logger.warning("No product_name found in Pinecone metadata")
 
-    logger.info(
+    logger.debug(
         "Review extraction completed | usable_reviews=%d",
         len(reviews_for_llm)
     )
@@ -317,7 +311,7 @@ def chat_with_reviews(wsid: str, product_id: str, question: str,chat_history: li
 
     reviews_context = "\n\n".join(reviews_for_llm) if reviews_for_llm else ""
 
-    logger.info(
+    logger.debug(
         "Reviews context prepared | reviews_used=%d | chars=%d",
         len(reviews_for_llm),
         len(reviews_context)
@@ -325,19 +319,13 @@ def chat_with_reviews(wsid: str, product_id: str, question: str,chat_history: li
     website_context = ""
 
     if product_name:
-        logger.info("Fetching website content for product: %s", product_name)
-
-        product_url = generate_product_url(product_name)
-        website_context = get_website_content(product_url)
+        with span("website"):
+            website_context = get_website_context(wsid, product_id, product_name, standalone_question)
 
         if website_context:
-            logger.info(
-                "Website content ready | url=%s | chars=%d",
-                product_url,
-                len(website_context)
-            )
+            logger.debug("Website passages ready | chars=%d", len(website_context))
         else:
-            logger.warning("Website content empty for url=%s", product_url)
+            logger.warning("Website content empty for product: %s", product_name)
     else:
         logger.warning("Product name missing. Website context skipped.")
 
@@ -346,7 +334,7 @@ def chat_with_reviews(wsid: str, product_id: str, question: str,chat_history: li
     # --------------------------------------------------
     # context = "\n\n".join(reviews_for_llm)
 
-    logger.info(
+    logger.debug(
         "Context built for LLM | reviews_used=%d | context_chars=%d",
         len(reviews_for_llm),
         len(reviews_context)
@@ -361,21 +349,18 @@ def chat_with_reviews(wsid: str, product_id: str, question: str,chat_history: li
     # --------------------------------------------------
     # Step 5: Call LLM
     # --------------------------------------------------
-    logger.info("Calling LLM using combined Reviews + Website context")
-
-    answer = (
-        prompt
-        | llm
-        | StrOutputParser()
-    ).invoke({
-        "history": history_text,
-        "reviews_context": reviews_context,
-        "website_context": website_context,
-        "question": standalone_question,
-        "negative_percentage": negative_percentage
-    }).strip()
-
-    logger.info("LLM response received")
+    logger.debug("Calling LLM using combined Reviews + Website context")
+
+    with span("answer"):
+        answer = answer_chain.invoke({
+            "history": history_text,
+            "reviews_context": reviews_context,
+            "website_context": website_context,
+            "question": standalone_question,
+            "negative_percentage": negative_percentage
+        }).strip()
+
+    logger.debug("LLM response received")
 
     # --------------------------------------------------
     # Step 6: Validate answer
@@ -0,0 +1,142 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+from common.logger import get_logger
+from common.metrics import register_stats
+
+logger = get_logger(__name__)
+
+REWRITE_CACHE_SIZE = 2048
+
+# --------------------------------------------------
+# Rules for unresolved references
+# --------------------------------------------------
+PRONOUNS = {
+    "it", "its", "it's", "that", "those", "these", "they", "them",
+    "their", "theirs", "one", "ones", "he", "she", "him", "her"
+}
+
+ORDINALS = {
+    "first", "second", "third", "fourth", "former", "latter",
+    "previous", "above", "mentioned", "other", "same"
+}
+
+REFERENCE_PHRASES = re.compile(
+    r"\b(that one|this one|which one|the last one|the other one|"
+    r"what about|how about|and the|same one|compared to that)\b"
+)
+
+FOLLOW_UP_START = re.compile(r"^(and|also|but|so|what about|how about)\b")
+
+TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+
+def needs_rewrite(question: str) -> bool:
+    """
+    True when the question contains references that only make sense
+    with the conversation history (pronouns, ordinals, "that one"...).
+    """
+    q = question.lower().strip()
+    tokens = TOKEN_RE.findall(q)
+
+    if not tokens:
+        return False
+
+    if REFERENCE_PHRASES.search(q) or FOLLOW_UP_START.search(q):
+        return True
+
+    if any(t in PRONOUNS or t in ORDINALS for t in tokens):
+        return True
+
+    # Fragments like "and cyan?" or "price?" lean on earlier turns
+    return len(tokens) <= 2
+
+
+# --------------------------------------------------
+# Rewrite cache + hit-rate accounting
+# --------------------------------------------------
+class RewriteGate:
+
+    def __init__(self, max_entries: int = REWRITE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "requests": 0,
+            "skipped": 0,       # standalone, no LLM call
+            "cache_hits": 0,
+            "llm_rewrites": 0
+        }
+
+    @staticmethod
+    def cache_key(history_text: str, question: str):
+        history_hash = hashlib.sha1(history_text.encode("utf-8")).hexdigest()
+        return history_hash, " ".join(question.lower().split())
+
+    def rewrite(self, history_text: str, question: str, rewrite_fn) -> str:
+        """
+        Return a standalone question, calling `rewrite_fn(history, question)`
+        only when the rules detect unresolved references and the cache misses.
+        """
+        self.stats["requests"] += 1
+
+        if not history_text.strip() or not needs_rewrite(question):
+            self.stats["skipped"] += 1
+            self._log_stats("skipped")
+            return question
+
+        key = self.cache_key(history_text, question)
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.stats["cache_hits"] += 1
+
+        if cached is not None:
+            self._log_stats("cache_hit")
+            return cached
+
+        rewritten = rewrite_fn(history_text, question).strip() or question
+        self.stats["llm_rewrites"] += 1
+
+        with self._lock:
+            self._cache[key] = rewritten
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        self._log_stats("llm")
+        return rewritten
+
+    def hit_rate(self) -> float:
+        """
+        Share of requests answered without an LLM rewrite call.
+        """
+        total = self.stats["requests"]
+        if not total:
+            return 0.0
+        return (self.stats["skipped"] + self.stats["cache_hits"]) / total
+
+    def _log_stats(self, outcome: str):
+        # Per request, so DEBUG only; totals are on /metrics (register_stats below)
+        logger.debug(
+            "Rewrite gate | outcome=%s | requests=%d | skipped=%d | cache_hits=%d | llm=%d | hit_rate=%.2f",
+            outcome,
+            self.stats["requests"],
+            self.stats["skipped"],
+            self.stats["cache_hits"],
+            self.stats["llm_rewrites"],
+            self.hit_rate()
+        )
+
+
+rewrite_gate = RewriteGate()
+
+register_stats(
+    "rewrite_gate",
+    lambda: {**rewrite_gate.stats, "cache_entries": len(rewrite_gate._cache), "hit_rate": rewrite_gate.hit_rate()},
+    gauges=("cache_entries", "hit_rate")
+)
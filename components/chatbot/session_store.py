@@ -0,0 +1,164 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from config.config import (
+    CHAT_SESSION_BACKEND,
+    CHAT_SESSION_TTL_SECONDS,
+    CHAT_SESSION_MAX_SESSIONS,
+    CHAT_SESSION_MAX_TURNS,
+    CHAT_SUMMARY_MAX_CHARS
+)
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+# --------------------------------------------------
+# Rolling summary of turns that fall out of the window
+# --------------------------------------------------
+def _first_sentence(text: str, limit: int = 160) -> str:
+    text = " ".join((text or "").split())
+    for sep in (". ", "? ", "! "):
+        if sep in text:
+            text = text.split(sep, 1)[0] + sep.strip()
+            break
+    return text[:limit]
+
+
+def compress_turns(summary: str, evicted: list, max_chars: int = CHAT_SUMMARY_MAX_CHARS) -> str:
+    """
+    Fold evicted messages into a bounded plain-text summary.
+    Oldest parts are dropped first once the summary exceeds `max_chars`.
+    """
+    parts = [p for p in (summary or "").split(" | ") if p]
+
+    for msg in evicted:
+        prefix = "User asked" if msg["role"] == "user" else "Assistant said"
+        parts.append(f"{prefix}: {_first_sentence(msg['content'])}")
+
+    while parts and len(" | ".join(parts)) > max_chars:
+        parts.pop(0)
+
+    return " | ".join(parts)
+
+
+def _apply_turn(state: dict, question: str, answer: str, max_turns: int) -> dict:
+    messages = state["messages"] + [
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": answer}
+    ]
+
+    overflow = len(messages) - max_turns * 2
+    if overflow > 0:
+        state["summary"] = compress_turns(state["summary"], messages[:overflow])
+        messages = messages[overflow:]
+
+    state["messages"] = messages
+    return state
+
+
+def _empty_state() -> dict:
+    return {"messages": [], "summary": ""}
+
+
+# --------------------------------------------------
+# Backends
+# --------------------------------------------------
+class InMemorySessionStore:
+    """
+    LRU + TTL session store for tests and single-process development.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = CHAT_SESSION_MAX_SESSIONS,
+        ttl_seconds: int = CHAT_SESSION_TTL_SECONDS,
+        max_turns: int = CHAT_SESSION_MAX_TURNS
+    ):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_turns = max_turns
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> dict:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return _empty_state()
+
+            expires_at, state = entry
+            if expires_at < time.monotonic():
+                del self._sessions[session_id]
+                return _empty_state()
+
+            self._sessions.move_to_end(session_id)
+            return {"messages": list(state["messages"]), "summary": state["summary"]}
+
+    def append_turn(self, session_id: str, question: str, answer: str):
+        state = self.load(session_id)
+        state = _apply_turn(state, question, answer, self.max_turns)
+
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic() + self.ttl_seconds, state)
+            self._sessions.move_to_end(session_id)
+
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def clear(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class MongoSessionStore:
+    """
+    Mongo-backed session store shared by all workers.
+    Expiry is handled by the TTL index on `updated_at`.
+    """
+
+    def __init__(self, collection, max_turns: int = CHAT_SESSION_MAX_TURNS):
+        self.collection = collection
+        self.max_turns = max_turns
+
+    def load(self, session_id: str) -> dict:
+        doc = self.collection.find_one(
+            {"_id": session_id},
+            {"_id": 0, "messages": 1, "summary": 1}
+        )
+        if not doc:
+            return _empty_state()
+
+        return {"messages": doc.get("messages", []), "summary": doc.get("summary", "")}
+
+    def append_turn(self, session_id: str, question: str, answer: str):
+        state = _apply_turn(self.load(session_id), question, answer, self.max_turns)
+
+        self.collection.update_one(
+            {"_id": session_id},
+            {"$set": {
+                "messages": state["messages"],
+                "summary": state["summary"],
+                "updated_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+
+    def clear(self, session_id: str):
+        self.collection.delete_one({"_id": session_id})
+
+
+def create_session_store(backend: str = CHAT_SESSION_BACKEND):
+    if backend == "memory":
+        logger.info("Using in-memory chat session store")
+        return InMemorySessionStore()
+
+    from components.database import chat_sessions
+
+    logger.info("Using Mongo chat session store")
+    return MongoSessionStore(chat_sessions)
+
+
+session_store = create_session_store()
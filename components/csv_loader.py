@@ -1,32 +1,97 @@
+import csv
 import os
 import warnings
 from pathlib import Path
 from langchain_community.document_loaders.csv_loader import CSVLoader
+from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from common.custom_exception import CustomException
 from common.logger import get_logger
-from config.config import CHUNK_OVERLAP, CHUNK_SIZE
-from components.database import reviews_collection
-import uuid
+from config.config import CHUNK_OVERLAP, CHUNK_SIZE, CSV_CHUNK_SIZE
+from components.dedup import annotate_near_duplicates, credit_duplicates, create_near_duplicate_index
+from components.review_records import normalize_review_frame, normalize_product_id
+import pandas as pd
+import time
+from pymongo import UpdateOne
 
 logger = get_logger(__name__)
-def load_csv_to_db(df):
-    records = []
 
-    for _, row in df.iterrows():
-        records.append({
-            "review_id": str(uuid.uuid4()),
-            "wsid": row["WSID"],                 # 🔴 CAPS FIX
-            "product_id": str(row["product_id"]),
-            "product_name": row["product_name"],
-            "review_title": row["review_title"],
-            "review_text": row["review_text"],
-            "rating": int(row["rating"]),
-            "embedded": False
-        })
+def insert_review_records(records, dedup_index=None):
+    """
+    Idempotent insert keyed on the content-addressed review_id: rows that
+    already exist are skipped before dedup and never rewritten, so their
+    `embedded` / topic state is kept. Returns the records actually added.
+    """
+    # Imported here so parsing helpers below don't need a Mongo connection
+    from components.database import reviews_collection
+    from components.keyword_index import keyword_index
+
+    if not records:
+        return []
+
+    existing = set()
+    ids = [r["review_id"] for r in records]
+    for i in range(0, len(ids), 10000):
+        existing.update(
+            d["review_id"]
+            for d in reviews_collection.find({"review_id": {"$in": ids[i:i + 10000]}}, {"_id": 0, "review_id": 1})
+        )
+
+    seen = set()
+    new_records = []
+    for r in records:
+        if r["review_id"] in existing or r["review_id"] in seen:
+            continue
+        seen.add(r["review_id"])
+        new_records.append(r)
+
+    if len(new_records) < len(records):
+        logger.info(f"Skipped {len(records) - len(new_records)} already-imported reviews")
+
+    if not new_records:
+        return []
+
+    existing_links = annotate_near_duplicates(new_records, dedup_index)
+
+    # $setOnInsert keeps concurrent imports of the same file harmless
+    result = reviews_collection.bulk_write(
+        [
+            UpdateOne({"review_id": r["review_id"]}, {"$setOnInsert": r}, upsert=True)
+            for r in new_records
+        ],
+        ordered=False
+    )
+    # Ops that matched instead of upserting lost a race with another import
+    credit_duplicates(existing_links, (new_records[i]["review_id"] for i in result.upserted_ids))
+    keyword_index.index_reviews(new_records)
 
-    if records:
-        reviews_collection.insert_many(records)
+    return new_records
+
+
+def load_csv_to_db(df, dedup_index=None):
+    records = normalize_review_frame(df).to_dict("records")
+    return len(insert_review_records(records, dedup_index))
+
+
+def load_csv_file_to_db(file_path, chunksize: int = CSV_CHUNK_SIZE):
+    """
+    Stream a (possibly multi-GB) review export into Mongo chunk by chunk,
+    so memory stays bounded by `chunksize` rows.
+    """
+    dedup_index = create_near_duplicate_index()
+    start = time.perf_counter()
+    total = 0
+
+    for chunk in iter_csv_chunks(file_path, chunksize):
+        total += load_csv_to_db(chunk, dedup_index)
+
+        elapsed = time.perf_counter() - start
+        logger.info(
+            f"CSV ingest progress | file={file_path} | rows={total} | rows_per_sec={total / elapsed:.0f}"
+        )
+
+    logger.info(f"CSV ingest done | file={file_path} | rows={total} | seconds={time.perf_counter() - start:.1f}")
+    return total
 
 
         
@@ -51,154 +116,225 @@ def basic_csv_load(file_path):
         logger.error(f"An unexpected error occurred while loading CSV: {e}")
         return []
 
-def specialized_csv_load(file_path, content_columns, metadata_columns=None):
+ENCODING_SAMPLE_BYTES = 64 * 1024
+
+
+def detect_encoding(path, sample_bytes: int = ENCODING_SAMPLE_BYTES) -> str:
     """
-    Loads a CSV and handles specific columns for content and metadata.
-    Args:
-        file_path: Path to your .csv file or a directory containing .csv files.
-        content_columns: A list of column names to include in the page_content.
-        metadata_columns: A list of column names to keep as metadata.
+    Pick an encoding from a byte sample instead of re-parsing the whole file.
     """
+    with open(path, "rb") as f:
+        sample = f.read(sample_bytes)
+
+    if sample.startswith(b"\xef\xbb\xbf"):
+        return "utf-8-sig"
+
     try:
-        all_docs = []
-        paths_to_process = []
-        
-        # Using .resolve() to get absolute path and handle cross-platform separators
-        base_path = Path(file_path).resolve()
-
-        if not base_path.exists():
-            # Fallback check: if 'data/datas' was meant to be 'data/datas.csv'
-            if not base_path.suffix and base_path.with_suffix('.csv').exists():
-                base_path = base_path.with_suffix('.csv')
-                logger.info(f"Path did not exist, but found matching .csv: {base_path}")
-            else:
-                logger.error(f"Path does not exist: {file_path} (Resolved: {base_path})")
-                return []
-
-        # Handle Directory vs File logic
-        if base_path.is_dir():
-            logger.info(f"Path is a directory. Searching for CSVs in: {base_path}")
-            paths_to_process = list(base_path.glob("*.csv"))
-            if not paths_to_process:
-                # Fallback: check all files in directory if no .csv found
-                paths_to_process = [f for f in base_path.iterdir() if f.is_file()]
-        else:
-            paths_to_process = [base_path]
+        sample.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # A multi-byte character cut off by the sample boundary is still UTF-8
+        if len(sample) == sample_bytes and e.start >= len(sample) - 3:
+            return "utf-8"
 
-        if not paths_to_process:
-            logger.warning(f"No files found to process at path: {base_path}")
-            return []
+    try:
+        sample.decode("cp1252")
+        return "cp1252"
+    except UnicodeDecodeError:
+        return "latin-1"
 
-    except Exception as e:
-        logger.error(f"Error while scanning directory/file: {e}")
-        return []
 
-    for p in paths_to_process:
-        str_path = str(p.absolute())
+def _row_metadata(row: dict, metadata_columns=None) -> dict:
+    metadata = {}
+
+    if row.get("WSID"):
+        metadata["WSID"] = row["WSID"].strip()
+
+    if row.get("product_id"):
+        metadata["product_id"] = normalize_product_id(row["product_id"])
+
+    if row.get("rating"):
         try:
-            logger.info(f"Processing file: {str_path}")
-            
-            # Encapsulating the load in different encodings to handle Excel/Windows CSVs
-            encodings = ['utf-8-sig', 'utf-8', 'latin-1', 'cp1252']
-            data = None
-            last_error = ""
-
-            for enc in encodings:
-                try:
-                    loader = CSVLoader(
-                        file_path=str_path,
-                        encoding=enc,
-                        csv_args={
-                            'delimiter': ',',
-                            'quotechar': '"'
-                        }
-                    )
-                    data = loader.load()
-                    if data:
-                        logger.info(f"Successfully loaded file using {enc} encoding.")
-                        break
-                except Exception as encoding_err:
-                    last_error = str(encoding_err)
+            metadata["rating"] = int(float(row["rating"]))
+        except ValueError:
+            metadata["rating"] = row["rating"]
+
+    if row.get("product_name"):
+        metadata["product_name"] = row["product_name"].strip()
+
+    store_name = row.get("Store name") or row.get("store_name")
+    if store_name:
+        metadata["store_name"] = store_name.strip()
+
+    if row.get("review_date"):
+        metadata["review_date"] = row["review_date"].strip()
+
+    for column in metadata_columns or []:
+        if column not in metadata and row.get(column):
+            metadata[column] = row[column]
+
+    return metadata
+
+
+# Tried in order when the sampled encoding fails further into a file;
+# latin-1 decodes any byte
+FALLBACK_ENCODINGS = ["cp1252", "latin-1"]
+
+
+def iter_with_encoding_fallback(path, read):
+    """
+    Yield from `read(path, encoding)` with the encoding guessed from a
+    sample. If a later byte does not decode, the file is read again with
+    the next fallback, resuming after the items already yielded.
+    """
+    encoding = detect_encoding(path)
+    fallbacks = [e for e in FALLBACK_ENCODINGS if e != encoding]
+    yielded = 0
+
+    while True:
+        logger.info(f"Streaming CSV | file={path} | encoding={encoding} | skip={yielded}")
+        try:
+            for item_no, item in enumerate(read(path, encoding)):
+                if item_no < yielded:
                     continue
-            
-            if data is None:
-                raise Exception(f"Failed to parse CSV with standard encodings. Last error: {last_error}")
-
-            # Manual filtering logic to strictly control page_content
-            if content_columns and data:
-                # for doc in data:
-                #     lines = doc.page_content.split('\n')
-                #     filtered_lines = []
-                #     for line in lines:
-                #         if ':' in line:
-                #             # Split on first colon to get header
-                #             header = line.split(':', 1)[0].strip()
-                #             if header in content_columns:
-                #                 filtered_lines.append(line)
-                    
-                #     doc.page_content = "\n".join(filtered_lines)
-            
-                for doc in data:
-                    lines = doc.page_content.split('\n')
+                yield item
+                yielded += 1
+            return
+
+        except UnicodeDecodeError as e:
+            if not fallbacks:
+                raise
+            logger.warning(
+                f"CSV not {encoding} past the sample, retrying | file={path} | done={yielded} | error={e}"
+            )
+            encoding = fallbacks.pop(0)
+
+
+def _read_csv_documents(path, encoding, content_columns, metadata_columns=None):
+    with open(path, newline="", encoding=encoding) as f:
+        for row in csv.DictReader(f):
+            content_lines = [
+                f"{column}: {(row.get(column) or '').strip()}"
+                for column in content_columns
+                if column in row
+            ]
 
-                    content_lines = []
-                    metadata = {}
+            yield Document(
+                page_content="\n".join(content_lines),
+                metadata=_row_metadata(row, metadata_columns)
+            )
 
-                    for line in lines:
-                        if ':' not in line:
-                            continue
 
-                        key, value = line.split(':', 1)
-                        key = key.strip()
-                        value = value.strip()
+def iter_csv_documents(path, content_columns, metadata_columns=None):
+    """
+    Stream one CSV as Documents: one pass, csv.DictReader, columns mapped
+    straight to page_content / metadata (review text may contain ':' or newlines).
+    """
+    return iter_with_encoding_fallback(
+        path, lambda p, encoding: _read_csv_documents(p, encoding, content_columns, metadata_columns)
+    )
 
-                        # Content columns → page_content
-                        if key in content_columns:
-                            content_lines.append(f"{key}: {value}")
 
-                        # Metadata columns → metadata dict
-                        if key == "WSID":
-                            metadata["WSID"] = value
+def _read_csv_chunks(path, encoding, chunksize):
+    with pd.read_csv(path, chunksize=chunksize, dtype=str, encoding=encoding) as reader:
+        yield from reader
 
-                        elif key == "product_id":
-                            try:
-                                metadata["product_id"] = int(value)
-                            except:
-                                metadata["product_id"] = value
 
-                        elif key == "rating":
-                            try:
-                                metadata["rating"] = int(value)
-                            except:
-                                metadata["rating"] = value
+def iter_csv_chunks(path, chunksize: int = CSV_CHUNK_SIZE):
+    """
+    DataFrames of `chunksize` rows (all columns str), with the same
+    encoding detection and fallback as iter_csv_documents.
+    """
+    return iter_with_encoding_fallback(path, lambda p, encoding: _read_csv_chunks(p, encoding, chunksize))
 
-                        elif key == "product_name":
-                            metadata["product_name"] = value
 
-                        elif key in ["Store name", "store_name"]:
-                            metadata["store_name"] = value
+def resolve_csv_paths(file_path):
+    """
+    A .csv file, a directory of CSVs, or a path missing its .csv suffix.
+    """
+    # Using .resolve() to get absolute path and handle cross-platform separators
+    base_path = Path(file_path).resolve()
 
-                        elif key == "review_date":
-                            metadata["review_date"] = value
+    if not base_path.exists():
+        # Fallback check: if 'data/datas' was meant to be 'data/datas.csv'
+        if not base_path.suffix and base_path.with_suffix('.csv').exists():
+            base_path = base_path.with_suffix('.csv')
+            logger.info(f"Path did not exist, but found matching .csv: {base_path}")
+        else:
+            logger.error(f"Path does not exist: {file_path} (Resolved: {base_path})")
+            return []
+
+    # Handle Directory vs File logic
+    if base_path.is_dir():
+        logger.info(f"Path is a directory. Searching for CSVs in: {base_path}")
+        paths_to_process = sorted(base_path.glob("*.csv"))
+        if not paths_to_process:
+            # Fallback: check all files in directory if no .csv found
+            paths_to_process = [f for f in base_path.iterdir() if f.is_file()]
+        return paths_to_process
 
-                    # Final assignment
-                    doc.page_content = "\n".join(content_lines)
-                    doc.metadata = metadata
-            logger.debug(f"Metadata assigned: {doc.metadata}")
+    return [base_path]
 
-            all_docs.extend(data)
-            logger.info(f"Successfully processed {len(data)} rows from {p.name}")
 
+def iter_specialized_csv(file_path, content_columns, metadata_columns=None):
+    """
+    Lazily yield Documents from every CSV under `file_path`.
+    A file that fails part-way is logged and skipped.
+    """
+    try:
+        paths_to_process = resolve_csv_paths(file_path)
+    except Exception as e:
+        logger.error(f"Error while scanning directory/file: {e}")
+        return
+
+    if not paths_to_process:
+        logger.warning(f"No files found to process at path: {file_path}")
+        return
+
+    total = 0
+    for p in paths_to_process:
+        count = 0
+        try:
+            for doc in iter_csv_documents(p, content_columns, metadata_columns):
+                count += 1
+                yield doc
+            logger.info(f"Successfully processed {count} rows from {p.name}")
         except Exception as e:
-            logger.error(f"Failed to load file {str_path}: {str(e)}")
-            continue
+            logger.error(f"Failed to load file {p} after {count} rows: {str(e)}")
+        total += count
 
-    if not all_docs:
+    if not total:
         logger.warning(f"Specialized CSV load resulted in 0 documents from {len(paths_to_process)} files.")
     else:
-        logger.info(f"Specialized CSV load completed. Total documents: {len(all_docs)}")
-        
-    return all_docs
+        logger.info(f"Specialized CSV load completed. Total documents: {total}")
+
+
+def specialized_csv_load(file_path, content_columns, metadata_columns=None):
+    """
+    Loads a CSV and handles specific columns for content and metadata.
+    Args:
+        file_path: Path to your .csv file or a directory containing .csv files.
+        content_columns: A list of column names to include in the page_content.
+        metadata_columns: A list of column names to keep as metadata.
+    Prefer iter_specialized_csv() for large inputs; this materializes the list.
+    """
+    return list(iter_specialized_csv(file_path, content_columns, metadata_columns))
+
+def _text_splitter():
+    return RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP
+    )
+
+
+def iter_text_chunks(documents):
+    """
+    Streaming variant of create_text_chunks: splits one document at a time.
+    """
+    text_splitter = _text_splitter()
+    for doc in documents:
+        yield from text_splitter.split_documents([doc])
+
 
 def create_text_chunks(documents):
     """
@@ -209,10 +345,7 @@ def create_text_chunks(documents):
         return []
         
     try:
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=CHUNK_SIZE,
-            chunk_overlap=CHUNK_OVERLAP
-        )
+        text_splitter = _text_splitter()
 
         text_chunks = text_splitter.split_documents(documents)
         logger.info(f"Generated {len(text_chunks)} text chunks.")
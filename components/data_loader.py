@@ -1,5 +1,5 @@
 import os
-from components.csv_loader import specialized_csv_load,create_text_chunks
+from components.csv_loader import iter_specialized_csv, iter_text_chunks
 from components.vector_store import save_vector_store
 from dotenv import load_dotenv
 load_dotenv()
@@ -14,11 +14,13 @@ def process_and_store_pdfs():
     try:
         logger.info("Making the vector store.....")
 
-        documents = specialized_csv_load("data/datas",content_columns=column_to_index)
+        # Parse → split → embed/upload as one stream; nothing is held in full
+        documents = iter_specialized_csv("data/datas",content_columns=column_to_index)
 
-        text_chunks = create_text_chunks(documents)
+        text_chunks = iter_text_chunks(documents)
 
-        save_vector_store(text_chunks)
+        if save_vector_store(text_chunks) is None:
+            raise CustomException("Failed to save vector store")
 
         logger.info("Vector store created successfullly")
 
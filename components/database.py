@@ -1,11 +1,22 @@
 from pymongo import MongoClient
+from pymongo.errors import OperationFailure
 import os
+from config.config import CHAT_SESSION_TTL_SECONDS
+from common.runtime import register_prefork
+from common.logger import get_logger
+
+logger = get_logger(__name__)
 
 MONGO_URI = os.getenv("MONGO_URI", "mongodb://localhost:27017")
 MONGO_DB_NAME = os.getenv("MONGO_DB_NAME", "review_db")
 client = MongoClient(MONGO_URI)
 db = client[MONGO_DB_NAME]
 
+# The index builds below run in the preforking master. Closing there drops
+# its sockets and monitor threads; the client reconnects lazily in each
+# worker on first use.
+register_prefork(client.close)
+
 reviews_collection = db["reviews"]
 
 # Indexes (VERY IMPORTANT)
@@ -13,6 +24,17 @@ reviews_collection.create_index(
     [("wsid", 1), ("product_id", 1)]
 )
 reviews_collection.create_index("embedded")
+
+# Collections loaded before review ids were unique may hold duplicates, and
+# the build then fails. Log it rather than stop every process; the
+# migration reports and removes the conflicts
+try:
+    reviews_collection.create_index("review_id", unique=True)
+except OperationFailure:
+    logger.error(
+        "Unique review_id index not built; run python -m components.migrate_review_ids",
+        exc_info=True
+    )
   
 topic_store = db["topic_store"]
 processed_reviews = db["processed_reviews"]
@@ -32,4 +54,50 @@ processed_reviews.create_index(
 embedding_cache.create_index(
     [("text", 1)],
     unique=True
-)
\ No newline at end of file
+)
+
+chat_sessions = db["chat_sessions"]
+
+# Idle chat sessions expire on their own
+chat_sessions.create_index(
+    "updated_at",
+    expireAfterSeconds=CHAT_SESSION_TTL_SECONDS
+)
+
+inflight_requests = db["inflight_requests"]
+
+# Leases and shared results are removed once expired
+inflight_requests.create_index("expires_at", expireAfterSeconds=0)
+
+product_summaries = db["product_summaries"]
+
+product_summaries.create_index(
+    [("wsid", 1), ("product_id", 1)],
+    unique=True
+)
+
+partial_summaries = db["partial_summaries"]
+
+partial_summaries.create_index(
+    [("wsid", 1), ("product_id", 1)]
+)
+
+near_dup_index = db["near_dup_index"]
+
+# One document per duplicate cluster, looked up by LSH band keys
+near_dup_index.create_index(
+    [("wsid", 1), ("product_id", 1), ("bands", 1)]
+)
+reviews_collection.create_index("canonical_id")
+
+keyword_docs = db["keyword_docs"]
+
+# BM25 term vectors per product; indexed_at drives incremental reloads
+keyword_docs.create_index(
+    [("wsid", 1), ("product_id", 1), ("doc_id", 1)],
+    unique=True
+)
+keyword_docs.create_index(
+    [("wsid", 1), ("product_id", 1), ("indexed_at", 1)]
+)
+topic_store.create_index("review_ids")
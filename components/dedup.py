@@ -0,0 +1,241 @@
+import hashlib
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+from pymongo.errors import BulkWriteError
+
+from config.config import DEDUP_JACCARD_THRESHOLD
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+
+# Universal hashing (a * x + b) mod p with p = 2^31 - 1 keeps every product
+# inside int64, so the whole signature is one vectorized numpy expression.
+_PRIME = (1 << 31) - 1
+_rng = np.random.RandomState(1234)
+_A = _rng.randint(1, _PRIME, size=NUM_PERM, dtype=np.int64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM, dtype=np.int64)
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+# --------------------------------------------------
+# Signatures
+# --------------------------------------------------
+def shingles(text: str, k: int = SHINGLE_SIZE) -> set:
+    tokens = TOKEN_RE.findall((text or "").lower())
+    if not tokens:
+        return set()
+    if len(tokens) <= k:
+        return {" ".join(tokens)}
+    return {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+
+
+def minhash(text: str):
+    grams = shingles(text)
+    if not grams:
+        return None
+
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.int64, count=len(grams))
+    hashes %= _PRIME
+    signature = ((_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME).min(axis=1)
+    return signature.tolist()
+
+
+def band_keys(signature: list) -> list:
+    return [
+        f"{i}:" + hashlib.md5(repr(signature[i * ROWS:(i + 1) * ROWS]).encode()).hexdigest()[:16]
+        for i in range(BANDS)
+    ]
+
+
+def similarity(sig_a: list, sig_b: list) -> float:
+    """
+    Estimated Jaccard similarity of the shingle sets.
+    """
+    return sum(1 for a, b in zip(sig_a, sig_b) if a == b) / NUM_PERM
+
+
+def review_dedup_text(review: dict) -> str:
+    return f"{review.get('review_title') or ''} {review.get('review_text') or ''}"
+
+
+# --------------------------------------------------
+# Per-product index
+# --------------------------------------------------
+class NearDuplicateIndex:
+    """
+    Links each review to a canonical representative of its near-duplicate
+    cluster. Clusters are stored per (wsid, product_id) in `near_dup_index`:
+    {_id: canonical review_id, wsid, product_id, signature, bands}.
+    """
+
+    def __init__(self, collection, threshold: float = DEDUP_JACCARD_THRESHOLD):
+        self.collection = collection
+        self.threshold = threshold
+        # (wsid, product_id) -> (buckets, signatures, stored ids); reused
+        # across assign() calls so chunked ingests load each product once
+        self._products = {}
+
+    def _load_product(self, wsid: str, product_id: str):
+        key = (wsid, product_id)
+        if key in self._products:
+            return self._products[key]
+
+        buckets = defaultdict(list)
+        signatures = {}
+
+        for doc in self.collection.find({"wsid": wsid, "product_id": product_id}):
+            signatures[doc["_id"]] = doc["signature"]
+            for band in doc["bands"]:
+                buckets[band].append(doc["_id"])
+
+        self._products[key] = (buckets, signatures, set(signatures))
+        return self._products[key]
+
+    def _match(self, signature, keys, buckets, signatures):
+        best_id, best_sim = None, 0.0
+        seen = set()
+
+        for key in keys:
+            for candidate in buckets.get(key, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                sim = similarity(signature, signatures[candidate])
+                if sim > best_sim:
+                    best_id, best_sim = candidate, sim
+
+        if best_sim >= self.threshold:
+            return best_id
+        return None
+
+    def assign(self, records: list) -> dict:
+        """
+        Set canonical_id / is_canonical / duplicate_count on each record
+        (records need review_id, wsid, product_id and text fields).
+
+        Returns {canonical_id: [duplicate review_ids]} for canonicals that
+        were already stored before this batch.
+        """
+        by_product = defaultdict(list)
+        for record in records:
+            by_product[(record["wsid"], str(record["product_id"]))].append(record)
+
+        existing_links = defaultdict(list)
+        new_clusters = []
+
+        for (wsid, product_id), product_records in by_product.items():
+            buckets, signatures, stored = self._load_product(wsid, product_id)
+            batch_canonicals = {}
+
+            for record in product_records:
+                # Signatures may be precomputed off-process (directory ingest)
+                signature = record.pop("dedup_signature", None) or minhash(review_dedup_text(record))
+
+                if signature is None:
+                    record.update(canonical_id=record["review_id"], is_canonical=True, duplicate_count=0)
+                    continue
+
+                keys = band_keys(signature)
+                canonical_id = self._match(signature, keys, buckets, signatures)
+
+                if canonical_id is None:
+                    canonical_id = record["review_id"]
+                    signatures[canonical_id] = signature
+                    for key in keys:
+                        buckets[key].append(canonical_id)
+
+                    record.update(canonical_id=canonical_id, is_canonical=True, duplicate_count=0)
+                    batch_canonicals[canonical_id] = record
+                    new_clusters.append({
+                        "_id": canonical_id,
+                        "wsid": wsid,
+                        "product_id": product_id,
+                        "signature": signature,
+                        "bands": keys
+                    })
+                    continue
+
+                record.update(canonical_id=canonical_id, is_canonical=False)
+
+                if canonical_id in stored:
+                    existing_links[canonical_id].append(record["review_id"])
+                else:
+                    batch_canonicals[canonical_id]["duplicate_count"] += 1
+
+        if new_clusters:
+            try:
+                self.collection.insert_many(new_clusters, ordered=False)
+            except BulkWriteError:
+                # Another ingest created the same cluster ids concurrently
+                logger.warning("Some near-duplicate clusters already existed", exc_info=True)
+
+            for cluster in new_clusters:
+                self._products[(cluster["wsid"], cluster["product_id"])][2].add(cluster["_id"])
+
+        duplicates = sum(1 for r in records if r.get("is_canonical") is False)
+        logger.info(
+            f"Near-duplicate pass | records={len(records)} | duplicates={duplicates} | new_clusters={len(new_clusters)}"
+        )
+        return dict(existing_links)
+
+
+def link_to_existing_canonicals(reviews_collection, topic_store, existing_links: dict):
+    """
+    Credit new duplicates to canonicals stored earlier: bump the canonical's
+    duplicate_count and every topic it already contributes to.
+    """
+    for canonical_id, duplicate_ids in existing_links.items():
+        reviews_collection.update_one(
+            {"review_id": canonical_id},
+            {"$inc": {"duplicate_count": len(duplicate_ids)}}
+        )
+        topic_store.update_many(
+            {"review_ids": canonical_id},
+            {
+                "$inc": {"count": len(duplicate_ids)},
+                "$addToSet": {"review_ids": {"$each": duplicate_ids}}
+            }
+        )
+
+
+def create_near_duplicate_index():
+    from components.database import near_dup_index
+    return NearDuplicateIndex(near_dup_index)
+
+
+def annotate_near_duplicates(records: list, index: NearDuplicateIndex = None) -> dict:
+    """
+    Ingest hook: tag records with their cluster. Call before inserting the
+    records; pass the same `index` for every chunk of one import.
+
+    Returns the links to clusters stored earlier; hand them to
+    credit_duplicates() once the insert has shown which records landed.
+    """
+    index = index or create_near_duplicate_index()
+    return index.assign(records)
+
+
+def credit_duplicates(existing_links: dict, inserted_ids):
+    """
+    Credit existing clusters with the duplicates that were actually
+    inserted; ones that failed or lost an insert race are left out.
+    """
+    from components.database import reviews_collection, topic_store
+
+    inserted_ids = set(inserted_ids)
+    links = {}
+    for canonical_id, duplicate_ids in existing_links.items():
+        kept = [d for d in duplicate_ids if d in inserted_ids]
+        if kept:
+            links[canonical_id] = kept
+
+    link_to_existing_canonicals(reviews_collection, topic_store, links)
@@ -0,0 +1,190 @@
+import argparse
+import multiprocessing as mp
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from config.config import INGEST_WORKERS, INGEST_EMBED_BATCH_SIZE, CSV_CHUNK_SIZE
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Worker processes are spawned and import this module: keep Mongo, Pinecone
+# and model imports inside functions. Workers open their own Mongo client
+# for inserts; only the parent loads the model and Pinecone.
+
+# --------------------------------------------------
+# Per-file worker
+# --------------------------------------------------
+_dedup_index = None
+
+
+def ingest_review_file(path: str, chunksize: int = CSV_CHUNK_SIZE):
+    """
+    Parse, normalize, dedupe and insert one export chunk by chunk, so a
+    worker holds at most `chunksize` rows. Runs in a worker process.
+    Returns (path, canonical review_ids inserted, stats); the parent
+    reads the records back from Mongo to embed them.
+    """
+    global _dedup_index
+
+    from components.review_records import normalize_review_frame
+    from components.dedup import minhash, review_dedup_text, create_near_duplicate_index
+    from components.csv_loader import insert_review_records, iter_csv_chunks
+
+    # One index per worker process; clusters from other workers are seen
+    # through Mongo the first time a product is loaded
+    if _dedup_index is None:
+        _dedup_index = create_near_duplicate_index()
+
+    start = time.perf_counter()
+    stats = {"rows": 0, "exact_duplicates": 0, "inserted": 0, "already_imported": 0, "near_duplicates": 0}
+    embed_ids = []
+
+    for chunk in iter_csv_chunks(path, chunksize):
+        df = normalize_review_frame(chunk)
+        stats["rows"] += len(df)
+
+        # Exact repeats share a content-addressed review_id
+        df = df.drop_duplicates(subset=["review_id"])
+        stats["exact_duplicates"] += len(chunk) - len(df)
+
+        records = df.to_dict("records")
+        for record in records:
+            record["dedup_signature"] = minhash(review_dedup_text(record))
+
+        new_records = insert_review_records(records, _dedup_index)
+        stats["inserted"] += len(new_records)
+        stats["already_imported"] += len(records) - len(new_records)
+        stats["near_duplicates"] += sum(1 for r in new_records if r.get("is_canonical") is False)
+
+        # Near-duplicates are covered by their canonical review's vector
+        embed_ids.extend(r["review_id"] for r in new_records if r.get("is_canonical") is not False)
+
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    return path, embed_ids, stats
+
+
+# --------------------------------------------------
+# Shared embed + upsert stage (parent process)
+# --------------------------------------------------
+class EmbedUpsertStage:
+
+    def __init__(self, batch_size: int = INGEST_EMBED_BATCH_SIZE):
+        from components.database import reviews_collection
+        from components.embeddings import embed_texts
+        from components.embedding_worker import review_text, review_metadata
+        from components.vector_store import get_index, upsert_vectors, acked_ids
+
+        self.batch_size = batch_size
+        self.reviews_collection = reviews_collection
+        self.embed_texts = embed_texts
+        self.index = get_index()
+        self.review_text = review_text
+        self.review_metadata = review_metadata
+        self.upsert_vectors = upsert_vectors
+        self.acked_ids = acked_ids
+        self.pending = []
+        self.embedded = 0
+
+    def add(self, records):
+        # Near-duplicates are covered by their canonical review's vector
+        self.pending.extend(r for r in records if r.get("is_canonical") is not False)
+        while len(self.pending) >= self.batch_size:
+            self._flush(self.pending[:self.batch_size])
+            self.pending = self.pending[self.batch_size:]
+
+    def add_ids(self, review_ids):
+        """
+        Embed stored reviews by id, reading them back a batch at a time.
+        """
+        review_ids = list(review_ids)
+        for i in range(0, len(review_ids), self.batch_size):
+            self.add(list(self.reviews_collection.find(
+                {"review_id": {"$in": review_ids[i:i + self.batch_size]}},
+                {"_id": 0}
+            )))
+
+    def close(self):
+        if self.pending:
+            self._flush(self.pending)
+            self.pending = []
+
+    def _flush(self, batch):
+        texts = [self.review_text(r) for r in batch]
+        vectors = self.embed_texts(texts, batch_size=self.batch_size)
+
+        acks = self.upsert_vectors(
+            [
+                (r["review_id"], vector, self.review_metadata(r))
+                for r, vector in zip(batch, vectors)
+            ],
+            index=self.index
+        )
+        embedded_ids = self.acked_ids(acks)
+        self.reviews_collection.update_many(
+            {"review_id": {"$in": embedded_ids}},
+            {"$set": {"embedded": True}}
+        )
+
+        self.embedded += len(embedded_ids)
+        logger.info(f"Directory ingest | embedded={self.embedded}")
+
+
+# --------------------------------------------------
+# Driver
+# --------------------------------------------------
+def ingest_directory(path: str, workers: int = INGEST_WORKERS, embed: bool = True):
+    """
+    Parse, dedupe and insert every CSV under `path` in a process pool,
+    then embed/upsert the inserted reviews in shared batches in the parent.
+    Bad files are reported and skipped.
+    """
+    from components.csv_loader import resolve_csv_paths
+
+    files = [str(p) for p in resolve_csv_paths(path)]
+    if not files:
+        logger.warning(f"Directory ingest: no files under {path}")
+        return {}
+
+    stage = EmbedUpsertStage() if embed else None
+    report = {}
+    start = time.perf_counter()
+
+    print(f"🚀 Ingesting {len(files)} files with {workers} workers")
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as pool:
+        futures = {pool.submit(ingest_review_file, f): f for f in files}
+
+        for future in as_completed(futures):
+            file_path = futures[future]
+            try:
+                _, embed_ids, stats = future.result()
+
+                if stage:
+                    stage.add_ids(embed_ids)
+
+                report[file_path] = {"status": "ok", **stats}
+                print(f"✅ {file_path} | {stats}")
+
+            except Exception as e:
+                logger.error(f"Directory ingest failed for {file_path}", exc_info=True)
+                report[file_path] = {"status": "error", "error": str(e)}
+                print(f"❌ {file_path} | {e}")
+
+    if stage:
+        stage.close()
+
+    ok = sum(1 for r in report.values() if r["status"] == "ok")
+    print(f"🎉 Done | files_ok={ok}/{len(files)} | seconds={time.perf_counter() - start:.1f}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest every review CSV in a directory")
+    parser.add_argument("path", nargs="?", default="data")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--no-embed", action="store_true",
+                        help="only load Mongo; leave embedding to the backfill/listener")
+    args = parser.parse_args()
+
+    ingest_directory(args.path, workers=args.workers, embed=not args.no_embed)
@@ -1,43 +1,31 @@
 from components.database import reviews_collection
 from components.embeddings import embed_text
-from components.vector_store import get_index
-import math
+from components.embedding_worker import review_text, review_metadata
+from components.vector_store import upsert_vectors, acked_ids
 
-def safe_str(value):
-    if value is None:
-        return ""
-    if isinstance(value, float) and math.isnan(value):
-        return ""
-    return str(value)
+PENDING_FILTER = {"embedded": False, "is_canonical": {"$ne": False}}
 
 def embed_new_reviews():
-    index = get_index()
-    reviews = reviews_collection.find({"embedded": False})
+    # Near-duplicates are represented by their canonical review's vector
+    reviews = reviews_collection.find(PENDING_FILTER)
 
     vectors = []
 
     for r in reviews:
-        text = f"{safe_str(r.get('review_title'))} {safe_str(r.get('review_text'))}"
+        text = review_text(r)
         embedding = embed_text(text)
 
-        vectors.append((
-            r["review_id"],
-            embedding,
-            {
-                "WSID": safe_str(r.get("wsid")),
-                "product_id": safe_str(r.get("product_id")),
-                "product_name": safe_str(r.get("product_name")),  # ✅ FIX
-                "rating": int(r.get("rating", 0))
-            }
-        ))
+        # Same metadata layout as embedding_worker / the backfills
+        vectors.append((r["review_id"], embedding, review_metadata(r)))
 
     if vectors:
-        index.upsert(vectors)
+        # Failed batches stay pending and are picked up on the next run
+        embedded_ids = acked_ids(upsert_vectors(vectors))
         reviews_collection.update_many(
-            {"embedded": False},
+            {"review_id": {"$in": embedded_ids}},
             {"$set": {"embedded": True}}
         )
-        print(f"Embedded {len(vectors)} reviews")
+        print(f"Embedded {len(embedded_ids)}/{len(vectors)} reviews")
     else:
         print("No new reviews to embed")
 
@@ -0,0 +1,88 @@
+import multiprocessing as mp
+import os
+
+from config.config import (
+    SENTENCE_MODEL_NAME,
+    EMBED_POOL_WORKERS,
+    EMBED_POOL_SHARD_SIZE,
+    EMBED_POOL_BATCH_SIZE,
+    EMBED_POOL_TORCH_THREADS
+)
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+# NOTE: this module is imported by spawned worker processes, so it must stay
+# free of heavy module-level imports (models, Mongo, Pinecone clients).
+
+_worker_model = None
+_worker_batch_size = EMBED_POOL_BATCH_SIZE
+
+
+def _init_worker(model_name: str, torch_threads: int, batch_size: int):
+    """
+    Runs once per worker process: pin torch threads, then load the model.
+    """
+    global _worker_model, _worker_batch_size
+
+    os.environ["OMP_NUM_THREADS"] = str(torch_threads)
+    os.environ["MKL_NUM_THREADS"] = str(torch_threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(torch_threads)
+    _worker_model = SentenceTransformer(model_name)
+    _worker_batch_size = batch_size
+
+
+def _encode_shard(shard: list):
+    """
+    shard = [(review_id, text), ...] -> [(review_id, vector), ...]
+    """
+    ids = [review_id for review_id, _ in shard]
+    texts = [text for _, text in shard]
+
+    vectors = _worker_model.encode(texts, batch_size=_worker_batch_size)
+    return list(zip(ids, (v.tolist() for v in vectors)))
+
+
+def iter_shards(items, shard_size: int = EMBED_POOL_SHARD_SIZE):
+    shard = []
+    for item in items:
+        shard.append(item)
+        if len(shard) >= shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+def encode_in_pool(
+    items,
+    workers: int = EMBED_POOL_WORKERS,
+    shard_size: int = EMBED_POOL_SHARD_SIZE,
+    batch_size: int = EMBED_POOL_BATCH_SIZE,
+    torch_threads: int = EMBED_POOL_TORCH_THREADS,
+    model_name: str = SENTENCE_MODEL_NAME
+):
+    """
+    Shard (id, text) pairs across a process pool and yield encoded shards
+    as they complete, so the caller can stream them to a single writer.
+    """
+    workers = max(1, workers)
+    ctx = mp.get_context("spawn")   # never fork a process holding torch state
+
+    logger.info(
+        "Starting embedding pool | workers=%d | shard_size=%d | batch_size=%d | torch_threads=%d",
+        workers, shard_size, batch_size, torch_threads
+    )
+
+    with ctx.Pool(
+        processes=workers,
+        initializer=_init_worker,
+        initargs=(model_name, torch_threads, batch_size)
+    ) as pool:
+        for encoded in pool.imap_unordered(_encode_shard, iter_shards(items, shard_size)):
+            yield encoded
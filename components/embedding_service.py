@@ -0,0 +1,116 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from components.embeddings import embed_texts
+from config.config import EMBED_BATCH_SIZE, EMBED_MAX_WAIT_MS
+from common.logger import get_logger
+from common.metrics import span, register_stats
+
+logger = get_logger(__name__)
+
+
+class EmbeddingService:
+    """
+    Micro-batches query embeddings coming from concurrent request threads.
+
+    Callers enqueue a text and block on a Future. A single worker thread
+    drains the queue, waiting at most `max_wait_ms` for a batch to fill up
+    to `batch_size`, then runs one encode call for the whole batch.
+    """
+
+    def __init__(self, batch_size: int = EMBED_BATCH_SIZE, max_wait_ms: float = EMBED_MAX_WAIT_MS):
+        self.batch_size = max(1, batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        self.stats = {
+            "requests": 0,
+            "batches": 0,
+            "max_batch": 0
+        }
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+    def submit(self, text: str) -> Future:
+        self._ensure_worker()
+
+        future = Future()
+        self._queue.put((text, future))
+        return future
+
+    def embed(self, text: str, timeout: float = None) -> list:
+        return self.submit(text).result(timeout=timeout)
+
+    def embed_many(self, texts: list, timeout: float = None) -> list:
+        futures = [self.submit(t) for t in texts]
+        return [f.result(timeout=timeout) for f in futures]
+
+    def metrics(self) -> dict:
+        return {**self.stats, "queue_depth": self._queue.qsize()}
+
+    # --------------------------------------------------
+    # Worker
+    # --------------------------------------------------
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name="embedding-service",
+                    daemon=True
+                )
+                self._worker.start()
+                logger.info(
+                    "Embedding service started | batch_size=%d | max_wait_ms=%.1f",
+                    self.batch_size,
+                    self.max_wait * 1000
+                )
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            texts = [text for text, _ in batch]
+
+            try:
+                with span("encode"):
+                    vectors = embed_texts(texts, batch_size=self.batch_size)
+            except Exception as e:
+                logger.error("Embedding batch failed | size=%d", len(batch), exc_info=True)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                future.set_result(vector)
+
+            self.stats["requests"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+
+
+embedding_service = EmbeddingService()
+
+register_stats("embedding_service", embedding_service.metrics, gauges=("max_batch", "queue_depth"))
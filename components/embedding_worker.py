@@ -1,15 +1,14 @@
-import os
 import math
-from pinecone import Pinecone # type: ignore
 from components.database import reviews_collection
-from components.embeddings import embed_text
+from components.embeddings import embed_text, embed_texts
+from components.vector_store import get_index, upsert_vectors, acked_ids
+from config.config import VECTOR_METADATA_MODE
+from common.metrics import span
+from common.logger import get_logger
 from dotenv import load_dotenv
 
 load_dotenv()
-
-# ✅ NEW Pinecone client (SDK v2+)
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.getenv("PINECONE_INDEX"))
+logger = get_logger(__name__)
 
 
 def safe_str(value):
@@ -20,28 +19,80 @@ def safe_str(value):
     return str(value)
 
 
+def review_text(review: dict) -> str:
+    return f"{safe_str(review.get('review_title'))} {safe_str(review.get('review_text'))}"
+
+
+def review_metadata(review: dict) -> dict:
+    """
+    Metadata stored with a review vector. Compact mode keeps the filter
+    fields and review_id only; readers hydrate the text from Mongo
+    (components.review_hydration).
+    """
+    metadata = {
+        "WSID": safe_str(review.get("wsid")),
+        "product_id": safe_str(review.get("product_id")),
+        "rating": int(review.get("rating", 0)),
+        "review_id": safe_str(review.get("review_id"))
+    }
+
+    if VECTOR_METADATA_MODE == "full":
+        metadata.update(
+            product_name=safe_str(review.get("product_name")),
+            review_title=safe_str(review.get("review_title")),
+            review_text=safe_str(review.get("review_text"))
+        )
+
+    return metadata
+
+
 def embed_single_review(review: dict):
-    text = f"{safe_str(review.get('review_title'))} {safe_str(review.get('review_text'))}"
+    text = review_text(review)
+
+    with span("encode"):
+        embedding = embed_text(text)
 
     vector = (
         review["review_id"],
-        embed_text(text),
-        {
-            "WSID": safe_str(review.get("wsid")),
-            "product_id": safe_str(review.get("product_id")),
-            "product_name": safe_str(review.get("product_name")),
-            "rating": int(review.get("rating", 0)),
-            "review_title": safe_str(review.get("review_title")),
-            "review_text": safe_str(review.get("review_text")),
-            "text": text
-        }
+        embedding,
+        review_metadata(review)
     )
 
-    index.upsert(vectors=[vector])
+    with span("pinecone_upsert"):
+        get_index().upsert(vectors=[vector])
 
     reviews_collection.update_one(
         {"review_id": review["review_id"]},
         {"$set": {"embedded": True}}
     )
 
-    print(f"✅ Embedded review {review['review_id']}")
+    logger.debug("Embedded review %s", review["review_id"])
+
+
+def embed_reviews(reviews: list) -> int:
+    """
+    Batch counterpart of embed_single_review: one encode pass and
+    size-bounded upserts for the whole list. Reviews whose upsert failed
+    stay pending (embedded=False). Returns how many were embedded.
+    """
+    if not reviews:
+        return 0
+
+    with span("encode"):
+        embeddings = embed_texts([review_text(r) for r in reviews])
+
+    embedded_ids = acked_ids(upsert_vectors(
+        (
+            (r["review_id"], embedding, review_metadata(r))
+            for r, embedding in zip(reviews, embeddings)
+        )
+    ))
+
+    if embedded_ids:
+        reviews_collection.update_many(
+            {"review_id": {"$in": embedded_ids}},
+            {"$set": {"embedded": True}}
+        )
+
+    logger.debug("Embedded %d/%d reviews", len(embedded_ids), len(reviews))
+    return len(embedded_ids)
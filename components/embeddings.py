@@ -2,13 +2,25 @@ from pinecone import Pinecone # type: ignore
 import os
 from dotenv import load_dotenv
 from common.logger import get_logger
+from config.config import SENTENCE_MODEL_NAME, TORCH_NUM_THREADS
+
+# Pin intra-op threads before torch starts its pool: several web workers
+# each running a full-width pool would oversubscribe the cores, and an
+# OpenMP pool started in a preforking master can deadlock its children
+os.environ.setdefault("OMP_NUM_THREADS", str(TORCH_NUM_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(TORCH_NUM_THREADS))
+
+import torch
 from sentence_transformers import SentenceTransformer
 load_dotenv()
 logger = get_logger(__name__)
 
+torch.set_num_threads(TORCH_NUM_THREADS)
+
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 # EMBED_MODEL = "multilingual-e5-large"
-model = SentenceTransformer("all-MiniLM-L6-v2")
+model = SentenceTransformer(SENTENCE_MODEL_NAME)
+model.eval()
 
 pc = Pinecone(api_key=PINECONE_API_KEY)
 
@@ -32,6 +44,15 @@ pc = Pinecone(api_key=PINECONE_API_KEY)
 #         return []
 
 def embed_text(text: str):
-    vector = model.encode(text).tolist()
-    print("🔍 Embedding dimension:", len(vector))
-    return vector
+    return model.encode(text).tolist()
+
+
+def embed_texts(texts: list, batch_size: int = 32):
+    """
+    Encode several texts in one forward pass per batch.
+    """
+    if not texts:
+        return []
+
+    vectors = model.encode(texts, batch_size=batch_size)
+    return [v.tolist() for v in vectors]
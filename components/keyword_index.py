@@ -0,0 +1,411 @@
+import argparse
+import math
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne, ReturnDocument
+
+from config.config import (
+    BM25_K1,
+    BM25_B,
+    RRF_K,
+    KEYWORD_INDEX_MAX_PRODUCTS,
+    KEYWORD_INDEX_REFRESH_SECONDS,
+    WEB_PASSAGE_CHARS,
+    WEB_PASSAGE_TTL_HOURS
+)
+from common.logger import get_logger
+from common.metrics import register_stats
+
+logger = get_logger(__name__)
+
+# Model codes keep their inner separators ("TN-750", "CF410X.A") so they
+# can also be indexed glued together
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-./][a-z0-9]+)*")
+SEPARATOR_RE = re.compile(r"[-./]")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "does",
+    "for", "from", "has", "have", "how", "i", "in", "is", "it", "its", "me", "my",
+    "of", "on", "or", "so", "that", "the", "their", "them", "they", "this", "to",
+    "was", "what", "when", "which", "who", "will", "with", "you", "your"
+}
+
+# Tail reloads look back this far so writes from other processes that
+# commit slightly out of order are not missed
+REFRESH_OVERLAP = timedelta(seconds=10)
+
+# Per-product marker bumped whenever a page's passages are replaced, so
+# other processes drop passages deleted from Mongo on their next refresh
+WEB_VERSION_DOC_ID = "web_version"
+WEB_VERSION_KIND = "web_version"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+# --------------------------------------------------
+# Tokenizing
+# --------------------------------------------------
+def tokenize(text: str) -> list:
+    """
+    Lowercased word tokens; "tn-750" yields "tn-750" parts plus "tn750".
+    """
+    tokens = []
+    for token in TOKEN_RE.findall((text or "").lower()):
+        parts = SEPARATOR_RE.split(token)
+        if len(parts) > 1:
+            tokens.append("".join(parts))
+        tokens.extend(p for p in parts if p not in STOPWORDS)
+    return tokens
+
+
+def term_counts(text: str) -> dict:
+    return dict(Counter(tokenize(text)))
+
+
+def split_passages(text: str, max_chars: int = WEB_PASSAGE_CHARS) -> list:
+    """
+    Group the lines of a scraped page into passages of about `max_chars`.
+    """
+    passages, current, size = [], [], 0
+    for line in (text or "").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        if current and size + len(line) > max_chars:
+            passages.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        passages.append("\n".join(current))
+    return passages
+
+
+def reciprocal_rank_fusion(*rankings, k: int = RRF_K) -> list:
+    """
+    Fuse ranked id lists: score(id) = sum 1 / (k + rank). Best first.
+    """
+    scores = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+
+# --------------------------------------------------
+# In-memory BM25 over one product
+# --------------------------------------------------
+class ProductKeywordIndex:
+
+    def __init__(self):
+        self.postings = defaultdict(dict)     # term -> {doc_id: tf}
+        self.docs = {}                        # doc_id -> (kind, length, terms, text)
+        self.total_length = 0
+        self.loaded_until = None
+        self.web_indexed_at = None
+        self.web_version = None
+        self.lock = threading.Lock()    # held by the store around reads and writes
+
+    def add(self, doc_id: str, kind: str, terms: dict, text: str = None):
+        if doc_id in self.docs:
+            self.remove(doc_id)
+
+        length = sum(terms.values())
+        self.docs[doc_id] = (kind, length, terms, text)
+        self.total_length += length
+        for term, tf in terms.items():
+            self.postings[term][doc_id] = tf
+
+    def remove(self, doc_id: str):
+        _, length, terms, _ = self.docs.pop(doc_id)
+        self.total_length -= length
+        for term in terms:
+            self.postings[term].pop(doc_id, None)
+            if not self.postings[term]:
+                del self.postings[term]
+
+    def count(self, kind: str = None) -> int:
+        if kind is None:
+            return len(self.docs)
+        return sum(1 for d in self.docs.values() if d[0] == kind)
+
+    def search(self, query: str, k: int = 10, kind: str = None) -> list:
+        """
+        [(doc_id, score)] best first, only docs sharing a term with the query.
+        """
+        n = len(self.docs)
+        if not n:
+            return []
+
+        avg_length = self.total_length / n or 1.0
+        scores = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, tf in postings.items():
+                doc_kind, length, _, _ = self.docs[doc_id]
+                if kind and doc_kind != kind:
+                    continue
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[doc_id] += idf * tf * (BM25_K1 + 1) / norm
+
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+
+    def text(self, doc_id: str):
+        return self.docs[doc_id][3]
+
+    def passages(self, kind: str = "web", limit: int = None) -> list:
+        ids = sorted(
+            (doc_id for doc_id, d in self.docs.items() if d[0] == kind),
+            key=lambda d: int(d.rsplit("#", 1)[-1]) if d.rsplit("#", 1)[-1].isdigit() else 0
+        )
+        return ids[:limit] if limit else ids
+
+
+# --------------------------------------------------
+# Mongo-backed store, one cached index per product
+# --------------------------------------------------
+class KeywordIndexStore:
+    """
+    Term vectors are written at ingest to `keyword_docs`:
+    {wsid, product_id, doc_id, kind: "review" | "web", terms, length,
+    text (web passages only), indexed_at}, plus one web_version marker
+    per product.
+
+    Each process keeps an LRU of per-product BM25 indexes, loaded on first
+    search and topped up from `indexed_at` at most every
+    KEYWORD_INDEX_REFRESH_SECONDS. A newer web_version means another
+    process replaced the page's passages: the cached ones are reloaded.
+    """
+
+    def __init__(self, collection=None, max_products: int = KEYWORD_INDEX_MAX_PRODUCTS):
+        self._collection = collection
+        self.max_products = max_products
+        self._products = OrderedDict()
+        self._checked = {}
+        self._lock = threading.Lock()
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            from components.database import keyword_docs
+            self._collection = keyword_docs
+        return self._collection
+
+    # ---------- write path (ingest) ----------
+    def index_reviews(self, records: list):
+        """
+        Index canonical reviews; near-duplicates are left to their canonical.
+        """
+        now = _now()
+        ops = []
+        for r in records:
+            if r.get("is_canonical") is False:
+                continue
+            terms = term_counts(f"{r.get('review_title') or ''} {r.get('review_text') or ''}")
+            if not terms:
+                continue
+            ops.append(UpdateOne(
+                {"wsid": r["wsid"], "product_id": str(r["product_id"]), "doc_id": r["review_id"]},
+                {"$setOnInsert": {
+                    "kind": "review",
+                    "terms": terms,
+                    "length": sum(terms.values()),
+                    "indexed_at": now
+                }},
+                upsert=True
+            ))
+
+        if ops:
+            self.collection.bulk_write(ops, ordered=False)
+        return len(ops)
+
+    def index_web_passages(self, wsid: str, product_id: str, url: str, text: str):
+        product_id = str(product_id)
+        now = _now()
+        passages = [(f"{url}#{i}", p, term_counts(p)) for i, p in enumerate(split_passages(text))]
+
+        if passages:
+            self.collection.bulk_write(
+                [
+                    UpdateOne(
+                        {"wsid": wsid, "product_id": product_id, "doc_id": doc_id},
+                        {"$set": {
+                            "kind": "web",
+                            "terms": terms,
+                            "length": sum(terms.values()),
+                            "text": passage,
+                            "indexed_at": now
+                        }},
+                        upsert=True
+                    )
+                    for doc_id, passage, terms in passages
+                ],
+                ordered=False
+            )
+
+        # Drop passages left over from a previous version of the page
+        self.collection.delete_many({
+            "wsid": wsid,
+            "product_id": product_id,
+            "kind": "web",
+            "doc_id": {"$nin": [doc_id for doc_id, _, _ in passages]}
+        })
+
+        # After the delete, so a process that sees the new version also
+        # finds the old passages gone
+        marker = self.collection.find_one_and_update(
+            {"wsid": wsid, "product_id": product_id, "doc_id": WEB_VERSION_DOC_ID},
+            {"$inc": {"version": 1}, "$set": {"kind": WEB_VERSION_KIND, "indexed_at": _now()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+        with self._lock:
+            index = self._products.get((wsid, product_id))
+
+        if index is not None:
+            with index.lock:
+                for doc_id in index.passages("web"):
+                    index.remove(doc_id)
+                for doc_id, passage, terms in passages:
+                    index.add(doc_id, "web", terms, passage)
+                index.web_indexed_at = now
+                index.web_version = marker["version"]
+
+        logger.info(f"Indexed website passages | product_id={product_id} | passages={len(passages)}")
+        return len(passages)
+
+    def web_is_fresh(self, wsid: str, product_id: str) -> bool:
+        indexed_at = self.get(wsid, product_id).web_indexed_at
+        return indexed_at is not None and _now() - indexed_at < timedelta(hours=WEB_PASSAGE_TTL_HOURS)
+
+    # ---------- read path ----------
+    def get(self, wsid: str, product_id: str) -> ProductKeywordIndex:
+        key = (wsid, str(product_id))
+
+        with self._lock:
+            index = self._products.get(key)
+            if index is not None:
+                self._products.move_to_end(key)
+            stale = index is None or time.monotonic() - self._checked.get(key, 0) >= KEYWORD_INDEX_REFRESH_SECONDS
+
+        if not stale:
+            return index
+
+        index = index or ProductKeywordIndex()
+        query = {"wsid": key[0], "product_id": key[1]}
+        if index.loaded_until is not None:
+            query["indexed_at"] = {"$gte": index.loaded_until - REFRESH_OVERLAP}
+
+        projection = {"_id": 0, "doc_id": 1, "kind": 1, "terms": 1, "text": 1, "indexed_at": 1, "version": 1}
+        started = _now()
+        docs = list(self.collection.find(query, projection))
+
+        web_version = next((d["version"] for d in docs if d["kind"] == WEB_VERSION_KIND), None)
+        docs = [d for d in docs if d["kind"] != WEB_VERSION_KIND]
+
+        # The tail only holds upserts; on a new page version reload every
+        # passage so the ones deleted elsewhere go too
+        reload_web = (
+            index.loaded_until is not None
+            and web_version is not None
+            and web_version != index.web_version
+        )
+        if reload_web:
+            docs = [d for d in docs if d["kind"] != "web"]
+            docs += self.collection.find({"wsid": key[0], "product_id": key[1], "kind": "web"}, projection)
+
+        with index.lock:
+            if reload_web:
+                for doc_id in index.passages("web"):
+                    index.remove(doc_id)
+                index.web_indexed_at = None
+            if web_version is not None:
+                index.web_version = web_version
+
+            for doc in docs:
+                index.add(doc["doc_id"], doc["kind"], doc["terms"], doc.get("text"))
+                if doc["kind"] == "web":
+                    indexed_at = doc["indexed_at"]
+                    if indexed_at.tzinfo is None:
+                        indexed_at = indexed_at.replace(tzinfo=timezone.utc)
+                    if index.web_indexed_at is None or indexed_at > index.web_indexed_at:
+                        index.web_indexed_at = indexed_at
+        loaded = len(docs)
+
+        with self._lock:
+            index.loaded_until = started
+            self._checked[key] = time.monotonic()
+            self._products[key] = index
+            self._products.move_to_end(key)
+            while len(self._products) > self.max_products:
+                evicted, _ = self._products.popitem(last=False)
+                self._checked.pop(evicted, None)
+
+        if loaded:
+            logger.info(f"Keyword index loaded | product_id={key[1]} | new_docs={loaded} | docs={index.count()}")
+        return index
+
+    def search(self, wsid: str, product_id: str, query: str, k: int = 10, kind: str = None) -> list:
+        index = self.get(wsid, product_id)
+        with index.lock:
+            return index.search(query, k=k, kind=kind)
+
+    def web_passages(self, wsid: str, product_id: str, query: str, k: int) -> list:
+        """
+        Texts of the website passages that best match `query`; the top of
+        the page when nothing matches.
+        """
+        index = self.get(wsid, product_id)
+        with index.lock:
+            doc_ids = [doc_id for doc_id, _ in index.search(query, k=k, kind="web")]
+            if not doc_ids:
+                doc_ids = index.passages("web", limit=k)
+            return [index.text(doc_id) for doc_id in doc_ids]
+
+
+keyword_index = KeywordIndexStore()
+
+register_stats("keyword_index", lambda: {"products_cached": len(keyword_index._products)}, gauges=("products_cached",))
+
+
+def rebuild_review_index(batch_size: int = 5000):
+    """
+    Index every canonical review already in Mongo (one-off, for data
+    loaded before the keyword index existed).
+    """
+    from components.database import reviews_collection
+
+    projection = {"_id": 0, "review_id": 1, "wsid": 1, "product_id": 1, "review_title": 1, "review_text": 1}
+    batch, total = [], 0
+
+    for review in reviews_collection.find({"is_canonical": {"$ne": False}}, projection):
+        batch.append(review)
+        if len(batch) >= batch_size:
+            total += keyword_index.index_reviews(batch)
+            batch = []
+            print(f"✅ Indexed {total} reviews")
+
+    if batch:
+        total += keyword_index.index_reviews(batch)
+
+    print(f"🎉 Done. Total indexed: {total}")
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the BM25 keyword index from stored reviews")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    rebuild_review_index(args.batch_size)
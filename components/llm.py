@@ -1,4 +1,13 @@
-from config.config import GROQ_API_KEY, GROQ_MODEL_NAME
+import os
+import threading
+import httpx
+from config.config import (
+    GROQ_API_KEY,
+    GROQ_MODEL_NAME,
+    GROQ_TIMEOUT_SECONDS,
+    GROQ_MAX_CONNECTIONS,
+    GROQ_KEEPALIVE_SECONDS
+)
 from common.logger import get_logger
 from common.custom_exception import CustomException
 from langchain_groq.chat_models import ChatGroq
@@ -6,7 +15,57 @@ from dotenv import load_dotenv
 load_dotenv()
 logger = get_logger(__name__)
 
-def load_llm(model_name: str = GROQ_MODEL_NAME,groq_api_key: str = GROQ_API_KEY):
+_shared_llm = None
+_shared_lock = threading.Lock()
+
+
+class ForkSafeTransport(httpx.BaseTransport):
+    """
+    HTTPTransport that opens a fresh connection pool in each process.
+    The shared ChatGroq client is built while the app loads in the
+    preforking master; workers must not reuse the master's sockets.
+    """
+
+    def __init__(self, **kwargs):
+        self._kwargs = kwargs
+        self._transport = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _current(self):
+        pid = os.getpid()
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    self._transport = httpx.HTTPTransport(**self._kwargs)
+                    self._pid = pid
+        return self._transport
+
+    def handle_request(self, request):
+        return self._current().handle_request(request)
+
+    def close(self):
+        if self._transport is not None and self._pid == os.getpid():
+            self._transport.close()
+
+
+def create_http_client():
+    """
+    Pooled keep-alive HTTP client so repeated Groq calls reuse TLS connections.
+    """
+    return httpx.Client(
+        timeout=GROQ_TIMEOUT_SECONDS,
+        transport=ForkSafeTransport(
+            limits=httpx.Limits(
+                max_connections=GROQ_MAX_CONNECTIONS,
+                max_keepalive_connections=GROQ_MAX_CONNECTIONS,
+                keepalive_expiry=GROQ_KEEPALIVE_SECONDS
+            )
+        )
+    )
+
+
+def load_llm(model_name: str = GROQ_MODEL_NAME,groq_api_key: str = GROQ_API_KEY, http_client=None, max_retries: int = 2):
     try:
         logger.info("Loading LLM from GROQ using LLama3 model...")
 
@@ -15,7 +74,9 @@ def load_llm(model_name: str = GROQ_MODEL_NAME,groq_api_key: str = GROQ_API_KEY)
             model_name = model_name,
             temperature=0,
             top_p = 1,
-            max_tokens=2048
+            max_tokens=2048,
+            http_client=http_client,
+            max_retries=max_retries
         )
 
         logger.info("LLM loaded successfully from GROQ.")
@@ -24,4 +85,19 @@ def load_llm(model_name: str = GROQ_MODEL_NAME,groq_api_key: str = GROQ_API_KEY)
     except Exception as e:
         error_message = CustomException("Failed to load an LLM from GROQ")
         logger.error(str(error_message))
-        return None
\ No newline at end of file
+        return None
+
+
+def get_llm():
+    """
+    Process-wide ChatGroq instance over one pooled HTTP client.
+    Retries are left to components.llm_gateway.
+    """
+    global _shared_llm
+
+    if _shared_llm is None:
+        with _shared_lock:
+            if _shared_llm is None:
+                _shared_llm = load_llm(http_client=create_http_client(), max_retries=0)
+
+    return _shared_llm
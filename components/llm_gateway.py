@@ -0,0 +1,374 @@
+import heapq
+import itertools
+import math
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from langchain_core.runnables import RunnableLambda
+
+from config.config import (
+    LLM_MAX_RPS,
+    LLM_MAX_TPM,
+    LLM_MAX_CONCURRENCY,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BASE_SECONDS,
+    LLM_RETRY_MAX_SECONDS,
+    LLM_HEDGE_AFTER_SECONDS,
+    LLM_EST_OUTPUT_TOKENS
+)
+from common.logger import get_logger
+from common.metrics import span, observe_stage, register_stats, LLM_TOKENS
+from common.runtime import register_postfork, register_worker_share
+
+logger = get_logger(__name__)
+
+# Lower value wins a free slot first
+PRIORITIES = {
+    "interactive": 0,
+    "background": 1
+}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def estimate_tokens(payload) -> int:
+    """
+    Rough prompt size (~4 chars per token) plus the expected completion.
+    """
+    if hasattr(payload, "to_string"):
+        text = payload.to_string()
+    else:
+        text = str(payload)
+    return len(text) // 4 + LLM_EST_OUTPUT_TOKENS
+
+
+def _status_code(error):
+    status = getattr(error, "status_code", None)
+    if status is None:
+        response = getattr(error, "response", None)
+        status = getattr(response, "status_code", None)
+    return status
+
+
+def _retry_after(error):
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable(error) -> bool:
+    status = _status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+
+    # Transport-level failures (timeouts, dropped connections) carry no status
+    name = type(error).__name__.lower()
+    return "timeout" in name or "connection" in name
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at `rate` per second.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        Block until `amount` tokens are available; returns seconds waited.
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """
+        Take `amount` tokens if available right now, without waiting.
+        """
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return True
+            return False
+
+    def refund(self, amount: float = 1.0):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens + min(amount, self.capacity))
+
+
+class PriorityGate:
+    """
+    Concurrency limiter whose waiters are admitted by priority, then FIFO.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._active = 0
+        self._waiters = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def acquire(self, priority: int):
+        with self._cond:
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+
+            while self._active >= self.limit or self._waiters[0] != entry:
+                self._cond.wait()
+
+            heapq.heappop(self._waiters)
+            self._active += 1
+            self._cond.notify_all()
+
+    def release(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+
+# --------------------------------------------------
+# Gateway
+# --------------------------------------------------
+class LLMGateway:
+    """
+    Single choke point for Groq calls: priority admission, request and
+    token rate limits, jittered exponential retry and optional hedging.
+    """
+
+    def __init__(
+        self,
+        max_rps: float = LLM_MAX_RPS,
+        max_tpm: float = LLM_MAX_TPM,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        max_retries: int = LLM_MAX_RETRIES,
+        hedge_after_seconds: float = LLM_HEDGE_AFTER_SECONDS
+    ):
+        self.max_rps = max_rps
+        self.max_tpm = max_tpm
+        self.max_concurrency = max_concurrency
+        self._build_limits(1)
+        self.max_retries = max_retries
+        self.hedge_after_seconds = hedge_after_seconds
+        self._hedge_workers = max_concurrency * 2
+        self._hedge_pool = ThreadPoolExecutor(max_workers=self._hedge_workers, thread_name_prefix="llm-hedge")
+
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            name: {
+                "queued": 0,
+                "in_flight": 0,
+                "completed": 0,
+                "failed": 0,
+                "retries": 0,
+                "rate_limited": 0,
+                "hedged": 0,
+                "queue_wait_seconds": 0.0
+            }
+            for name in PRIORITIES
+        }
+
+    def _build_limits(self, workers: int):
+        rps = self.max_rps / workers
+        tpm = self.max_tpm / workers
+        self.request_bucket = TokenBucket(rate=rps, capacity=max(1.0, rps))
+        self.token_bucket = TokenBucket(rate=tpm / 60.0, capacity=tpm)
+        self.gate = PriorityGate(max(1, math.ceil(self.max_concurrency / workers)))
+
+    def set_worker_share(self, workers: int):
+        """
+        Take 1/workers of the Groq budget: LLM_MAX_* are per deployment,
+        and each gunicorn worker has its own gateway. Call before serving.
+        """
+        self._build_limits(workers)
+
+    def reset_after_fork(self):
+        # Pool threads do not survive fork; a child would queue hedges forever
+        self._hedge_pool = ThreadPoolExecutor(max_workers=self._hedge_workers, thread_name_prefix="llm-hedge")
+
+    def _count(self, priority: str, field: str, value=1):
+        with self._metrics_lock:
+            self._metrics[priority][field] += value
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            return {name: dict(values) for name, values in self._metrics.items()}
+
+    # --------------------------------------------------
+    # Calls
+    # --------------------------------------------------
+    def call(self, fn, priority: str = "interactive", tokens: int = LLM_EST_OUTPUT_TOKENS):
+        """
+        Run `fn()` (one LLM request) under the gateway's limits. Every
+        attempt, retry or hedge is charged to the rate limits; backoff
+        between retries happens outside the concurrency gate and never
+        exceeds LLM_RETRY_MAX_SECONDS. Interactive calls fail at once when
+        the server's Retry-After is longer than that.
+        """
+        if priority not in PRIORITIES:
+            priority = "background"
+
+        attempt = 0
+
+        while True:
+            try:
+                result = self._attempt(fn, priority, tokens)
+                self._count(priority, "completed")
+                return result
+
+            except Exception as e:
+                if _status_code(e) == 429:
+                    self._count(priority, "rate_limited")
+
+                if attempt >= self.max_retries or not is_retryable(e):
+                    self._count(priority, "failed")
+                    raise
+
+                retry_after = _retry_after(e)
+                if retry_after is not None and retry_after > LLM_RETRY_MAX_SECONDS and priority == "interactive":
+                    # A user is waiting; fail now rather than sleep past the budget
+                    self._count(priority, "failed")
+                    logger.warning(
+                        "LLM call failed, Retry-After over budget | priority=%s | retry_after=%.2fs | max=%.2fs",
+                        priority, retry_after, LLM_RETRY_MAX_SECONDS
+                    )
+                    raise
+
+                if retry_after is not None:
+                    delay = min(LLM_RETRY_MAX_SECONDS, max(0.0, retry_after))
+                else:
+                    backoff = min(LLM_RETRY_MAX_SECONDS, LLM_RETRY_BASE_SECONDS * (2 ** attempt))
+                    delay = random.uniform(0, backoff)   # full jitter
+                attempt += 1
+                self._count(priority, "retries")
+
+                logger.warning(
+                    "LLM call failed, retrying | priority=%s | attempt=%d | status=%s | delay=%.2fs",
+                    priority, attempt, _status_code(e), delay
+                )
+                time.sleep(delay)
+
+    def _charge(self, tokens: int):
+        self.request_bucket.acquire(1)
+        self.token_bucket.acquire(tokens)
+
+    def _try_charge(self, tokens: int) -> bool:
+        if not self.request_bucket.try_acquire(1):
+            return False
+        if not self.token_bucket.try_acquire(tokens):
+            self.request_bucket.refund(1)
+            return False
+        return True
+
+    def _attempt(self, fn, priority: str, tokens: int):
+        self._count(priority, "queued")
+        start = time.monotonic()
+        # Wait for rate budget before taking a slot, so a caller short of
+        # budget never holds a slot a ready call could use
+        self._charge(tokens)
+        self.gate.acquire(PRIORITIES[priority])
+        self._count(priority, "queued", -1)
+        self._count(priority, "in_flight")
+
+        try:
+            waited = time.monotonic() - start
+            self._count(priority, "queue_wait_seconds", waited)
+            observe_stage("llm_queue", waited)
+
+            with span("llm"):
+                return self._call_hedged(fn, priority, tokens)
+
+        finally:
+            self._count(priority, "in_flight", -1)
+            self.gate.release()
+
+    def _call_hedged(self, fn, priority: str, tokens: int):
+        if not self.hedge_after_seconds or priority != "interactive":
+            return fn()
+
+        first = self._hedge_pool.submit(fn)
+        done, _ = wait([first], timeout=self.hedge_after_seconds)
+        if done:
+            return first.result()
+
+        # The duplicate is a second Groq request and pays for itself. The
+        # slot is held here, so only hedge when the budget is there now
+        if not self._try_charge(tokens):
+            return first.result()
+        if first.done():
+            return first.result()
+        self._count(priority, "hedged")
+        logger.info("LLM call slow, sending hedged duplicate | after=%.2fs", self.hedge_after_seconds)
+
+        second = self._hedge_pool.submit(fn)
+        done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+
+        if winner.exception() is not None:
+            other = second if winner is first else first
+            return other.result()
+
+        return winner.result()
+
+    @staticmethod
+    def _record_usage(priority: str, message, estimated: int):
+        usage = getattr(message, "usage_metadata", None) or {}
+        prompt_tokens = usage.get("input_tokens")
+        completion_tokens = usage.get("output_tokens")
+
+        if prompt_tokens is None:
+            prompt_tokens = max(0, estimated - LLM_EST_OUTPUT_TOKENS)
+        if completion_tokens is None:
+            completion_tokens = len(str(getattr(message, "content", message))) // 4
+
+        LLM_TOKENS.labels(priority, "prompt").inc(prompt_tokens)
+        LLM_TOKENS.labels(priority, "completion").inc(completion_tokens)
+
+    def runnable(self, llm, priority: str = "interactive"):
+        """
+        Wrap an LLM as a Runnable so chains route every call through the gateway.
+        """
+        def invoke(prompt_value):
+            tokens = estimate_tokens(prompt_value)
+            message = self.call(lambda: llm.invoke(prompt_value), priority=priority, tokens=tokens)
+            self._record_usage(priority, message, tokens)
+            return message
+
+        return RunnableLambda(invoke)
+
+
+llm_gateway = LLMGateway()
+register_postfork(llm_gateway.reset_after_fork)
+register_worker_share(llm_gateway.set_worker_share)
+
+register_stats("llm_gateway", llm_gateway.metrics, gauges=("queued", "in_flight"), label="priority")
@@ -0,0 +1,66 @@
+import argparse
+
+# One-off: make review_id unique in collections loaded before it was enforced.
+#
+#   python -m components.migrate_review_ids           # report conflicts
+#   python -m components.migrate_review_ids --apply   # keep the oldest copy, build the index
+#
+# Rows imported under the old random (uuid4) ids never conflict here: they
+# differ from the content-addressed ids, so re-importing the same export
+# stores those reviews a second time.
+
+from pymongo.errors import OperationFailure
+
+from components.database import reviews_collection
+
+DUPLICATES_PIPELINE = [
+    {"$group": {"_id": "$review_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+    {"$match": {"count": {"$gt": 1}}}
+]
+
+
+def find_duplicate_review_ids():
+    """
+    {review_id: [_id, ...]} for every review_id stored more than once,
+    oldest document first.
+    """
+    return {
+        group["_id"]: sorted(group["ids"])
+        for group in reviews_collection.aggregate(DUPLICATES_PIPELINE, allowDiskUse=True)
+    }
+
+
+def migrate_review_ids(apply: bool = False):
+    duplicates = find_duplicate_review_ids()
+    extra = sum(len(ids) - 1 for ids in duplicates.values())
+
+    print(f"🔍 review_ids stored more than once: {len(duplicates)} | extra documents: {extra}")
+    for review_id, ids in list(duplicates.items())[:20]:
+        print(f"   {review_id}: {len(ids)} copies")
+
+    if not apply:
+        if duplicates:
+            print("ℹ️ Re-run with --apply to keep the oldest copy of each and build the index")
+        return
+
+    removed = 0
+    for ids in duplicates.values():
+        removed += reviews_collection.delete_many({"_id": {"$in": ids[1:]}}).deleted_count
+    print(f"🧹 Removed {removed} duplicate documents")
+
+    try:
+        reviews_collection.create_index("review_id", unique=True)
+    except OperationFailure as e:
+        # Writes raced the cleanup; running again picks them up
+        print(f"❌ Index build failed: {e}")
+        return
+    print("✅ Unique review_id index built")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report or remove duplicate review_ids")
+    parser.add_argument("--apply", action="store_true",
+                        help="delete all but the oldest copy and build the unique index")
+    args = parser.parse_args()
+
+    migrate_review_ids(apply=args.apply)
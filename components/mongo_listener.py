@@ -1,14 +1,78 @@
+import time
+
+from prometheus_client import start_http_server
+
 from components.database import reviews_collection
-from components.embedding_worker import embed_single_review
+from components.embedding_worker import embed_reviews
+from common.metrics import LISTENER_EVENTS, LISTENER_LAG
+from common.logger import get_logger
+from config.config import LISTENER_METRICS_PORT, LISTENER_BATCH_SIZE, LISTENER_BATCH_WAIT_MS
+
+logger = get_logger(__name__)
 
 print("🔥 mongo_listener.py started")
+
+# The listener runs as its own process, so it serves its own /metrics
+if LISTENER_METRICS_PORT:
+    start_http_server(LISTENER_METRICS_PORT)
+    print(f"📈 Metrics on :{LISTENER_METRICS_PORT}/metrics")
+
+
+def next_batch(stream):
+    """
+    Changes that arrived within LISTENER_BATCH_WAIT_MS of the first one,
+    at most LISTENER_BATCH_SIZE. Bulk inserts arrive as bursts of events,
+    so they are embedded and upserted together instead of one by one.
+    """
+    batch = []
+    deadline = None
+
+    while stream.alive and len(batch) < LISTENER_BATCH_SIZE:
+        change = stream.try_next()     # waits up to max_await_time_ms
+
+        if change is not None:
+            batch.append(change)
+            if deadline is None:
+                deadline = time.monotonic() + LISTENER_BATCH_WAIT_MS / 1000.0
+        elif batch:
+            break
+
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+
+    return batch
+
+
 print("🔥 Opening change stream...")
 
 pipeline = [{"$match": {"operationType": "insert"}}]
 
-with reviews_collection.watch(pipeline) as stream:
+with reviews_collection.watch(pipeline, max_await_time_ms=LISTENER_BATCH_WAIT_MS) as stream:
     print("✅ Change stream opened successfully")
 
-    for change in stream:
-        print("📥 New insert detected")
-        embed_single_review(change["fullDocument"])
+    while stream.alive:
+        changes = next_batch(stream)
+        if not changes:
+            continue
+
+        reviews = []
+        for change in changes:
+            review = change["fullDocument"]
+            if review.get("is_canonical") is False:
+                logger.debug("Near-duplicate of %s, not embedded", review.get("canonical_id"))
+                LISTENER_EVENTS.labels("near_duplicate").inc()
+                continue
+            reviews.append(review)
+
+        try:
+            embedded = embed_reviews(reviews)
+            LISTENER_EVENTS.labels("embedded").inc(embedded)
+            # Failed upserts stay embedded=False for embed_new_reviews to retry
+            LISTENER_EVENTS.labels("failed").inc(len(reviews) - embedded)
+        except Exception:
+            LISTENER_EVENTS.labels("failed").inc(len(reviews))
+            logger.error("Embedding failed | reviews=%d", len(reviews), exc_info=True)
+            raise
+        finally:
+            # clusterTime has one-second resolution; enough to spot a backlog
+            LISTENER_LAG.set(max(0, time.time() - changes[-1]["clusterTime"].time))
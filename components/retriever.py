@@ -1,17 +1,27 @@
+import threading
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnableSequence
 from langchain_core.output_parsers import JsonOutputParser
 from langchain_core.runnables import RunnablePassthrough
-
-from components.llm import load_llm
-from components.vector_store import load_vector_store
+from langchain_core.documents import Document
+
+from components.llm import get_llm
+from components.llm_gateway import llm_gateway
+from components.vector_store import get_index
+from components.embedding_service import embedding_service
+from components.review_hydration import hydrate_matches
+from components.keyword_index import keyword_index, reciprocal_rank_fusion
+from config.config import HYBRID_RETRIEVAL, HYBRID_CANDIDATES
 from langchain_core.runnables import RunnableLambda
-from common.logger import get_logger
+from common.logger import get_logger, LogSampler
 from common.custom_exception import CustomException
+from common.metrics import span
 
 logger = get_logger(__name__)
 
+hot_log = LogSampler()
+
 
 NEUTRAL_PROMPT = """
 You are an assistant that MUST generate a neutral product summary
@@ -115,139 +125,250 @@ Context:
 
 
 
-def create_qa_chain(summary_type, wsid, product_id):
-    try:
-        logger.info("Loading vector store")
-        vectorstore = load_vector_store()
-
-        if vectorstore is None:
-            raise CustomException("Vector store not loaded")
-
-        logger.info("Loading LLM")
-        llm = load_llm()
-
-
-
+SUMMARY_TYPES = ("neutral", "positive", "negative")
 
+PROMPTS = {
+    "neutral": NEUTRAL_PROMPT,
+    "positive": POSITIVE_PROMPT,
+    "negative": NEGATIVE_PROMPT
+}
 
-        if summary_type == "positive":
-            selected_prompt = POSITIVE_PROMPT
-            parser = JsonOutputParser()
-        elif summary_type == "negative":
-            selected_prompt = NEGATIVE_PROMPT
-            parser = JsonOutputParser()
-        else:
-            selected_prompt = NEUTRAL_PROMPT
-            parser = JsonOutputParser()
 
-        if summary_type == "neutral":
-            prompt = PromptTemplate(
-                template=selected_prompt,
-                input_variables=["context","question"]
-            )
-        else:
-            prompt = PromptTemplate(
-                template=selected_prompt,
-                input_variables=["context", "product_name","question"]
-            )
+def format_docs(docs):
+    reviews = []
 
+    if docs:
+        for d in docs:
+            if d.page_content:
+                reviews.append(d.page_content)
+            elif isinstance(d.metadata, dict):
+                reviews.append(d.metadata.get("review_text", ""))
 
+        product_name = docs[0].metadata.get("product_name", "This product")
+    else:
+        product_name = "This product"
 
-        def format_docs(docs):
-            reviews = []
+    context_text = "\n\n".join(reviews).strip()
 
-            if docs:
-                for d in docs:
-                    if d.page_content:
-                        reviews.append(d.page_content)
-                    elif isinstance(d.metadata, dict):
-                        reviews.append(d.metadata.get("review_text", ""))
+    if not context_text:
+        context_text = "Customers shared mixed feedback across multiple aspects."
 
-                product_name = docs[0].metadata.get("product_name", "This product")
-            else:
-                product_name = "This product"
+    return {
+        "context": context_text,
+        "product_name": product_name
+    }
 
-            context_text = "\n\n".join(reviews).strip()
 
-            if not context_text:
-                context_text = "Customers shared mixed feedback across multiple aspects."
+def fetch_reviews(user_query: str, wsid, product_id, k: int = 20, hybrid: bool = None, vector: list = None):
 
-            return {
-                "context": context_text,
-                "product_name": product_name
-            }
+    """
+    1. Metadata filter (WSID + product_id)
+    2. Semantic ranking using user query (or its precomputed `vector`)
+    3. BM25 ranking over the product's reviews, fused by reciprocal rank
+    4. Text hydrated from Mongo for compact vectors
+    """
+    hybrid = HYBRID_RETRIEVAL if hybrid is None else hybrid
 
-        
+    if not user_query:
+        # fallback query if user does not type anything
+        user_query = "customer review"
 
+    filter_dict = {
+        "WSID": str(wsid),          # ✅ EXACT key
+        "product_id": str(product_id)  # ✅ EXACT value
+    }
 
-        def fetch_reviews(user_query: str):
+    # Queried directly rather than through PineconeVectorStore, which drops
+    # matches without a text field in their metadata
+    if vector is None:
+        with span("embed"):
+            vector = embedding_service.embed(user_query)   # non-empty query is safer
 
-            """
-            1. Metadata filter (WSID + product_id)
-            2. Semantic ranking using user query
-            """
-
-            if not user_query:
-                # fallback query if user does not type anything
-                user_query = "customer review"
-
-            filter_dict = {
-                "WSID": str(wsid),          # ✅ EXACT key
-                "product_id": str(product_id)  # ✅ EXACT value
-            }
-            # if summary_type == "positive":
-            #     filter_dict["rating"] = {"$gte": 4}
-            # elif summary_type == "negative":
-            #     filter_dict["rating"] = {"$lte": 3}
+    with span("pinecone"):
+        res = get_index().query(
+            vector=vector,
+            top_k=max(k, HYBRID_CANDIDATES) if hybrid else k,
+            filter=filter_dict,
+            include_metadata=True
+        )
 
-            docs = vectorstore.similarity_search(
-                query=user_query,   # non-empty query is safer
-                k=20,
-                filter=filter_dict
-            )
+    dense = {m.id: m.metadata or {} for m in res.matches}
+    ranked_ids = [m.id for m in res.matches]
 
+    if hybrid:
+        # Model codes / OEM numbers ("TN750") are exact tokens MiniLM misses
+        with span("keyword"):
+            keyword_hits = keyword_index.search(str(wsid), product_id, user_query, k=HYBRID_CANDIDATES, kind="review")
+        if keyword_hits:
+            ranked_ids = reciprocal_rank_fusion(ranked_ids, [doc_id for doc_id, _ in keyword_hits])
             logger.info(
-                f"Retrieved {len(docs)} docs for WSID={wsid}, product_id={product_id}"
+                f"Hybrid fusion | dense={len(dense)} | keyword={len(keyword_hits)} | keyword_only={sum(1 for d, _ in keyword_hits if d not in dense)}"
             )
-            logger.info(
-            f"Retrieved {len(docs)} docs after metadata + semantic filtering"
-           )
-
-            if docs:
-                logger.info(f"Sample matched metadata: {docs[0].metadata}")
 
-            return docs
+    ranked_ids = ranked_ids[:k]
+    with span("hydrate"):
+        hydrated = hydrate_matches([
+            (doc_id, dense.get(doc_id) or {"review_id": doc_id, **filter_dict})
+            for doc_id in ranked_ids
+        ])
+
+    docs = []
+    for doc_id, metadata in zip(ranked_ids, hydrated):
+        text = metadata.pop("review_text", None) or metadata.get("text")
+        if text:
+            docs.append(Document(id=doc_id, page_content=text, metadata=metadata))
+
+    logger.info(
+        f"Retrieved {len(docs)} docs for WSID={wsid}, product_id={product_id}"
+    )
+
+    if docs and hot_log.allow(logger):
+        logger.debug("Sample matched metadata: %s", docs[0].metadata)
+
+    return docs
+
+
+def retrieval_pipeline(inputs: dict):
+    """
+    inputs = {"question": ..., "wsid": ..., "product_id": ..., "query_vector": optional}
+    """
+    user_query = inputs.get("question")
+    with span("retrieve"):
+        docs = fetch_reviews(user_query, inputs["wsid"], inputs["product_id"], vector=inputs.get("query_vector"))
+    formatted = format_docs(docs)
+    formatted["question"] = user_query
+    return formatted
+
+
+def build_qa_chain(summary_type, llm=None, priority="interactive"):
+    """
+    Compile the runnable for one summary type. wsid / product_id are
+    supplied at invoke time, so the result can be shared across requests.
+    """
+    try:
+        llm = llm or get_llm()
 
+        if llm is None:
+            raise CustomException("LLM not loaded")
 
+        if summary_type == "neutral":
+            input_variables = ["context", "question"]
+        else:
+            input_variables = ["context", "product_name", "question"]
 
-        # chain = (
-        #     RunnableLambda(lambda user_query: fetch_reviews(user_query))
-        #     | RunnableLambda(format_docs)
-        #     | prompt
-        #     | llm
-        #     | parser
-        # )
-        def retrieval_pipeline(user_query: str):
-            docs = fetch_reviews(user_query)
-            formatted = format_docs(docs)
-            formatted["question"] = user_query
-            return formatted
+        prompt = PromptTemplate(
+            template=PROMPTS.get(summary_type, NEUTRAL_PROMPT),
+            input_variables=input_variables
+        )
 
         chain = (
             RunnableLambda(retrieval_pipeline)
             | prompt
-            | llm
-            | parser
+            | llm_gateway.runnable(llm, priority=priority)
+            | JsonOutputParser()
         )
 
-
-
-
-        logger.info("Runnable chain created successfully")
-        
-        # Wrap the chain in the adapter so it works with your existing app.py code
+        logger.info(f"Runnable chain compiled | summary_type={summary_type}")
         return chain
 
     except Exception as e:
         logger.error("Failed to create runnable chain", exc_info=True)
-        return None
\ No newline at end of file
+        return None
+
+
+_compiled_chains = {}
+_compiled_lock = threading.Lock()
+
+
+def get_qa_chain(summary_type, priority="interactive"):
+    """
+    Compiled chain for `summary_type`, built once per process.
+    Invoke with {"question", "wsid", "product_id"}.
+    """
+    if summary_type not in SUMMARY_TYPES:
+        summary_type = "neutral"
+
+    key = (summary_type, priority)
+    chain = _compiled_chains.get(key)
+    if chain is None:
+        with _compiled_lock:
+            chain = _compiled_chains.get(key)
+            if chain is None:
+                chain = build_qa_chain(summary_type, priority=priority)
+                if chain is not None:
+                    _compiled_chains[key] = chain
+
+    return chain
+
+
+def create_qa_chain(summary_type, wsid, product_id):
+    """
+    Backwards-compatible wrapper: a chain invoked with just the question.
+    """
+    chain = get_qa_chain(summary_type)
+
+    if chain is None:
+        return None
+
+    return RunnableLambda(
+        lambda question: {"question": question, "wsid": wsid, "product_id": product_id}
+    ) | chain
+
+
+def generate_summary(summary_type, wsid, product_id, question, priority="interactive", query_vector=None):
+    """
+    Run the compiled chain and shape the /ask response. `query_vector`
+    skips embedding the question when the caller already has it.
+    """
+    logger.info(
+        f"Invoking chain | summary_type={summary_type} | wsid={wsid} | product_id={product_id}"
+    )
+
+    qa_chain = get_qa_chain(summary_type, priority=priority)
+
+    if qa_chain is None:
+        raise CustomException("QA chain creation failed")
+
+    logger.info("Running QA chain")
+
+    result = qa_chain.invoke({
+        "question": question,
+        "wsid": wsid,
+        "product_id": product_id,
+        "query_vector": query_vector
+    })
+
+    if hot_log.allow(logger):
+        logger.debug("RAW LLM RESULT: %s", result)
+    return shape_summary_response(summary_type, result)
+
+
+def shape_summary_response(summary_type, result):
+    """
+    Turn parsed LLM output into the {"answer", "topics"} shape /ask returns.
+    """
+    response = {
+        "answer": "",
+        "topics": []
+    }
+    if summary_type == "neutral":
+
+        # 🔹 If LLM returned STRING (StrOutputParser)
+        if isinstance(result, str):
+            response["answer"] = result.strip()
+
+        # 🔹 If LLM returned DICT (JsonOutputParser)
+        elif isinstance(result, dict) and "summary" in result:
+            response["answer"] = result["summary"].strip()
+
+    # =========================
+    # POSITIVE / NEGATIVE
+    # =========================
+    else:
+        if isinstance(result, dict) and "topics" in result:
+            response["topics"] = [
+                t for t in result["topics"]
+                if t.get("summary") and t["summary"].strip()
+            ]
+
+    return response
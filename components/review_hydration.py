@@ -0,0 +1,130 @@
+import threading
+from collections import OrderedDict
+
+from config.config import REVIEW_TEXT_CACHE_SIZE
+from common.logger import get_logger
+from common.metrics import span, register_stats
+
+logger = get_logger(__name__)
+
+HYDRATE_PROJECTION = {
+    "_id": 0,
+    "review_id": 1,
+    "review_title": 1,
+    "review_text": 1,
+    "product_name": 1,
+    "rating": 1
+}
+
+
+# --------------------------------------------------
+# review_id -> stored review text
+# --------------------------------------------------
+class ReviewTextCache:
+    """
+    LRU in front of reviews_collection for compact vectors, which carry
+    only filter fields and the review_id. Review ids are content-addressed,
+    so a cached entry never goes stale.
+    """
+
+    def __init__(self, collection=None, max_entries: int = REVIEW_TEXT_CACHE_SIZE):
+        self._collection = collection
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.stats = {
+            "requests": 0,
+            "cache_hits": 0,
+            "db_lookups": 0,
+            "not_found": 0
+        }
+
+    @property
+    def collection(self):
+        if self._collection is None:
+            from components.database import reviews_collection
+            self._collection = reviews_collection
+        return self._collection
+
+    def get_many(self, review_ids: list) -> dict:
+        """
+        {review_id: review fields} for the ids that exist; misses are
+        fetched with one `$in` query.
+        """
+        found, missing = {}, []
+
+        with self._lock:
+            for review_id in dict.fromkeys(review_ids):
+                self.stats["requests"] += 1
+                doc = self._cache.get(review_id)
+                if doc is None:
+                    missing.append(review_id)
+                else:
+                    self._cache.move_to_end(review_id)
+                    self.stats["cache_hits"] += 1
+                    found[review_id] = doc
+
+        if not missing:
+            return found
+
+        with span("mongo_hydrate"):
+            fetched = {
+                doc["review_id"]: doc
+                for doc in self.collection.find({"review_id": {"$in": missing}}, HYDRATE_PROJECTION)
+            }
+
+        with self._lock:
+            self.stats["db_lookups"] += 1
+            self.stats["not_found"] += len(missing) - len(fetched)
+            for review_id, doc in fetched.items():
+                self._cache[review_id] = doc
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        found.update(fetched)
+        return found
+
+    def hit_rate(self) -> float:
+        total = self.stats["requests"]
+        if not total:
+            return 0.0
+        return self.stats["cache_hits"] / total
+
+
+review_text_cache = ReviewTextCache()
+
+register_stats("review_text_cache", lambda: {**review_text_cache.stats, "entries": len(review_text_cache._cache)}, gauges=("entries",))
+
+
+def hydrate_matches(matches: list) -> list:
+    """
+    matches = [(vector_id, metadata), ...] in rank order.
+
+    Returns one metadata dict per match with `review_text`, `review_title`,
+    `product_name` and `rating` filled in. Full-metadata vectors (and CSV
+    chunks, which have no Mongo row) are used as they are.
+    """
+    review_ids = [
+        metadata.get("review_id") or vector_id
+        for vector_id, metadata in matches
+        if not metadata.get("review_text")
+    ]
+    stored = review_text_cache.get_many(review_ids) if review_ids else {}
+
+    hydrated = []
+    for vector_id, metadata in matches:
+        metadata = dict(metadata or {})
+        if not metadata.get("review_text"):
+            doc = stored.get(metadata.get("review_id") or vector_id)
+            if doc:
+                for field in ("review_title", "review_text", "product_name", "rating"):
+                    if not metadata.get(field) and doc.get(field) is not None:
+                        metadata[field] = doc[field]
+        hydrated.append(metadata)
+
+    if review_ids:
+        logger.info(
+            f"Hydrated matches | matches={len(matches)} | compact={len(review_ids)} | found={len(stored)} | cache_hit_rate={review_text_cache.hit_rate():.2f}"
+        )
+    return hydrated
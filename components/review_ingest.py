@@ -0,0 +1,194 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from pymongo.errors import BulkWriteError
+
+from components.database import reviews_collection
+from components.dedup import annotate_near_duplicates, credit_duplicates
+from components.keyword_index import keyword_index
+from config.config import WRITE_BUFFER_MAX_RECORDS, WRITE_BUFFER_MAX_WAIT_MS
+from common.logger import get_logger
+from common.metrics import span, register_stats
+
+logger = get_logger(__name__)
+
+DUPLICATE_KEY = 11000
+
+
+# --------------------------------------------------
+# Write buffer
+# --------------------------------------------------
+class ReviewWriteBuffer:
+    """
+    Coalesces review inserts from concurrent requests into unordered
+    insert_many calls.
+
+    Callers add prepared records and get a Future per record. A single
+    writer thread drains the queue, waiting at most `max_wait_ms` for up
+    to `max_records`, then skips reviews already stored, tags
+    near-duplicates and inserts the rest in one round trip. Each Future
+    resolves to "created", "duplicate" or "failed".
+    """
+
+    def __init__(self, max_records: int = WRITE_BUFFER_MAX_RECORDS, max_wait_ms: float = WRITE_BUFFER_MAX_WAIT_MS):
+        self.max_records = max(1, max_records)
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+
+        self.stats = {
+            "records": 0,
+            "flushes": 0,
+            "created": 0,
+            "duplicates": 0,
+            "failed": 0,
+            "max_batch": 0
+        }
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+    def add(self, record: dict) -> Future:
+        self._ensure_worker()
+
+        future = Future()
+        self._queue.put((record, future))
+        return future
+
+    def write(self, record: dict, timeout: float = None) -> str:
+        return self.add(record).result(timeout=timeout)
+
+    def metrics(self) -> dict:
+        return {**self.stats, "queue_depth": self._queue.qsize()}
+
+    # --------------------------------------------------
+    # Writer
+    # --------------------------------------------------
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run,
+                    name="review-write-buffer",
+                    daemon=True
+                )
+                self._worker.start()
+                logger.info(
+                    "Review write buffer started | max_records=%d | max_wait_ms=%.1f",
+                    self.max_records,
+                    self.max_wait * 1000
+                )
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_records:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+
+            try:
+                statuses = self.flush([record for record, _ in batch])
+            except Exception as e:
+                logger.error("Review write batch failed | size=%d", len(batch), exc_info=True)
+                self.stats["failed"] += len(batch)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), status in zip(batch, statuses):
+                future.set_result(status)
+
+            self.stats["records"] += len(batch)
+            self.stats["flushes"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+
+    def flush(self, records: list) -> list:
+        """
+        Insert `records`; returns "created" / "duplicate" / "failed" per record.
+        """
+        ids = [r["review_id"] for r in records]
+        with span("mongo_exists"):
+            existing = {
+                d["review_id"]
+                for d in reviews_collection.find({"review_id": {"$in": ids}}, {"_id": 0, "review_id": 1})
+            }
+
+        statuses = []
+        new_records = []
+        seen = set()
+        for record in records:
+            if record["review_id"] in existing or record["review_id"] in seen:
+                statuses.append("duplicate")
+                continue
+            seen.add(record["review_id"])
+            statuses.append("created")
+            new_records.append(record)
+
+        if new_records:
+            with span("dedup"):
+                existing_links = annotate_near_duplicates(new_records)
+
+            raced, failed = set(), set()
+            with span("mongo_insert"):
+                try:
+                    # insert_many adds _id to the dicts it is given
+                    reviews_collection.insert_many([dict(r) for r in new_records], ordered=False)
+                except BulkWriteError as e:
+                    # Unordered: every record without a write error was inserted
+                    for err in e.details.get("writeErrors", []):
+                        review_id = new_records[err["index"]]["review_id"]
+                        # Duplicate key: inserted by another worker since the existence check
+                        (raced if err.get("code") == DUPLICATE_KEY else failed).add(review_id)
+                    if failed:
+                        logger.warning("Reviews rejected by Mongo | failed=%d", len(failed), exc_info=True)
+
+            inserted = [r for r in new_records if r["review_id"] not in raced and r["review_id"] not in failed]
+            if raced or failed:
+                statuses = [
+                    status if status != "created"
+                    else "duplicate" if review_id in raced
+                    else "failed" if review_id in failed
+                    else status
+                    for status, review_id in zip(statuses, ids)
+                ]
+
+            # The reviews are stored at this point: follow-up failures are
+            # logged, never reported as failed inserts
+            try:
+                credit_duplicates(existing_links, (r["review_id"] for r in inserted))
+            except Exception:
+                logger.error("Crediting near-duplicates failed | inserted=%d", len(inserted), exc_info=True)
+
+            try:
+                with span("keyword_index"):
+                    keyword_index.index_reviews(inserted)
+            except Exception:
+                logger.error("Keyword indexing failed | inserted=%d", len(inserted), exc_info=True)
+
+        self.stats["created"] += statuses.count("created")
+        self.stats["duplicates"] += statuses.count("duplicate")
+        self.stats["failed"] += statuses.count("failed")
+        return statuses
+
+
+review_write_buffer = ReviewWriteBuffer()
+
+register_stats("review_write_buffer", review_write_buffer.metrics, gauges=("max_batch", "queue_depth"))
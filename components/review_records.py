@@ -0,0 +1,197 @@
+import codecs
+import hashlib
+import json
+import pandas as pd
+
+# Pure record shaping (no Mongo / model imports) so it can run in worker
+# processes and benchmarks.
+
+READ_CHUNK_BYTES = 64 * 1024
+NUMBER_CHARS = set("0123456789+-.eE")
+
+TEXT_COLUMNS = ["product_name", "review_title", "review_text", "review_date", "reviewer_name"]
+
+
+def make_review_id(wsid, product_id, reviewer, date, text) -> str:
+    """
+    Content-addressed review id: the same review always hashes to the same
+    id, so re-importing an export is idempotent.
+    """
+    parts = [" ".join(str(p or "").split()) for p in (wsid, product_id, reviewer, date, text)]
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _text_column(df, column):
+    if column not in df:
+        return pd.Series("", index=df.index)
+    return df[column].fillna("").astype(str)
+
+
+def normalize_review_frame(df):
+    """
+    Column-wise conversion of a raw review export into Mongo records.
+    """
+    raw_id = df["product_id"].astype(str).str.strip()
+    numeric_id = pd.to_numeric(raw_id, errors="coerce")
+    integral = numeric_id.notna() & (numeric_id % 1 == 0)
+    # 6853.0 -> "6853"; anything else is kept as given
+    product_id = numeric_id.where(integral).astype("Int64").astype(str).where(integral, raw_id)
+
+    out = pd.DataFrame({
+        "wsid": df["WSID"].astype(str),                 # 🔴 CAPS FIX
+        "product_id": product_id,
+        "rating": pd.to_numeric(df["rating"], errors="coerce").fillna(0).astype(int),
+        "embedded": False
+    }, index=df.index)
+
+    for column in TEXT_COLUMNS:
+        out[column] = _text_column(df, column)
+
+    out.insert(0, "review_id", [
+        make_review_id(*parts)
+        for parts in zip(out["wsid"], out["product_id"], out["reviewer_name"], out["review_date"], out["review_text"])
+    ])
+
+    return out
+
+
+REQUIRED_REVIEW_FIELDS = ["product_id", "product_name", "wsid", "rating", "review_text"]
+
+
+def prepare_review(data: dict) -> dict:
+    """
+    Validate one posted review and shape it for insertion (in place).
+    Raises ValueError naming the problem.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("review must be an object")
+
+    for field in REQUIRED_REVIEW_FIELDS:
+        if field not in data:
+            raise ValueError(f"{field} is required")
+
+    try:
+        data["rating"] = int(data["rating"])
+    except (TypeError, ValueError):
+        raise ValueError("rating must be an integer") from None
+
+    data["embedded"] = False  # so listener embeds it
+    data["product_id"] = normalize_product_id(data["product_id"])
+
+    # Ids are always content-addressed; a client id may only restate it
+    review_id = make_review_id(
+        data["wsid"], data["product_id"], data.get("reviewer_name"),
+        data.get("review_date"), data["review_text"]
+    )
+    if data.get("review_id") not in (None, "", review_id):
+        raise ValueError("review_id does not match the review content")
+    data["review_id"] = review_id
+    return data
+
+
+def normalize_product_id(value) -> str:
+    """
+    Scalar counterpart of the product_id conversion above.
+    """
+    value = str(value).strip()
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    if number.is_integer():
+        return str(int(number))
+    return value
+
+
+# --------------------------------------------------
+# Streaming request parsing
+# --------------------------------------------------
+def iter_ndjson(stream):
+    """
+    Yield (index, record or None, error or None) per non-blank line.
+    """
+    index = 0
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield index, json.loads(line), None
+        except ValueError as e:
+            yield index, None, f"invalid JSON: {e}"
+        index += 1
+
+
+def iter_json_array(stream, chunk_bytes: int = READ_CHUNK_BYTES):
+    """
+    Yield (index, record, None) from a top-level JSON array, decoding one
+    element at a time so the body is never held in memory as a whole.
+    Raises ValueError when the body is not a well-formed array.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    buffer, pos, index = "", 0, 0
+    expect = "open"     # "[" -> first element -> "," / "]" -> element -> ...
+    eof = False
+
+    while True:
+        while pos < len(buffer) and buffer[pos].isspace():
+            pos += 1
+
+        if pos < len(buffer):
+            char = buffer[pos]
+            if expect == "open":
+                if char != "[":
+                    raise ValueError("expected a JSON array")
+                pos, expect = pos + 1, "first"
+                continue
+            if expect in ("first", "separator") and char == "]":
+                return
+            if expect == "separator":
+                if char != ",":
+                    raise ValueError(f"expected ',' after element {index - 1}")
+                pos, expect = pos + 1, "element"
+                continue
+
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise ValueError(f"invalid JSON at element {index}") from None
+            else:
+                # A number cut at the chunk boundary decodes too ("12" of
+                # "123", "-0" of "-0.5"); wait until the character after it
+                # cannot continue the number
+                cut = end == len(buffer) or (
+                    isinstance(record, (int, float)) and buffer[end] in NUMBER_CHARS
+                )
+                if not cut or eof:
+                    yield index, record, None
+                    index += 1
+                    pos, expect = end, "separator"
+                    continue
+
+        if eof:
+            raise ValueError("unterminated JSON array")
+
+        chunk = stream.read(chunk_bytes)
+        eof = not chunk
+        buffer = buffer[pos:] + utf8.decode(chunk or b"", final=eof)
+        pos = 0
+
+
+def validate_bulk_reviews(records, wsid: str):
+    """
+    Run prepare_review over parsed (index, record, error) tuples from one
+    /reviews/bulk body. The request holds the ingest slot of `wsid` only,
+    so records for any other store are invalid.
+    """
+    for index, raw, error in records:
+        if error is None:
+            try:
+                prepare_review(raw)
+                if str(raw["wsid"]) != wsid:
+                    raise ValueError("wsid does not match ?wsid=")
+            except ValueError as e:
+                error = str(e)
+        yield index, raw if error is None else None, error
@@ -0,0 +1,200 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from config.config import (
+    SINGLEFLIGHT_LEASE_SECONDS,
+    SINGLEFLIGHT_RESULT_TTL_SECONDS,
+    SINGLEFLIGHT_POLL_SECONDS
+)
+from common.logger import get_logger
+from common.metrics import register_stats
+
+logger = get_logger(__name__)
+
+
+def normalize_key(*parts, question: str = None) -> str:
+    """
+    Request key shared by the coalescing layer and the response it produces:
+    `parts` joined with '|' as given (WSIDs and product ids are
+    case-sensitive), then the free-text question case-folded and
+    whitespace-collapsed.
+    """
+    key = [str(p) if p is not None else "" for p in parts]
+    if question is not None:
+        key.append(" ".join(str(question).lower().split()))
+    return "|".join(key)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical computations.
+
+    Within a process, followers wait on the leader thread's Event.
+    Across workers, the leader holds a Mongo lease on the key and publishes
+    its result on the same document; other workers poll it until the
+    result appears or the lease expires (then they take over).
+    """
+
+    def __init__(
+        self,
+        collection=None,
+        lease_seconds: float = SINGLEFLIGHT_LEASE_SECONDS,
+        result_ttl_seconds: float = SINGLEFLIGHT_RESULT_TTL_SECONDS,
+        poll_seconds: float = SINGLEFLIGHT_POLL_SECONDS
+    ):
+        self.collection = collection
+        self.lease_seconds = lease_seconds
+        self.result_ttl_seconds = result_ttl_seconds
+        self.poll_seconds = poll_seconds
+
+        self._calls = {}
+        self._lock = threading.Lock()
+
+        self.stats = {"leader": 0, "coalesced_local": 0, "coalesced_remote": 0}
+
+    @property
+    def owner(self) -> str:
+        # Read per call: forked workers share the instance built in the master
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    # --------------------------------------------------
+    # In-process coalescing
+    # --------------------------------------------------
+    def do(self, key: str, fn, lease_seconds: float = None):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            self.stats["coalesced_local"] += 1
+            logger.info("Single-flight wait (local) | key=%s", key)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = self._do_shared(key, fn, lease_seconds or self.lease_seconds)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    # --------------------------------------------------
+    # Cross-worker coalescing through a Mongo lease
+    # --------------------------------------------------
+    def _do_shared(self, key: str, fn, lease_seconds: float):
+        if self.collection is None:
+            self.stats["leader"] += 1
+            return fn()
+
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + lease_seconds
+
+        while True:
+            try:
+                if self._acquire(key, token, lease_seconds):
+                    break
+
+                doc = self.collection.find_one({"_id": key})
+                if doc and doc.get("status") == "done":
+                    self.stats["coalesced_remote"] += 1
+                    logger.info("Single-flight result shared (remote) | key=%s", key)
+                    return doc.get("result")
+
+            except PyMongoError:
+                logger.warning("Single-flight lease unavailable, computing locally | key=%s", key, exc_info=True)
+                self.stats["leader"] += 1
+                return fn()
+
+            if time.monotonic() > deadline:
+                logger.warning("Single-flight wait timed out, computing locally | key=%s", key)
+                self.stats["leader"] += 1
+                return fn()
+
+            time.sleep(self.poll_seconds)
+
+        self.stats["leader"] += 1
+
+        try:
+            result = fn()
+        except Exception:
+            self._release(key, token)
+            raise
+
+        self._publish(key, token, result)
+        return result
+
+    @staticmethod
+    def _now():
+        return datetime.now(timezone.utc)
+
+    def _acquire(self, key: str, token: str, lease_seconds: float) -> bool:
+        now = self._now()
+        try:
+            # Matches only a missing or expired document; a live lease or
+            # fresh result makes the upsert collide on _id.
+            self.collection.update_one(
+                {"_id": key, "expires_at": {"$lt": now}},
+                {"$set": {
+                    "status": "running",
+                    "owner": self.owner,
+                    "token": token,
+                    "result": None,
+                    "expires_at": now + timedelta(seconds=lease_seconds)
+                }},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    def _publish(self, key: str, token: str, result):
+        try:
+            self.collection.update_one(
+                {"_id": key, "token": token},
+                {"$set": {
+                    "status": "done",
+                    "result": result,
+                    "expires_at": self._now() + timedelta(seconds=self.result_ttl_seconds)
+                }}
+            )
+        except PyMongoError:
+            logger.warning("Failed to publish single-flight result | key=%s", key, exc_info=True)
+            self._release(key, token)
+
+    def _release(self, key: str, token: str):
+        try:
+            self.collection.delete_one({"_id": key, "token": token})
+        except PyMongoError:
+            logger.warning("Failed to release single-flight lease | key=%s", key, exc_info=True)
+
+
+def create_single_flight():
+    from components.database import inflight_requests
+    return SingleFlight(collection=inflight_requests)
+
+
+single_flight = create_single_flight()
+
+register_stats("single_flight", lambda: single_flight.stats)
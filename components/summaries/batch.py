@@ -0,0 +1,116 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from components.embedding_service import embedding_service
+from components.retriever import generate_summary, SUMMARY_TYPES
+from components.singleflight import single_flight, normalize_key
+from components.summaries.materializer import get_materialized_summaries, is_default_question
+from config.config import DEFAULT_SUMMARY_QUESTIONS, ASK_BATCH_CONCURRENCY
+from common.logger import get_logger
+from common.metrics import span
+
+logger = get_logger(__name__)
+
+
+def parse_batch_item(raw) -> tuple:
+    """
+    (wsid, product_id, summary_type, question) from one /ask/batch item,
+    with /ask's defaults. Raises ValueError for an unusable item.
+    """
+    if not isinstance(raw, dict):
+        raise ValueError("item must be an object")
+
+    wsid = raw.get("wsid") or raw.get("WSID")
+    product_id = raw.get("product_id")
+    if not wsid or product_id in (None, ""):
+        raise ValueError("wsid and product_id required")
+
+    summary_type = raw.get("summary_type", "neutral")
+    if summary_type not in SUMMARY_TYPES:
+        summary_type = "neutral"
+
+    question = raw.get("question")
+    if question is not None and not isinstance(question, str):
+        raise ValueError("question must be a string")
+    if is_default_question(summary_type, question):
+        question = None
+
+    return str(wsid), str(product_id), summary_type, question
+
+
+def ask_batch(items: list, concurrency: int = ASK_BATCH_CONCURRENCY):
+    """
+    Yield (indexes, source, result or None, error or None) per distinct
+    item as each one is ready: materialized summaries first, in one read,
+    then the rest computed `concurrency` at a time. The questions of the
+    computed items are embedded together before any chain runs.
+
+    `items` are parse_batch_item() tuples; identical items are answered
+    once and reported under all their indexes.
+    """
+    groups = {}
+    for index, item in enumerate(items):
+        groups.setdefault(item, []).append(index)
+
+    # Default questions -> materialized store, one query for the whole batch
+    defaults = [(wsid, product_id, summary_type) for wsid, product_id, summary_type, question in groups if question is None]
+    with span("materialized_lookup"):
+        stored = get_materialized_summaries(defaults)
+
+    pending = []
+    for item, indexes in groups.items():
+        wsid, product_id, summary_type, question = item
+        summary = stored.get((wsid, product_id, summary_type)) if question is None else None
+        if summary is not None:
+            yield indexes, "materialized", summary, None
+        else:
+            pending.append(item)
+
+    if not pending:
+        return
+
+    questions = {
+        item: item[3] or DEFAULT_SUMMARY_QUESTIONS[item[2]]
+        for item in pending
+    }
+
+    # Pages ask the same few questions of many products: embed each once
+    unique = list(dict.fromkeys(questions.values()))
+    try:
+        with span("embed"):
+            vectors = dict(zip(unique, embedding_service.embed_many(unique)))
+    except Exception as e:
+        logger.error("Batch query embedding failed | questions=%d", len(unique), exc_info=True)
+        for item in pending:
+            yield groups[item], "computed", None, e
+        return
+
+    def compute(item):
+        wsid, product_id, summary_type, _ = item
+        question = questions[item]
+        # Same key as /ask, so batch and single requests coalesce
+        return single_flight.do(
+            normalize_key("ask", wsid, product_id, summary_type, question=question),
+            lambda: generate_summary(summary_type, wsid, product_id, question, query_vector=vectors[question])
+        )
+
+    logger.info(
+        "Batch summaries | items=%d | materialized=%d | computing=%d | questions=%d",
+        len(items), len(groups) - len(pending), len(pending), len(unique)
+    )
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(pending))), thread_name_prefix="ask-batch") as pool:
+        # Copy the request's context so pool threads log its request id
+        futures = {pool.submit(contextvars.copy_context().run, compute, item): item for item in pending}
+        try:
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    yield groups[item], "computed", future.result(), None
+                except Exception as e:
+                    logger.error("Batch summary failed | wsid=%s | product_id=%s", item[0], item[1], exc_info=True)
+                    yield groups[item], "computed", None, e
+        finally:
+            # Client went away: do not start the items still queued
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,281 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from langchain_core.prompts import PromptTemplate
+from langchain_core.output_parsers import JsonOutputParser, StrOutputParser
+
+from components.database import reviews_collection, partial_summaries
+from components.llm import get_llm
+from components.llm_gateway import llm_gateway
+from components.retriever import PROMPTS, NEUTRAL_PROMPT, shape_summary_response
+from config.config import (
+    DEFAULT_SUMMARY_QUESTIONS,
+    MAP_GROUP_MAX_TOKENS,
+    MAP_GROUP_MIN_TOKENS,
+    MAP_CONCURRENCY,
+    REDUCE_MAX_TOKENS
+)
+from common.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Content-defined group boundaries: a review whose id hash hits this modulus
+# closes its group (once the group is big enough). Inserting a review only
+# reshapes the group it lands in, so the other cached partials stay valid.
+BOUNDARY_MODULUS = 8
+
+MAP_PROMPT = """
+You are condensing a batch of customer reviews for one product.
+
+FOCUS:
+{focus}
+
+RULES:
+- Use ONLY the reviews below
+- Write 5-8 short factual notes, one per line
+- Mention how common each point is (e.g. "many", "a few", "one reviewer")
+- No introduction, no conclusion
+
+Reviews:
+{reviews}
+"""
+
+COMBINE_PROMPT = """
+You are merging partial notes about customer reviews of one product.
+
+FOCUS:
+{focus}
+
+RULES:
+- Merge overlapping points and keep how common each point is
+- Write at most 10 short factual notes, one per line
+- No introduction, no conclusion
+
+Partial notes:
+{reviews}
+"""
+
+FOCUS = {
+    "neutral": "All recurring points: quality, performance, value, compatibility, usability.",
+    "positive": "Only praise and positive experiences.",
+    "negative": "Only complaints, defects and issues."
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _review_line(review: dict) -> str:
+    title = review.get("review_title") or ""
+    text = review.get("review_text") or ""
+    return f"[{review.get('rating', '')}/5] {title} {text}".strip()
+
+
+def _boundary(review_id: str) -> bool:
+    digest = hashlib.sha1(str(review_id).encode("utf-8")).digest()
+    return digest[0] % BOUNDARY_MODULUS == 0
+
+
+# --------------------------------------------------
+# Partitioning
+# --------------------------------------------------
+def partition_reviews(reviews: list, max_tokens: int = MAP_GROUP_MAX_TOKENS, min_tokens: int = MAP_GROUP_MIN_TOKENS):
+    """
+    Split reviews (sorted by date, then id) into token-bounded groups.
+    Returns [(group_hash, [lines])].
+    """
+    groups = []
+    ids, lines, tokens = [], [], 0
+
+    def close():
+        group_hash = hashlib.sha1("|".join(sorted(ids)).encode("utf-8")).hexdigest()
+        groups.append((group_hash, list(lines)))
+
+    for review in reviews:
+        line = _review_line(review)
+        line_tokens = estimate_tokens(line)
+
+        if lines and tokens + line_tokens > max_tokens:
+            close()
+            ids, lines, tokens = [], [], 0
+
+        ids.append(str(review["review_id"]))
+        lines.append(line)
+        tokens += line_tokens
+
+        if tokens >= min_tokens and _boundary(review["review_id"]):
+            close()
+            ids, lines, tokens = [], [], 0
+
+    if lines:
+        close()
+
+    return groups
+
+
+def load_product_reviews(wsid: str, product_id: str):
+    return list(
+        reviews_collection.find(
+            {"wsid": wsid, "product_id": str(product_id)},
+            {"_id": 0, "review_id": 1, "review_title": 1, "review_text": 1, "rating": 1, "review_date": 1}
+        ).sort([("review_date", 1), ("review_id", 1)])
+    )
+
+
+# --------------------------------------------------
+# Map / reduce
+# --------------------------------------------------
+_chains = {}
+
+
+def _chain(name: str):
+    if name not in _chains:
+        llm = llm_gateway.runnable(get_llm(), priority="background")
+        if name == "map":
+            _chains[name] = PromptTemplate.from_template(MAP_PROMPT) | llm | StrOutputParser()
+        elif name == "combine":
+            _chains[name] = PromptTemplate.from_template(COMBINE_PROMPT) | llm | StrOutputParser()
+        else:
+            _chains[name] = PromptTemplate.from_template(PROMPTS.get(name, NEUTRAL_PROMPT)) | llm | JsonOutputParser()
+    return _chains[name]
+
+
+def _map_groups(wsid: str, product_id: str, summary_type: str, groups: list):
+    keys = [f"{summary_type}:{group_hash}" for group_hash, _ in groups]
+
+    cached = {
+        doc["_id"]: doc["summary"]
+        for doc in partial_summaries.find({"_id": {"$in": keys}}, {"summary": 1})
+    }
+
+    missing = [(key, lines) for key, (_, lines) in zip(keys, groups) if key not in cached]
+
+    logger.info(
+        f"Map step | product_id={product_id} | type={summary_type} | groups={len(groups)} | cached={len(cached)} | to_compute={len(missing)}"
+    )
+
+    def summarize(item):
+        key, lines = item
+        summary = _chain("map").invoke({
+            "focus": FOCUS[summary_type],
+            "reviews": "\n".join(lines)
+        }).strip()
+
+        partial_summaries.update_one(
+            {"_id": key},
+            {"$set": {
+                "wsid": wsid,
+                "product_id": str(product_id),
+                "summary_type": summary_type,
+                "summary": summary,
+                "created_at": datetime.now(timezone.utc)
+            }},
+            upsert=True
+        )
+        return key, summary
+
+    if missing:
+        with ThreadPoolExecutor(max_workers=MAP_CONCURRENCY) as pool:
+            for key, summary in pool.map(summarize, missing):
+                cached[key] = summary
+
+    # Drop partials from groups that no longer exist
+    partial_summaries.delete_many({
+        "wsid": wsid,
+        "product_id": str(product_id),
+        "summary_type": summary_type,
+        "_id": {"$nin": keys}
+    })
+
+    return [cached[key] for key in keys]
+
+
+def fit_to_budget(partials: list, max_tokens: int) -> list:
+    """
+    Cut partials so their total fits `max_tokens`: the smallest are kept
+    whole and the rest share what is left equally.
+    """
+    sizes = [estimate_tokens(p) for p in partials]
+    if sum(sizes) <= max_tokens:
+        return partials
+
+    logger.warning(
+        "Partials over budget, truncating | tokens=%d | max_tokens=%d | partials=%d",
+        sum(sizes), max_tokens, len(partials)
+    )
+
+    fitted = list(partials)
+    remaining = max_tokens
+    order = sorted(range(len(partials)), key=sizes.__getitem__)
+    for position, i in enumerate(order):
+        share = remaining // (len(order) - position)
+        if sizes[i] > share:
+            # estimate_tokens(text) == len(text) // 4 + 1
+            fitted[i] = partials[i][:max(0, share - 1) * 4]
+        remaining -= estimate_tokens(fitted[i])
+    return fitted
+
+
+def _combine(partials: list, summary_type: str):
+    """
+    Merge partial notes level by level until they fit one reduce prompt.
+    Partials that cannot be merged further are truncated to the budget, so
+    no reduce or combine prompt goes out over it.
+    """
+    while sum(estimate_tokens(p) for p in partials) > REDUCE_MAX_TOKENS and len(partials) > 1:
+        batches, batch, tokens = [], [], 0
+        for p in partials:
+            if batch and tokens + estimate_tokens(p) > MAP_GROUP_MAX_TOKENS:
+                batches.append(batch)
+                batch, tokens = [], 0
+            batch.append(p)
+            tokens += estimate_tokens(p)
+        if batch:
+            batches.append(batch)
+
+        if len(batches) == len(partials):
+            break   # every partial is already too large to pair up
+
+        with ThreadPoolExecutor(max_workers=MAP_CONCURRENCY) as pool:
+            partials = list(pool.map(
+                lambda b: _chain("combine").invoke({
+                    "focus": FOCUS[summary_type],
+                    "reviews": "\n\n".join(fit_to_budget(b, MAP_GROUP_MAX_TOKENS))
+                }).strip(),
+                batches
+            ))
+
+    return fit_to_budget(partials, REDUCE_MAX_TOKENS)
+
+
+def summarize_product(wsid: str, product_id: str, summary_type: str = "neutral", product_name: str = None):
+    """
+    Summary over every review of the product, in the same shape /ask returns.
+    """
+    reviews = load_product_reviews(wsid, product_id)
+    if not reviews:
+        return shape_summary_response(summary_type, None)
+
+    groups = partition_reviews(reviews)
+    partials = _map_groups(wsid, product_id, summary_type, groups)
+    partials = _combine(partials, summary_type)
+
+    if product_name is None:
+        doc = reviews_collection.find_one(
+            {"wsid": wsid, "product_id": str(product_id)},
+            {"_id": 0, "product_name": 1}
+        )
+        product_name = (doc or {}).get("product_name") or "This product"
+
+    result = _chain(summary_type).invoke({
+        "question": DEFAULT_SUMMARY_QUESTIONS[summary_type],
+        "context": "\n\n".join(partials),
+        "product_name": product_name
+    })
+
+    logger.info(
+        f"Reduce step done | product_id={product_id} | type={summary_type} | reviews={len(reviews)} | partials={len(partials)}"
+    )
+    return shape_summary_response(summary_type, result)
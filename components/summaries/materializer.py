@@ -0,0 +1,224 @@
+import argparse
+import time
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import DuplicateKeyError
+
+from components.database import reviews_collection, product_summaries
+from config.config import (
+    DEFAULT_SUMMARY_QUESTIONS,
+    SUMMARY_REFRESH_MIN_NEW_REVIEWS,
+    SUMMARY_MAX_AGE_HOURS,
+    SUMMARY_REFRESH_INTERVAL_SECONDS,
+    MAP_REDUCE_MIN_REVIEWS
+)
+from common.logger import get_logger
+from common.metrics import register_stats
+
+logger = get_logger(__name__)
+
+# A refresh that has not finished after this long is considered abandoned
+REFRESH_LEASE = timedelta(minutes=15)
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def is_default_question(summary_type: str, question) -> bool:
+    if not question:
+        return True
+    default = DEFAULT_SUMMARY_QUESTIONS.get(summary_type, "")
+    return " ".join(str(question).lower().split()) == default.lower()
+
+
+# --------------------------------------------------
+# Read path (/ask)
+# --------------------------------------------------
+lookup_stats = {"hits": 0, "misses": 0}
+register_stats("summary_store", lambda: lookup_stats)
+
+def get_materialized_summary(wsid: str, product_id: str, summary_type: str):
+    """
+    Single indexed read; returns the stored /ask response or None.
+    """
+    doc = product_summaries.find_one(
+        {"wsid": wsid, "product_id": str(product_id)},
+        {"_id": 0, f"summaries.{summary_type}": 1}
+    )
+    summary = (doc or {}).get("summaries", {}).get(summary_type)
+    lookup_stats["hits" if summary is not None else "misses"] += 1
+    return summary
+
+
+def get_materialized_summaries(requests: list) -> dict:
+    """
+    One read for many (wsid, product_id, summary_type) lookups; returns
+    {request: stored /ask response} for the ones that are materialized.
+    """
+    products = {(wsid, str(product_id)) for wsid, product_id, _ in requests}
+    if not products:
+        return {}
+
+    docs = product_summaries.find(
+        {"$or": [{"wsid": wsid, "product_id": product_id} for wsid, product_id in products]},
+        {"_id": 0, "wsid": 1, "product_id": 1, "summaries": 1}
+    )
+    stored = {(d["wsid"], d["product_id"]): d.get("summaries") or {} for d in docs}
+
+    found = {}
+    for wsid, product_id, summary_type in requests:
+        summary = stored.get((wsid, str(product_id)), {}).get(summary_type)
+        lookup_stats["hits" if summary is not None else "misses"] += 1
+        if summary is not None:
+            found[(wsid, product_id, summary_type)] = summary
+    return found
+
+
+# --------------------------------------------------
+# Refresh job
+# --------------------------------------------------
+def needs_refresh(doc, review_count: int) -> bool:
+    if not doc or not doc.get("summaries"):
+        return True
+
+    delta = review_count - doc.get("review_count", 0)
+    if delta >= SUMMARY_REFRESH_MIN_NEW_REVIEWS:
+        return True
+
+    refreshed_at = doc.get("refreshed_at")
+    if refreshed_at is None:
+        return True
+    if refreshed_at.tzinfo is None:
+        refreshed_at = refreshed_at.replace(tzinfo=timezone.utc)
+
+    # Only age out products that actually changed
+    return delta > 0 and _now() - refreshed_at >= timedelta(hours=SUMMARY_MAX_AGE_HOURS)
+
+
+def _claim(wsid: str, product_id: str) -> bool:
+    """
+    Mark the product as refreshing unless another job holds a fresh claim.
+    The previous summaries stay readable throughout.
+    """
+    now = _now()
+    try:
+        # A live claim makes the filter miss and the upsert collide on the
+        # unique (wsid, product_id) index
+        product_summaries.update_one(
+            {
+                "wsid": wsid,
+                "product_id": product_id,
+                "$or": [
+                    {"refreshing_since": None},
+                    {"refreshing_since": {"$lt": now - REFRESH_LEASE}}
+                ]
+            },
+            {
+                "$set": {"refreshing_since": now},
+                "$setOnInsert": {"summaries": {}, "review_count": 0}
+            },
+            upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    return True
+
+
+def refresh_product(wsid: str, product_id: str, review_count: int):
+    # Imported here so the read path and refresh policy above load without
+    # the retrieval chain and its models
+    from components.retriever import generate_summary, SUMMARY_TYPES
+    from components.summaries.map_reduce import summarize_product
+
+    product_id = str(product_id)
+
+    if not _claim(wsid, product_id):
+        logger.info(f"Summary refresh already running | wsid={wsid} | product_id={product_id}")
+        return False
+
+    try:
+        if review_count >= MAP_REDUCE_MIN_REVIEWS:
+            # Large products: cover every review, reusing cached group partials
+            summaries = {
+                summary_type: summarize_product(wsid, product_id, summary_type)
+                for summary_type in SUMMARY_TYPES
+            }
+        else:
+            summaries = {
+                summary_type: generate_summary(
+                    summary_type, wsid, product_id, DEFAULT_SUMMARY_QUESTIONS[summary_type],
+                    priority="background"
+                )
+                for summary_type in SUMMARY_TYPES
+            }
+    except Exception:
+        logger.error(f"Summary refresh failed | wsid={wsid} | product_id={product_id}", exc_info=True)
+        product_summaries.update_one(
+            {"wsid": wsid, "product_id": product_id},
+            {"$set": {"refreshing_since": None}}
+        )
+        return False
+
+    # Swap in all three summary types at once
+    product_summaries.update_one(
+        {"wsid": wsid, "product_id": product_id},
+        {
+            "$set": {
+                "summaries": summaries,
+                "review_count": review_count,
+                "refreshed_at": _now(),
+                "refreshing_since": None
+            },
+            "$inc": {"version": 1}
+        }
+    )
+
+    logger.info(
+        f"Summaries refreshed | wsid={wsid} | product_id={product_id} | reviews={review_count}"
+    )
+    return True
+
+
+def review_counts():
+    pipeline = [
+        {"$group": {
+            "_id": {"wsid": "$wsid", "product_id": "$product_id"},
+            "count": {"$sum": 1}
+        }}
+    ]
+    for row in reviews_collection.aggregate(pipeline):
+        yield row["_id"]["wsid"], str(row["_id"]["product_id"]), row["count"]
+
+
+def materialize_summaries():
+    refreshed = 0
+
+    existing = {
+        (d["wsid"], d["product_id"]): d
+        for d in product_summaries.find(
+            {}, {"_id": 0, "wsid": 1, "product_id": 1, "review_count": 1, "refreshed_at": 1, "summaries": 1}
+        )
+    }
+
+    for wsid, product_id, count in review_counts():
+        if not wsid:
+            continue
+        if needs_refresh(existing.get((wsid, product_id)), count):
+            refreshed += int(refresh_product(wsid, product_id, count))
+
+    logger.info(f"Summary materialization pass done | refreshed={refreshed}")
+    return refreshed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute product summaries")
+    parser.add_argument("--loop", action="store_true",
+                        help="keep running every SUMMARY_REFRESH_INTERVAL_SECONDS")
+    args = parser.parse_args()
+
+    while True:
+        materialize_summaries()
+        if not args.loop:
+            break
+        time.sleep(SUMMARY_REFRESH_INTERVAL_SECONDS)
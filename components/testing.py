@@ -1,12 +1,14 @@
 import os
 from pinecone import Pinecone, ServerlessSpec # type: ignore
 from dotenv import load_dotenv
+from config.config import PINECONE_INDEX_NAME
 
 load_dotenv()
 
 pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
 
-index_name = os.getenv("PINECONE_INDEX")
+# Same index name as components.vector_store.INDEX_NAME
+index_name = os.getenv("PINECONE_INDEX") or PINECONE_INDEX_NAME
 
 # ❌ DO NOT import this file anywhere else
 if index_name not in [i.name for i in pc.list_indexes()]:
@@ -1,6 +1,11 @@
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from components.llm import load_llm
+from components.llm import get_llm
+from components.llm_gateway import llm_gateway
+from langchain_core.exceptions import OutputParserException
+from common.logger import get_logger
+
+logger = get_logger(__name__)
 
 
 TOPIC_PROMPT = """
@@ -23,14 +28,14 @@ Review:
 """
 
 
-llm = load_llm()
+llm = get_llm()
 
 chain = (
     PromptTemplate(
         template=TOPIC_PROMPT,
         input_variables=["review"]
     )
-    | llm
+    | llm_gateway.runnable(llm, priority="background")
     | JsonOutputParser()
 )
 
@@ -53,7 +58,11 @@ chain = (
 #     except Exception as e:
 #         print("Topic extraction error:", e)
 #         return []
-def extract_topics(review_text: str) -> list[str]:
+def extract_topics(review_text: str) -> list[str] | None:
+    """
+    Returns 2-3 topics, [] when the model's answer is unusable, or None
+    when the LLM call itself failed (the review should be retried later).
+    """
     try:
         result = chain.invoke({"review": review_text})
 
@@ -69,7 +78,11 @@ def extract_topics(review_text: str) -> list[str]:
 
         return []
 
-    except Exception as e:
-        print("Topic extraction error:", e)
+    except OutputParserException as e:
+        logger.warning("Topic extraction returned invalid JSON: %s", e)
         return []
 
+    except Exception as e:
+        logger.warning("Topic extraction error: %s", e)
+        return None
+
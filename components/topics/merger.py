@@ -1,12 +1,16 @@
 from sklearn.metrics.pairwise import cosine_similarity
 from components.database import topic_store, embedding_cache
 from components.embeddings import embed_text
+from common.metrics import register_stats
 
 
 # 🔑 Two thresholds (important)
 GENERIC_TO_SPECIFIC_THRESHOLD = 0.50
 NORMAL_THRESHOLD = 0.70
 
+embedding_cache_stats = {"hits": 0, "misses": 0}
+register_stats("topic_embedding_cache", lambda: embedding_cache_stats)
+
 
 # -------------------------
 # Helpers
@@ -35,8 +39,10 @@ def is_generic(topic: str) -> bool:
 def embed_cached(text: str):
     cached = embedding_cache.find_one({"text": text})
     if cached:
+        embedding_cache_stats["hits"] += 1
         return cached["embedding"]
 
+    embedding_cache_stats["misses"] += 1
     embedding = embed_text(text)
     embedding_cache.insert_one({
         "text": text,
@@ -48,7 +54,9 @@ def embed_cached(text: str):
 # -------------------------
 # Core logic
 # -------------------------
-def merge_or_create_topic(WSID: str, product_id: str, topic: str, review_id: str):
+def merge_or_create_topic(WSID: str, product_id: str, topic: str, review_id: str, duplicate_ids: list = None):
+    review_ids = [review_id] + list(duplicate_ids or [])
+
     topic = normalize_topic(topic)
     topic_embedding = embed_cached(topic_to_sentence(topic))
 
@@ -100,8 +108,8 @@ def merge_or_create_topic(WSID: str, product_id: str, topic: str, review_id: str
             topic_store.update_one(
                 {"_id": existing["_id"]},
                 {
-                    "$inc": {"count": 1},
-                    "$addToSet": {"review_ids": review_id}
+                    "$inc": {"count": len(review_ids)},
+                    "$addToSet": {"review_ids": {"$each": review_ids}}
                 }
             )
             return
@@ -112,6 +120,6 @@ def merge_or_create_topic(WSID: str, product_id: str, topic: str, review_id: str
         "product_id": product_id,
         "topic": topic,
         "embedding": topic_embedding,
-        "count": 1,
-        "review_ids": [review_id]
+        "count": len(review_ids),
+        "review_ids": review_ids
     })
@@ -1,11 +1,15 @@
-from components.vector_store import load_vector_store
-from components.database import processed_reviews
+from components.retriever import fetch_reviews
+from components.database import processed_reviews, topic_store, reviews_collection
 from components.topics.extractor import extract_topics
 from components.topics.merger import merge_or_create_topic
-from common.logger import get_logger
+from common.logger import get_logger, LogSampler
+from common.metrics import span
 
 logger = get_logger(__name__)
 
+# Per-review lines: a 15k-review sweep would otherwise log ~60k of them
+hot_log = LogSampler()
+
 MAX_PINECONE_K = 10000   # Pinecone hard limit
 QUERY_TEXT = "product reviews"
 
@@ -15,25 +19,15 @@ def process_new_reviews(
     product_id: str,
     total_limit: int = 15000
 ):
-    vectorstore = load_vector_store()
-
     remaining = total_limit
     seen_review_ids = set()
 
     while remaining > 0:
         batch_k = min(MAX_PINECONE_K, remaining)
 
-        retriever = vectorstore.as_retriever(
-            search_kwargs={
-                "k": batch_k,
-                "filter": {
-                    "WSID": str(WSID),           # case-sensitive
-                    "product_id": str(product_id)
-                }
-            }
-        )
-
-        docs = retriever.invoke(QUERY_TEXT)
+        # Filtered on WSID (case-sensitive) + product_id; text hydrated from Mongo
+        with span("retrieve"):
+            docs = fetch_reviews(QUERY_TEXT, WSID, product_id, k=batch_k, hybrid=False)
 
         # 🔍 DEBUG 1 — how many docs Pinecone returned
         # print("DEBUG docs fetched:", len(docs))
@@ -53,26 +47,37 @@ def process_new_reviews(
             or doc.id                       # Pinecone vector ID (BEST)
             )
 
-            # 🔍 DEBUG 2 — review id
-            print("DEBUG review_id:", review_id)
-
             if review_id in seen_review_ids:
-                print("DEBUG skipped (duplicate in same batch)")
                 continue
 
             seen_review_ids.add(review_id)
 
             if processed_reviews.find_one({"review_id": review_id}):
-                print("DEBUG skipped (already processed)")
                 continue
 
-            topics = extract_topics(review_text)
+            with span("topic_extract"):
+                topics = extract_topics(review_text)
+
+            if topics is None:
+                # LLM unavailable / rate limited: leave unprocessed for the next sweep
+                logger.warning(f"Topic extraction failed, will retry | review_id={review_id}")
+                continue
 
-            # 🔍 DEBUG 3 — topics extracted by LLM
-            print("DEBUG topics extracted:", topics)
+            if hot_log.allow(logger):
+                logger.debug("Topics extracted | review_id=%s | topics=%s", review_id, topics)
 
-            for topic in topics:
-                merge_or_create_topic(WSID, product_id, topic,review_id)
+            # Near-duplicates share the canonical review's topics
+            duplicate_ids = [
+                d["review_id"]
+                for d in reviews_collection.find(
+                    {"canonical_id": review_id, "is_canonical": False},
+                    {"_id": 0, "review_id": 1}
+                )
+            ]
+
+            with span("topic_merge"):
+                for topic in topics:
+                    merge_or_create_topic(WSID, product_id, topic,review_id, duplicate_ids)
 
             processed_reviews.insert_one({
                 "review_id": review_id,
@@ -86,3 +91,22 @@ def process_new_reviews(
             break
 
         remaining -= new_docs
+
+
+def get_top_topics(WSID: str, product_id: str, limit: int = 10):
+    return list(
+        topic_store.find(
+            {"wsid": WSID, "product_id": product_id},
+            {"_id": 0, "topic": 1, "count": 1}
+        )
+        .sort("count", -1)
+        .limit(limit)
+    )
+
+
+def refresh_top_topics(WSID: str, product_id: str, limit: int = 10):
+    """
+    Process any new reviews, then return the product's top topics.
+    """
+    process_new_reviews(WSID, product_id)
+    return get_top_topics(WSID, product_id, limit)
@@ -1,4 +1,10 @@
+import json
+import random
+import threading
+import time
+import uuid
 import warnings
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 from typing import List
 from pinecone import Pinecone  # type: ignore
 from langchain_core.embeddings import Embeddings
@@ -6,23 +12,105 @@ from langchain_pinecone import PineconeVectorStore # type: ignore
 from dotenv import load_dotenv
 from common.custom_exception import CustomException
 from common.logger import get_logger
-from config.config import PINECONE_API_KEY, PINECONE_INDEX_NAME
+from common.metrics import span
+from config.config import (
+    PINECONE_API_KEY,
+    PINECONE_INDEX_NAME,
+    UPSERT_MAX_VECTORS,
+    UPSERT_MAX_BYTES,
+    UPSERT_MAX_IN_FLIGHT,
+    UPSERT_MAX_RETRIES,
+    UPSERT_RETRY_BASE_SECONDS
+)
 # -------------------------------------------------------------------------------------------------
 
 import os
 load_dotenv()
 
+# Reads, writes and the index-creation script all use this one index
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-INDEX_NAME = "reviews"
+INDEX_NAME = os.getenv("PINECONE_INDEX") or PINECONE_INDEX_NAME
 
 pc = Pinecone(api_key=PINECONE_API_KEY)
 
+_index = None
+_index_pid = None
+_index_lock = threading.Lock()
+
+
 def get_index():
-    return pc.Index(INDEX_NAME)
+    """
+    One Index (and HTTP connection pool) per process, rebuilt in forked
+    workers rather than sharing the parent's sockets.
+    """
+    global _index, _index_pid
+
+    if _index is None or _index_pid != os.getpid():
+        with _index_lock:
+            if _index is None or _index_pid != os.getpid():
+                _index = pc.Index(INDEX_NAME)
+                _index_pid = os.getpid()
+    return _index
+
+
+def _vector_id(vector):
+    return vector["id"] if isinstance(vector, dict) else vector[0]
+
+
+def _vector_bytes(vector) -> int:
+    # Serialized size as sent over the REST API
+    return len(json.dumps(vector, default=str))
+
+
+def split_upsert_batches(vectors, max_vectors: int = UPSERT_MAX_VECTORS, max_bytes: int = UPSERT_MAX_BYTES):
+    """
+    Group vectors into batches under both the count and the payload size
+    cap. A single vector over `max_bytes` goes out on its own.
+    """
+    batch, size = [], 0
+    for vector in vectors:
+        vector_size = _vector_bytes(vector)
+        if batch and (len(batch) >= max_vectors or size + vector_size > max_bytes):
+            yield batch
+            batch, size = [], 0
+        batch.append(vector)
+        size += vector_size
+    if batch:
+        yield batch
+
+
+def _upsert_batch(index, batch_no: int, batch: list, namespace, max_retries: int) -> dict:
+    ack = {"batch": batch_no, "ids": [_vector_id(v) for v in batch], "ok": False, "attempts": 0, "error": None}
+    kwargs = {"namespace": namespace} if namespace else {}
+
+    for attempt in range(max_retries + 1):
+        ack["attempts"] = attempt + 1
+        try:
+            with span("pinecone_upsert"):
+                index.upsert(vectors=batch, **kwargs)
+            ack["ok"] = True
+            ack["error"] = None
+            return ack
+        except Exception as e:
+            ack["error"] = str(e)
+            if attempt < max_retries:
+                # Full jitter keeps retrying batches from bunching up
+                time.sleep(random.uniform(0, UPSERT_RETRY_BASE_SECONDS * 2 ** attempt))
+
+    logger.error(f"Upsert batch {batch_no} failed after {ack['attempts']} attempts | vectors={len(batch)} | {ack['error']}")
+    return ack
 
 
 # ✅ ADD THIS FUNCTION
-def upsert_vectors(vectors: list):
+def upsert_vectors(
+    vectors,
+    index=None,
+    namespace: str = None,
+    max_vectors: int = UPSERT_MAX_VECTORS,
+    max_bytes: int = UPSERT_MAX_BYTES,
+    max_in_flight: int = UPSERT_MAX_IN_FLIGHT,
+    max_retries: int = UPSERT_MAX_RETRIES
+):
     """
     vectors = [
         {
@@ -31,9 +119,39 @@ def upsert_vectors(vectors: list):
             "metadata": {...}
         }
     ]
+    (or (id, values, metadata) tuples; any iterable, consumed lazily)
+
+    Sends size-bounded batches with at most `max_in_flight` requests open,
+    retrying each failed batch on its own. Returns one ack per batch:
+    {"batch", "ids", "ok", "attempts", "error"}.
     """
-    index = get_index()
-    index.upsert(vectors)
+    index = index or get_index()
+    acks = []
+    in_flight = set()
+
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        for batch_no, batch in enumerate(split_upsert_batches(vectors, max_vectors, max_bytes)):
+            if len(in_flight) >= max_in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                acks.extend(f.result() for f in done)
+            in_flight.add(pool.submit(_upsert_batch, index, batch_no, batch, namespace, max_retries))
+
+        acks.extend(f.result() for f in in_flight)
+
+    acks.sort(key=lambda a: a["batch"])
+
+    failed = sum(1 for a in acks if not a["ok"])
+    logger.info(
+        f"Upserted vectors | batches={len(acks)} | vectors={sum(len(a['ids']) for a in acks)} | failed_batches={failed}"
+    )
+    return acks
+
+
+def acked_ids(acks: list) -> list:
+    """
+    Ids from the batches Pinecone accepted; only these should be marked embedded.
+    """
+    return [vector_id for ack in acks if ack["ok"] for vector_id in ack["ids"]]
 # ------------------------------------------------------------------------------------------------
 warnings.filterwarnings("ignore")
 logger = get_logger(__name__)
@@ -137,15 +255,11 @@ logger = get_logger(__name__)
 
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_pinecone import PineconeVectorStore # type: ignore
-from pinecone import Pinecone # type: ignore
 import os
 from common.logger import get_logger
 
 logger = get_logger(__name__)
 
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-INDEX_NAME = "reviews"
-
 
 def load_vector_store():
     """
@@ -158,11 +272,8 @@ def load_vector_store():
             model_name="sentence-transformers/all-MiniLM-L6-v2"
         )
 
-        pc = Pinecone(api_key=PINECONE_API_KEY)
-        index = pc.Index(INDEX_NAME)
-
         vectorstore = PineconeVectorStore(
-            index=index,
+            index=get_index(),
             embedding=embeddings,
             text_key="review_text"
         )
@@ -175,27 +286,71 @@ def load_vector_store():
         return None
 
 
-def save_vector_store(text_chunks):
+_shared_vector_store = None
+
+
+def get_vector_store():
+    """
+    Cached vector store so the embedding model and index handle
+    are created once per process instead of once per request.
+    """
+    global _shared_vector_store
+
+    if _shared_vector_store is None:
+        _shared_vector_store = load_vector_store()
+
+    return _shared_vector_store
+
+
+SAVE_BATCH_SIZE = 256
+
+
+def _batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def save_vector_store(text_chunks, batch_size: int = SAVE_BATCH_SIZE):
+    """
+    Embed chunks batch by batch and hand them to the upsert writer, so
+    uploads of one batch overlap embedding of the next. `text_chunks` may
+    be a list or a lazy iterable (e.g. csv_loader.iter_text_chunks).
+    """
     try:
-        if not text_chunks:
-            raise CustomException("No text chunks provided to save to vector store.")
-        
-        logger.info(f"Uploading documents to Pinecone index: {PINECONE_INDEX_NAME}")
+        logger.info(f"Uploading documents to Pinecone index: {INDEX_NAME}")
         # Use our custom embedding class
         embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
+        index = get_index()
+
+        def vectors():
+            total = 0
+            for batch in _batched(text_chunks, batch_size):
+                texts = [doc.page_content for doc in batch]
+                for doc, values in zip(batch, embeddings.embed_documents(texts)):
+                    # Same layout PineconeVectorStore.add_documents writes
+                    yield (str(uuid.uuid4()), values, {**doc.metadata, "review_text": doc.page_content})
+                total += len(batch)
+                logger.info(f"Embedded {total} chunks")
+
+        acks = upsert_vectors(vectors(), index=index)
+
+        if not acks:
+            raise CustomException("No text chunks provided to save to vector store.")
+
+        failed = [a for a in acks if not a["ok"]]
+        if failed:
+            raise CustomException(f"{len(failed)}/{len(acks)} upsert batches failed", failed[0]["error"])
 
-        db = PineconeVectorStore.from_documents(
-            documents=text_chunks,
-            embedding=embeddings,
-            index_name=PINECONE_INDEX_NAME,
-            pinecone_api_key=PINECONE_API_KEY,
-            text_key="review_text" 
-        )
-        
         logger.info("Successfully saved documents to Pinecone.")
-        return db
+        return PineconeVectorStore(index=index, embedding=embeddings, text_key="review_text")
 
     except Exception as e:
         error_message = CustomException("Failed to save to Pinecone vector store", e)
         logger.error(str(error_message), exc_info=True)
-        return None
\ No newline at end of file
+        return None
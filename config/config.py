@@ -4,12 +4,183 @@ HF_TOKEN = os.environ.get("HF_TOKEN")
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 GROQ_MODEL_NAME = "openai/gpt-oss-120b"
 EMBEDDING_MODEL_NAME = "BAAI/bge-large-en-v1.5"
+SENTENCE_MODEL_NAME = "all-MiniLM-L6-v2"
 
 PINECONE_MODEL_NAME = "pinecone/llama-text-embed-v2"
 PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY")
+# Default index; PINECONE_INDEX (environment or .env) overrides it
 PINECONE_INDEX_NAME = "reviews"
 
+# Pinecone upsert writer: batches are capped by count and by JSON payload
+# size (the API rejects requests over 2 MB)
+UPSERT_MAX_VECTORS = int(os.environ.get("UPSERT_MAX_VECTORS", 100))
+UPSERT_MAX_BYTES = int(os.environ.get("UPSERT_MAX_BYTES", 1_500_000))
+UPSERT_MAX_IN_FLIGHT = int(os.environ.get("UPSERT_MAX_IN_FLIGHT", 4))
+UPSERT_MAX_RETRIES = int(os.environ.get("UPSERT_MAX_RETRIES", 3))
+UPSERT_RETRY_BASE_SECONDS = float(os.environ.get("UPSERT_RETRY_BASE_SECONDS", 0.5))
+
+# "compact": review vectors carry filter fields + review_id and the text is
+# read back from Mongo after top-k; "full": text is also stored in metadata
+VECTOR_METADATA_MODE = os.environ.get("VECTOR_METADATA_MODE", "compact")
+REVIEW_TEXT_CACHE_SIZE = int(os.environ.get("REVIEW_TEXT_CACHE_SIZE", 5000))
+
+# Hybrid retrieval: BM25 over reviews + website passages fused with the
+# dense results by reciprocal rank fusion
+HYBRID_RETRIEVAL = os.environ.get("HYBRID_RETRIEVAL", "1") == "1"
+HYBRID_CANDIDATES = int(os.environ.get("HYBRID_CANDIDATES", 20))   # per ranker, before fusion
+RRF_K = int(os.environ.get("RRF_K", 60))
+BM25_K1 = float(os.environ.get("BM25_K1", 1.2))
+BM25_B = float(os.environ.get("BM25_B", 0.75))
+KEYWORD_INDEX_MAX_PRODUCTS = int(os.environ.get("KEYWORD_INDEX_MAX_PRODUCTS", 256))
+KEYWORD_INDEX_REFRESH_SECONDS = float(os.environ.get("KEYWORD_INDEX_REFRESH_SECONDS", 30))
+WEB_PASSAGE_CHARS = int(os.environ.get("WEB_PASSAGE_CHARS", 500))
+WEB_PASSAGES_K = int(os.environ.get("WEB_PASSAGES_K", 6))
+WEB_PASSAGE_TTL_HOURS = float(os.environ.get("WEB_PASSAGE_TTL_HOURS", 24))
+
+# Logging: JSON lines written by a background thread
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+# Per-logger overrides, e.g. "components.retriever=WARNING,components.topics=DEBUG"
+LOG_LEVELS = os.environ.get("LOG_LEVELS", "")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")   # "json" | "text"
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))   # records dropped when full
+LOG_MAX_MESSAGE_CHARS = int(os.environ.get("LOG_MAX_MESSAGE_CHARS", 2000))
+LOG_HOT_SAMPLE_RATE = float(os.environ.get("LOG_HOT_SAMPLE_RATE", 0.01))   # share of hot debug lines kept
+LOG_HOT_PER_SECOND = float(os.environ.get("LOG_HOT_PER_SECOND", 5))        # and at most this many per second
+
+# Prometheus metrics (/metrics on the app; the listener serves its own port)
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+LISTENER_METRICS_PORT = int(os.environ.get("LISTENER_METRICS_PORT", 9101))   # 0 = off
+
+# Per-request sampling profiler: on for requests carrying the admin token in
+# an X-Profile header, or for a random share of them
+PROFILE_ADMIN_TOKEN = os.environ.get("PROFILE_ADMIN_TOKEN", "")   # empty = no on-demand profiling
+PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+PROFILE_INTERVAL_MS = float(os.environ.get("PROFILE_INTERVAL_MS", 5))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 500))   # oldest profiles are deleted
+
+# Web server (gunicorn.conf.py; `python application.py` is the dev server)
+WEB_HOST = os.environ.get("WEB_HOST", "0.0.0.0")
+WEB_PORT = int(os.environ.get("WEB_PORT", 5000))
+WEB_WORKERS = int(os.environ.get("WEB_WORKERS", min(4, os.cpu_count() or 1)))
+WEB_THREADS = int(os.environ.get("WEB_THREADS", 8))        # request threads per worker
+WEB_TIMEOUT_SECONDS = int(os.environ.get("WEB_TIMEOUT_SECONDS", 120))
+WEB_MAX_REQUESTS = int(os.environ.get("WEB_MAX_REQUESTS", 0))   # recycle workers after N requests; 0 = never
+TORCH_NUM_THREADS = int(os.environ.get("TORCH_NUM_THREADS", 1))   # per process; workers x threads should fit the cores
+FLASK_SECRET_KEY = os.environ.get("FLASK_SECRET_KEY")
+FLASK_DEBUG = os.environ.get("FLASK_DEBUG", "0") == "1"
+
 DATA_PATH = "data/"
 CHUNK_SIZE = 750
 CHUNK_OVERLAP = 0
 TOP_K = 7
+
+# Query embedding micro-batcher
+EMBED_BATCH_SIZE = int(os.environ.get("EMBED_BATCH_SIZE", 32))
+EMBED_MAX_WAIT_MS = float(os.environ.get("EMBED_MAX_WAIT_MS", 5))
+
+# Multi-process backfill embedding pool
+EMBED_POOL_WORKERS = int(os.environ.get("EMBED_POOL_WORKERS", os.cpu_count() or 1))
+EMBED_POOL_SHARD_SIZE = int(os.environ.get("EMBED_POOL_SHARD_SIZE", 512))
+EMBED_POOL_BATCH_SIZE = int(os.environ.get("EMBED_POOL_BATCH_SIZE", 128))
+EMBED_POOL_TORCH_THREADS = int(os.environ.get("EMBED_POOL_TORCH_THREADS", 1))
+
+# Server-side chat sessions
+CHAT_SESSION_BACKEND = os.environ.get("CHAT_SESSION_BACKEND", "mongo")   # "mongo" | "memory"
+CHAT_SESSION_TTL_SECONDS = int(os.environ.get("CHAT_SESSION_TTL_SECONDS", 24 * 3600))
+CHAT_SESSION_MAX_SESSIONS = int(os.environ.get("CHAT_SESSION_MAX_SESSIONS", 10000))
+CHAT_SESSION_MAX_TURNS = int(os.environ.get("CHAT_SESSION_MAX_TURNS", 4))
+CHAT_SUMMARY_MAX_CHARS = int(os.environ.get("CHAT_SUMMARY_MAX_CHARS", 600))
+
+# Shared Groq client
+GROQ_TIMEOUT_SECONDS = float(os.environ.get("GROQ_TIMEOUT_SECONDS", 60))
+GROQ_MAX_CONNECTIONS = int(os.environ.get("GROQ_MAX_CONNECTIONS", 32))
+GROQ_KEEPALIVE_SECONDS = float(os.environ.get("GROQ_KEEPALIVE_SECONDS", 120))
+
+# Single-flight coalescing of identical requests
+SINGLEFLIGHT_LEASE_SECONDS = float(os.environ.get("SINGLEFLIGHT_LEASE_SECONDS", 120))
+SINGLEFLIGHT_RESULT_TTL_SECONDS = float(os.environ.get("SINGLEFLIGHT_RESULT_TTL_SECONDS", 5))
+SINGLEFLIGHT_POLL_SECONDS = float(os.environ.get("SINGLEFLIGHT_POLL_SECONDS", 0.2))
+TOPICS_LEASE_SECONDS = float(os.environ.get("TOPICS_LEASE_SECONDS", 900))   # /topics/top sweeps run long
+
+# Batch summaries (/ask/batch): items per request, summaries computed at once
+ASK_BATCH_MAX_ITEMS = int(os.environ.get("ASK_BATCH_MAX_ITEMS", 50))
+ASK_BATCH_CONCURRENCY = int(os.environ.get("ASK_BATCH_CONCURRENCY", 4))
+
+# Per-WSID admission control. Endpoint class -> (concurrent requests per
+# WSID, queued requests per WSID, max seconds a request may queue).
+# Limits are per deployment: under gunicorn each worker takes
+# ceil(limit / WEB_WORKERS), so a limit below the worker count becomes
+# one per worker
+ADMISSION_ENABLED = os.environ.get("ADMISSION_ENABLED", "1") == "1"
+ADMISSION_LIMITS = {
+    "interactive": (
+        int(os.environ.get("ADMIT_INTERACTIVE_CONCURRENCY", 8)),
+        int(os.environ.get("ADMIT_INTERACTIVE_QUEUE", 16)),
+        float(os.environ.get("ADMIT_INTERACTIVE_MAX_WAIT", 2.0))
+    ),
+    "heavy": (
+        int(os.environ.get("ADMIT_HEAVY_CONCURRENCY", 1)),
+        int(os.environ.get("ADMIT_HEAVY_QUEUE", 2)),
+        float(os.environ.get("ADMIT_HEAVY_MAX_WAIT", 0.5))
+    ),
+    "ingest": (
+        int(os.environ.get("ADMIT_INGEST_CONCURRENCY", 2)),
+        int(os.environ.get("ADMIT_INGEST_QUEUE", 8)),
+        float(os.environ.get("ADMIT_INGEST_MAX_WAIT", 1.0))
+    ),
+    "batch": (
+        int(os.environ.get("ADMIT_BATCH_CONCURRENCY", 2)),
+        int(os.environ.get("ADMIT_BATCH_QUEUE", 4)),
+        float(os.environ.get("ADMIT_BATCH_MAX_WAIT", 1.0))
+    )
+}
+ADMISSION_MAX_TRACKED_WSIDS = int(os.environ.get("ADMISSION_MAX_TRACKED_WSIDS", 1000))   # metric label cap
+
+# Shared LLM gateway (rate limits, retries, hedging). Budgets are for the
+# whole deployment; each gunicorn worker enforces 1/WEB_WORKERS of them
+LLM_MAX_RPS = float(os.environ.get("LLM_MAX_RPS", 5))
+LLM_MAX_TPM = float(os.environ.get("LLM_MAX_TPM", 60000))
+LLM_MAX_CONCURRENCY = int(os.environ.get("LLM_MAX_CONCURRENCY", 8))
+LLM_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 4))
+LLM_RETRY_BASE_SECONDS = float(os.environ.get("LLM_RETRY_BASE_SECONDS", 0.5))
+LLM_RETRY_MAX_SECONDS = float(os.environ.get("LLM_RETRY_MAX_SECONDS", 20))
+LLM_HEDGE_AFTER_SECONDS = float(os.environ.get("LLM_HEDGE_AFTER_SECONDS", 0))   # 0 = no hedging
+LLM_EST_OUTPUT_TOKENS = int(os.environ.get("LLM_EST_OUTPUT_TOKENS", 512))
+
+# Materialized product summaries
+DEFAULT_SUMMARY_QUESTIONS = {
+    "neutral": "What do customers say about this product?",
+    "positive": "What do customers like about this product?",
+    "negative": "What do customers dislike about this product?"
+}
+SUMMARY_REFRESH_MIN_NEW_REVIEWS = int(os.environ.get("SUMMARY_REFRESH_MIN_NEW_REVIEWS", 10))
+SUMMARY_MAX_AGE_HOURS = float(os.environ.get("SUMMARY_MAX_AGE_HOURS", 24))
+SUMMARY_REFRESH_INTERVAL_SECONDS = int(os.environ.get("SUMMARY_REFRESH_INTERVAL_SECONDS", 600))
+
+# Map-reduce summarization over a product's full review set
+MAP_REDUCE_MIN_REVIEWS = int(os.environ.get("MAP_REDUCE_MIN_REVIEWS", 50))
+MAP_GROUP_MAX_TOKENS = int(os.environ.get("MAP_GROUP_MAX_TOKENS", 3000))
+MAP_GROUP_MIN_TOKENS = int(os.environ.get("MAP_GROUP_MIN_TOKENS", 1000))
+MAP_CONCURRENCY = int(os.environ.get("MAP_CONCURRENCY", 4))
+REDUCE_MAX_TOKENS = int(os.environ.get("REDUCE_MAX_TOKENS", 6000))
+
+# Near-duplicate review detection (MinHash + LSH)
+DEDUP_JACCARD_THRESHOLD = float(os.environ.get("DEDUP_JACCARD_THRESHOLD", 0.8))
+
+# Chunked CSV → Mongo ingestion
+CSV_CHUNK_SIZE = int(os.environ.get("CSV_CHUNK_SIZE", 5000))
+
+# Parallel directory ingestion
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", min(4, os.cpu_count() or 1)))
+INGEST_EMBED_BATCH_SIZE = int(os.environ.get("INGEST_EMBED_BATCH_SIZE", 256))
+
+# Bulk review ingestion (/reviews/bulk): records per request, and the shared
+# write buffer that flushes one insert_many per batch or per wait window
+BULK_INGEST_MAX_RECORDS = int(os.environ.get("BULK_INGEST_MAX_RECORDS", 10000))
+WRITE_BUFFER_MAX_RECORDS = int(os.environ.get("WRITE_BUFFER_MAX_RECORDS", 1000))
+WRITE_BUFFER_MAX_WAIT_MS = float(os.environ.get("WRITE_BUFFER_MAX_WAIT_MS", 20))
+
+# Change-stream embedder: inserts are embedded and upserted in batches
+LISTENER_BATCH_SIZE = int(os.environ.get("LISTENER_BATCH_SIZE", 128))
+LISTENER_BATCH_WAIT_MS = int(os.environ.get("LISTENER_BATCH_WAIT_MS", 500))
@@ -0,0 +1,61 @@
+"""
+Production server:
+
+    gunicorn -c gunicorn.conf.py
+
+The app is imported once in the master (preload_app), so the MiniLM model,
+compiled chains and caches are loaded a single time and shared with the
+workers copy-on-write. Clients that hold sockets or threads are rebuilt in
+each worker (see common/runtime.py).
+"""
+import glob
+import os
+import tempfile
+
+from config.config import WEB_HOST, WEB_PORT, WEB_WORKERS, WEB_THREADS, WEB_TIMEOUT_SECONDS, WEB_MAX_REQUESTS
+
+# Must be set before prometheus_client is first imported (by the app).
+# Config reloads (HUP) find it already set and leave it alone.
+if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="review_metrics_")
+
+wsgi_app = "application:create_app()"
+bind = f"{WEB_HOST}:{WEB_PORT}"
+
+workers = WEB_WORKERS
+threads = WEB_THREADS
+worker_class = "gthread"
+timeout = WEB_TIMEOUT_SECONDS
+graceful_timeout = 30
+keepalive = 5
+
+max_requests = WEB_MAX_REQUESTS
+max_requests_jitter = WEB_MAX_REQUESTS // 10 if WEB_MAX_REQUESTS else 0
+
+preload_app = True
+
+
+def on_starting(server):
+    # Once per master start: drop metric files left by a previous run.
+    # Only *.db, since the directory may be operator-supplied
+    for path in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+        os.remove(path)
+
+
+def when_ready(server):
+    # The app is loaded; drop connections opened during import and freeze
+    # the heap before the first worker forks
+    from common.runtime import prepare_for_fork
+    prepare_for_fork()
+
+
+def post_fork(server, worker):
+    # LLM and admission budgets are per deployment; each worker takes its share
+    from common.runtime import apply_worker_share
+    apply_worker_share(server.cfg.workers)
+    server.log.info("Worker %s ready", worker.pid)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,41 @@
+import os
+import sys
+
+import mongomock
+import pymongo
+import pytest
+
+# Tests import the app packages (components, common, config) from the repo root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The Pinecone client is built at import and only needs a key to construct
+os.environ.setdefault("PINECONE_API_KEY", "test")
+
+# components.database connects and builds indexes at import; run it against
+# an in-memory client instead of a live server
+pymongo.MongoClient = mongomock.MongoClient
+
+
+class _BulkAsUpdates:
+    """
+    mongomock's bulk_write breaks on the UpdateOne of newer pymongo
+    releases; apply the updates one by one instead.
+    """
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        return getattr(self._collection, name)
+
+    def bulk_write(self, requests, ordered=True):
+        for op in requests:
+            self._collection.update_one(op._filter, op._doc, upsert=op._upsert)
+
+
+@pytest.fixture
+def mongo_collection():
+    """
+    Empty in-memory collection.
+    """
+    return _BulkAsUpdates(mongomock.MongoClient().db.test)
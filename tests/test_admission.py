@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from components.admission import AdmissionController, AdmissionRejected
+
+
+def controller(limit=1, queue=1, max_wait=0.2, enabled=True):
+    return AdmissionController(limits={"heavy": (limit, queue, max_wait)}, enabled=enabled)
+
+
+def acquire_in_thread(admission, wsid="W1"):
+    outcome = {}
+
+    def run():
+        try:
+            outcome["waited"] = admission.acquire("heavy", wsid)
+        except AdmissionRejected as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+
+def wait_for_queued(admission, count, wsid="W1"):
+    deadline = time.monotonic() + 2
+    while admission.metrics().get(("heavy", wsid), {}).get("queued", 0) < count:
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_admits_up_to_the_limit_without_waiting():
+    admission = controller(limit=2)
+
+    assert admission.acquire("heavy", "W1") == 0.0
+    assert admission.acquire("heavy", "W1") == 0.0
+    assert admission.metrics()[("heavy", "W1")]["active"] == 2
+
+
+def test_rejects_when_the_queue_is_full():
+    admission = controller(limit=1, queue=1, max_wait=2)
+    admission.acquire("heavy", "W1")
+    thread, _ = acquire_in_thread(admission)
+    wait_for_queued(admission, 1)
+
+    with pytest.raises(AdmissionRejected) as info:
+        admission.acquire("heavy", "W1")
+    assert info.value.reason == "queue full"
+    assert info.value.retry_after >= 1
+
+    admission.release("heavy", "W1")
+    thread.join()
+    assert admission.metrics()[("heavy", "W1")]["rejected_queue_full"] == 1
+
+
+def test_queued_request_gives_up_after_max_wait():
+    admission = controller(limit=1, queue=1, max_wait=0.05)
+    admission.acquire("heavy", "W1")
+
+    with pytest.raises(AdmissionRejected) as info:
+        admission.acquire("heavy", "W1")
+
+    assert info.value.reason == "queue wait exceeded"
+    assert admission.metrics()[("heavy", "W1")]["queued"] == 0
+
+
+def test_release_hands_the_slot_to_a_waiter():
+    admission = controller(limit=1, queue=1, max_wait=2)
+    admission.acquire("heavy", "W1")
+    thread, outcome = acquire_in_thread(admission)
+    wait_for_queued(admission, 1)
+
+    admission.release("heavy", "W1", held_seconds=0.1)
+    thread.join()
+
+    assert "error" not in outcome and outcome["waited"] > 0
+    assert admission.metrics()[("heavy", "W1")]["active"] == 1
+
+
+def test_stores_queue_independently():
+    admission = controller(limit=1, queue=0)
+    admission.acquire("heavy", "W1")
+
+    assert admission.acquire("heavy", "W2") == 0.0
+    with pytest.raises(AdmissionRejected):
+        admission.acquire("heavy", "W1")
+
+
+def test_run_releases_on_error_and_is_bypassed_when_disabled():
+    admission = controller()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        admission.run("heavy", "W1", fail)
+    assert admission.run("heavy", "W1", lambda: "ok") == "ok"
+    assert admission.metrics()[("heavy", "W1")]["active"] == 0
+
+    assert controller(enabled=False).run("heavy", "W1", lambda: "ok") == "ok"
+
+
+def test_worker_share_rounds_up_and_keeps_max_wait():
+    admission = AdmissionController(limits={"heavy": (1, 2, 0.5), "ingest": (4, 8, 1.0)})
+
+    admission.set_worker_share(3)
+
+    assert admission.limits == {"heavy": (1, 1, 0.5), "ingest": (2, 3, 1.0)}
+    assert admission.configured_limits["ingest"] == (4, 8, 1.0)
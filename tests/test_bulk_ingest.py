@@ -0,0 +1,109 @@
+import io
+import json
+
+import pytest
+
+from components.review_records import iter_ndjson, iter_json_array, validate_bulk_reviews
+
+
+def review(wsid, text="Great kettle"):
+    return {
+        "wsid": wsid,
+        "product_id": "6853.0",
+        "product_name": "Kettle",
+        "rating": "5",
+        "review_text": text
+    }
+
+
+def ndjson_body(*records):
+    return io.BytesIO("\n".join(json.dumps(r) for r in records).encode("utf-8"))
+
+
+def test_mixed_wsid_body_marks_foreign_records_invalid():
+    body = ndjson_body(review("store-a"), review("store-b"), review("Store-A"), review("store-a", "Loud"))
+
+    results = list(validate_bulk_reviews(iter_ndjson(body), "store-a"))
+
+    assert [index for index, _, _ in results] == [0, 1, 2, 3]
+    assert [error for _, _, error in results] == [
+        None, "wsid does not match ?wsid=", "wsid does not match ?wsid=", None
+    ]
+    assert results[1][1] is None
+    assert results[0][1]["product_id"] == "6853"
+    assert results[0][1]["rating"] == 5
+
+
+def test_missing_fields_and_bad_json_are_invalid():
+    body = io.BytesIO(b'{"wsid": "store-a"}\n\nnot json\n' + json.dumps(review("store-a")).encode("utf-8"))
+
+    results = list(validate_bulk_reviews(iter_ndjson(body), "store-a"))
+
+    assert [index for index, _, _ in results] == [0, 1, 2]
+    assert results[0][2] == "product_id is required"
+    assert results[1][2].startswith("invalid JSON")
+    assert results[2][2] is None
+
+
+def test_json_array_body_goes_through_the_same_checks():
+    body = io.BytesIO(json.dumps([review("store-a"), review("store-b")]).encode("utf-8"))
+
+    errors = [error for _, _, error in validate_bulk_reviews(iter_json_array(body), "store-a")]
+
+    assert errors == [None, "wsid does not match ?wsid="]
+
+
+
+# --------------------------------------------------
+# Streaming parsers
+# --------------------------------------------------
+def test_ndjson_skips_blank_lines_and_reports_bad_ones():
+    body = io.BytesIO(b'{"a": 1}\n\n   \n{"a": \n[1, 2]\n')
+
+    results = list(iter_ndjson(body))
+
+    assert [index for index, _, _ in results] == [0, 1, 2]
+    assert results[0] == (0, {"a": 1}, None)
+    assert results[1][1] is None and results[1][2].startswith("invalid JSON")
+    assert results[2] == (2, [1, 2], None)
+
+
+@pytest.mark.parametrize("chunk_bytes", [1, 2, 3, 7, 64 * 1024])
+def test_json_array_across_chunk_boundaries(chunk_bytes):
+    records = [{"text": "Café ☕ naïve"}, 12345, -0.5, 2.5e-07, "x", None, [1, {"b": True}], 678]
+    body = io.BytesIO(json.dumps(records, ensure_ascii=False).encode("utf-8"))
+
+    parsed = list(iter_json_array(body, chunk_bytes=chunk_bytes))
+
+    assert parsed == [(i, record, None) for i, record in enumerate(records)]
+
+
+@pytest.mark.parametrize("raw", [b"[]", b"  [ \n ]  ", b""])
+def test_json_array_empty(raw):
+    if raw:
+        assert list(iter_json_array(io.BytesIO(raw))) == []
+    else:
+        with pytest.raises(ValueError, match="unterminated"):
+            list(iter_json_array(io.BytesIO(raw)))
+
+
+@pytest.mark.parametrize("raw, message", [
+    (b'{"a": 1}', "expected a JSON array"),
+    (b'[{"a": 1} {"a": 2}]', "expected ','"),
+    (b'[{"a": 1}, {"a": ', "invalid JSON at element 1"),
+    (b'[{"a": 1}', "unterminated"),
+])
+def test_json_array_malformed(raw, message):
+    with pytest.raises(ValueError, match=message):
+        list(iter_json_array(io.BytesIO(raw), chunk_bytes=4))
+
+
+def test_json_array_yields_records_before_a_later_error():
+    body = io.BytesIO(b'[{"a": 1}, {"a": 2}, oops]')
+    parsed = []
+
+    with pytest.raises(ValueError):
+        for item in iter_json_array(body, chunk_bytes=4):
+            parsed.append(item)
+
+    assert parsed == [(0, {"a": 1}, None), (1, {"a": 2}, None)]
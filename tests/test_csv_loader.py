@@ -0,0 +1,46 @@
+from components.csv_loader import ENCODING_SAMPLE_BYTES, detect_encoding, iter_csv_chunks, iter_csv_documents
+
+HEADER = "WSID,product_id,product_name,rating,review_text\n"
+
+
+ROWS = 3000
+
+
+def write_export(tmp_path, tail_text):
+    # UTF-8 throughout the sampled head, a cp1252 byte further down
+    body = "".join(f"W1,{i},Kettle,5,Boils fast {i}\n" for i in range(ROWS)).encode("utf-8")
+    assert len(body) > ENCODING_SAMPLE_BYTES
+    path = tmp_path / "export.csv"
+    path.write_bytes(HEADER.encode("utf-8") + body + tail_text.encode("cp1252"))
+    return path
+
+
+def test_detect_encoding_from_sample(tmp_path):
+    path = tmp_path / "bom.csv"
+    path.write_bytes(b"\xef\xbb\xbf" + HEADER.encode("utf-8"))
+    assert detect_encoding(path) == "utf-8-sig"
+
+    path.write_bytes(HEADER.encode("utf-8") + "W1,1,Café,5,ok\n".encode("cp1252"))
+    assert detect_encoding(path) == "cp1252"
+
+
+def test_chunks_fall_back_past_the_sample_without_repeating_rows(tmp_path):
+    path = write_export(tmp_path, "W1,9999,Kettle,4,Café – quiet\n")
+    assert detect_encoding(path) == "utf-8"
+
+    chunks = list(iter_csv_chunks(path, chunksize=500))
+    rows = [row for chunk in chunks for row in chunk.to_dict("records")]
+
+    assert len(rows) == ROWS + 1
+    assert len({row["product_id"] for row in rows}) == ROWS + 1
+    assert rows[-1]["review_text"] == "Café – quiet"
+
+
+def test_documents_use_the_same_fallback(tmp_path):
+    path = write_export(tmp_path, "W1,9999,Kettle,4,Café\n")
+
+    docs = list(iter_csv_documents(path, ["review_text"], ["product_name"]))
+
+    assert len(docs) == ROWS + 1
+    assert docs[-1].page_content == "review_text: Café"
+    assert docs[-1].metadata["product_id"] == "9999"
@@ -0,0 +1,73 @@
+import mongomock
+
+from components.dedup import (
+    BANDS, NUM_PERM, NearDuplicateIndex, band_keys, minhash, shingles, similarity
+)
+
+KETTLE = "The kettle boils water in under two minutes and the handle stays cool to the touch"
+KETTLE_TYPO = "The kettle boils water in under two minutes and the handle stays cool to the touch!!"
+KETTLE_EDIT = "The kettle boils water in under two minutes and the handle stays cool to touch"
+TOASTER = "Toaster burns one side of the bread and the crumb tray does not come out"
+
+
+def review(review_id, text, wsid="W1", product_id="6853"):
+    return {"review_id": review_id, "wsid": wsid, "product_id": product_id, "review_text": text}
+
+
+def test_shingles():
+    assert shingles("A b, C d") == {"a b c", "b c d"}
+    assert shingles("Great!") == {"great"}
+    assert shingles("  ...  ") == set()
+
+
+def test_minhash_is_deterministic_and_sized():
+    signature = minhash(KETTLE)
+
+    assert signature == minhash(KETTLE.upper())
+    assert len(signature) == NUM_PERM
+    assert len(band_keys(signature)) == BANDS
+    assert minhash("!!!") is None
+
+
+def test_similarity_estimates_jaccard():
+    assert similarity(minhash(KETTLE), minhash(KETTLE_TYPO)) == 1.0
+    assert similarity(minhash(KETTLE), minhash(KETTLE_EDIT)) > 0.6
+    assert similarity(minhash(KETTLE), minhash(TOASTER)) < 0.2
+
+
+def test_assign_links_near_duplicates_within_a_batch():
+    index = NearDuplicateIndex(mongomock.MongoClient().db.near_dup_index, threshold=0.8)
+    records = [
+        review("a", KETTLE),
+        review("b", KETTLE_TYPO),
+        review("c", TOASTER),
+        review("d", KETTLE, product_id="7000")   # other product, own cluster
+    ]
+
+    assert index.assign(records) == {}
+
+    a, b, c, d = records
+    assert (a["is_canonical"], a["canonical_id"], a["duplicate_count"]) == (True, "a", 1)
+    assert (b["is_canonical"], b["canonical_id"]) == (False, "a")
+    assert (c["is_canonical"], c["duplicate_count"]) == (True, 0)
+    assert (d["is_canonical"], d["canonical_id"]) == (True, "d")
+
+
+def test_assign_reports_links_to_canonicals_stored_earlier():
+    collection = mongomock.MongoClient().db.near_dup_index
+    NearDuplicateIndex(collection).assign([review("a", KETTLE)])
+
+    # A fresh index (another import) finds the cluster through Mongo
+    records = [review("b", KETTLE_TYPO), review("c", KETTLE_TYPO + " ")]
+    links = NearDuplicateIndex(collection).assign(records)
+
+    assert links == {"a": ["b", "c"]}
+    assert all(r["canonical_id"] == "a" and r["is_canonical"] is False for r in records)
+
+
+def test_text_without_tokens_is_its_own_canonical():
+    records = [review("a", "!!!")]
+
+    NearDuplicateIndex(mongomock.MongoClient().db.near_dup_index).assign(records)
+
+    assert (records[0]["is_canonical"], records[0]["canonical_id"]) == (True, "a")
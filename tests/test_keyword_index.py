@@ -0,0 +1,31 @@
+from components import keyword_index as keyword_index_module
+from components.keyword_index import KeywordIndexStore
+
+
+PAGE_V1 = "Stainless steel kettle\n" + "x" * 900 + "\nDescaling guide for hard water"
+PAGE_V2 = "Stainless steel kettle"
+
+
+def test_passages_deleted_by_another_process_leave_its_cache(monkeypatch, mongo_collection):
+    monkeypatch.setattr(keyword_index_module, "KEYWORD_INDEX_REFRESH_SECONDS", 0)
+    writer, reader = KeywordIndexStore(mongo_collection), KeywordIndexStore(mongo_collection)
+
+    writer.index_web_passages("W1", "6853", "https://shop.example/kettle", PAGE_V1)
+    assert reader.search("W1", "6853", "descaling", kind="web")
+
+    # The page is re-scraped elsewhere; its descaling passage is gone
+    writer.index_web_passages("W1", "6853", "https://shop.example/kettle", PAGE_V2)
+
+    assert reader.search("W1", "6853", "descaling", kind="web") == []
+    assert reader.search("W1", "6853", "kettle", kind="web")
+
+
+def test_review_tail_reload_keeps_web_passages(monkeypatch, mongo_collection):
+    monkeypatch.setattr(keyword_index_module, "KEYWORD_INDEX_REFRESH_SECONDS", 0)
+    store = KeywordIndexStore(mongo_collection)
+
+    store.index_web_passages("W1", "6853", "https://shop.example/kettle", PAGE_V1)
+    store.index_reviews([{"wsid": "W1", "product_id": "6853", "review_id": "r1", "review_text": "Loud whistle"}])
+
+    assert [doc_id for doc_id, _ in store.search("W1", "6853", "whistle")] == ["r1"]
+    assert store.search("W1", "6853", "descaling", kind="web")
@@ -0,0 +1,146 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from components import llm_gateway as llm_gateway_module
+from components.llm_gateway import LLMGateway, PriorityGate, TokenBucket
+
+
+class RateLimited(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("rate limited")
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": retry_after})
+
+
+def failing(calls, retry_after):
+    def fn():
+        calls.append(1)
+        raise RateLimited(retry_after)
+    return fn
+
+
+def gateway(**kwargs):
+    return LLMGateway(max_rps=1000, max_tpm=10 ** 7, max_concurrency=2, **kwargs)
+
+
+def test_token_bucket_starts_full_then_refills():
+    bucket = TokenBucket(rate=100, capacity=2)
+
+    assert bucket.acquire(2) == 0.0
+    assert not bucket.try_acquire(1)
+
+    start = time.monotonic()
+    waited = bucket.acquire(1)
+    assert 0.005 <= waited and time.monotonic() - start < 0.5
+
+
+def test_token_bucket_caps_requests_at_capacity():
+    bucket = TokenBucket(rate=1000, capacity=5)
+
+    # Asking for more than the bucket can hold waits for a full bucket, not forever
+    assert bucket.acquire(50) == 0.0
+    assert not bucket.try_acquire(5)
+
+
+def test_token_bucket_refund():
+    bucket = TokenBucket(rate=0.001, capacity=3)
+    bucket.acquire(3)
+
+    bucket.refund(1)
+
+    assert bucket.try_acquire(1)
+    assert not bucket.try_acquire(1)
+
+
+def test_priority_gate_admits_by_priority_then_fifo():
+    gate = PriorityGate(limit=1)
+    gate.acquire(1)
+    order = []
+
+    def waiter(name, priority):
+        gate.acquire(priority)
+        order.append(name)
+        gate.release()
+
+    threads = []
+    for name, priority in [("background-1", 1), ("background-2", 1), ("interactive", 0)]:
+        thread = threading.Thread(target=waiter, args=(name, priority))
+        thread.start()
+        threads.append(thread)
+        # Queue them in a known order
+        deadline = time.monotonic() + 2
+        while len(gate._waiters) < len(threads):
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+
+    gate.release()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert order == ["interactive", "background-1", "background-2"]
+
+
+def test_priority_gate_limits_concurrency():
+    gate = PriorityGate(limit=2)
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def work():
+        gate.acquire(0)
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.01)
+        with lock:
+            active[0] -= 1
+        gate.release()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert peak[0] == 2
+
+
+def test_interactive_call_fails_fast_when_retry_after_is_over_budget(monkeypatch):
+    monkeypatch.setattr(llm_gateway_module, "LLM_RETRY_MAX_SECONDS", 5)
+    calls = []
+
+    with pytest.raises(RateLimited):
+        gateway(max_retries=3).call(failing(calls, "60"), priority="interactive")
+
+    assert len(calls) == 1
+
+
+def test_background_retry_after_is_capped(monkeypatch):
+    monkeypatch.setattr(llm_gateway_module, "LLM_RETRY_MAX_SECONDS", 5)
+    sleeps = []
+    monkeypatch.setattr(llm_gateway_module.time, "sleep", sleeps.append)
+    calls = []
+
+    with pytest.raises(RateLimited):
+        gateway(max_retries=2).call(failing(calls, "60"), priority="background")
+
+    assert len(calls) == 3
+    assert sleeps == [5, 5]
+
+
+def test_retry_after_within_budget_is_honoured(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(llm_gateway_module.time, "sleep", sleeps.append)
+    calls = []
+    fail_once = failing(calls, "0.25")
+
+    def fn():
+        if not calls:
+            fail_once()
+        return "ok"
+
+    assert gateway().call(fn, priority="interactive") == "ok"
+    assert sleeps == [0.25]
@@ -0,0 +1,45 @@
+from datetime import datetime, timedelta, timezone
+
+from components.summaries import materializer
+from components.summaries.materializer import needs_refresh
+
+
+def stored(review_count=100, age_hours=1, naive=False, summaries=True):
+    refreshed_at = datetime.now(timezone.utc) - timedelta(hours=age_hours)
+    if naive:
+        # As read back from Mongo
+        refreshed_at = refreshed_at.replace(tzinfo=None)
+    return {
+        "summaries": {"neutral": {"summary": "..."}} if summaries else {},
+        "review_count": review_count,
+        "refreshed_at": refreshed_at
+    }
+
+
+def test_missing_or_empty_summaries_need_a_refresh():
+    assert needs_refresh(None, 0)
+    assert needs_refresh(stored(summaries=False), 100)
+
+
+def test_enough_new_reviews_trigger_a_refresh(monkeypatch):
+    monkeypatch.setattr(materializer, "SUMMARY_REFRESH_MIN_NEW_REVIEWS", 10)
+
+    assert needs_refresh(stored(review_count=100), 110)
+    assert not needs_refresh(stored(review_count=100), 109)
+
+
+def test_old_summaries_refresh_only_when_the_product_changed(monkeypatch):
+    monkeypatch.setattr(materializer, "SUMMARY_REFRESH_MIN_NEW_REVIEWS", 10)
+    monkeypatch.setattr(materializer, "SUMMARY_MAX_AGE_HOURS", 24)
+
+    assert needs_refresh(stored(age_hours=30), 101)
+    assert needs_refresh(stored(age_hours=30, naive=True), 101)
+    assert not needs_refresh(stored(age_hours=30), 100)
+    assert not needs_refresh(stored(age_hours=2), 101)
+
+
+def test_missing_refresh_time_needs_a_refresh():
+    doc = stored()
+    doc["refreshed_at"] = None
+
+    assert needs_refresh(doc, 100)
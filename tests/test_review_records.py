@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from components.review_records import make_review_id, normalize_review_frame, prepare_review
+
+
+def posted_review(**overrides):
+    review = {
+        "wsid": "store-a",
+        "product_id": "6853.0",
+        "product_name": "Kettle",
+        "rating": "4",
+        "review_text": "Boils fast",
+        "reviewer_name": "Ana",
+        "review_date": "2024-05-01"
+    }
+    review.update(overrides)
+    return review
+
+
+def test_prepare_review_computes_the_content_addressed_id():
+    review = prepare_review(posted_review())
+
+    assert review["review_id"] == make_review_id("store-a", "6853", "Ana", "2024-05-01", "Boils fast")
+    assert review["product_id"] == "6853"
+    assert review["rating"] == 4
+    assert review["embedded"] is False
+
+
+def test_prepare_review_accepts_a_matching_client_id():
+    expected = make_review_id("store-a", "6853", "Ana", "2024-05-01", "Boils fast")
+
+    assert prepare_review(posted_review(review_id=expected))["review_id"] == expected
+
+
+def test_prepare_review_rejects_a_client_id_that_does_not_match():
+    with pytest.raises(ValueError, match="review_id"):
+        prepare_review(posted_review(review_id="my-own-id"))
+
+
+def test_make_review_id_ignores_whitespace_but_not_content():
+    base = make_review_id("W1", "6853", "Ana", "2024-05-01", "Boils fast")
+
+    assert make_review_id(" W1", "6853 ", "Ana", "2024-05-01", "Boils   fast\n") == base
+    assert make_review_id("W1", "6853", "Ana", "2024-05-01", "Boils slow") != base
+    assert make_review_id("W2", "6853", "Ana", "2024-05-01", "Boils fast") != base
+    assert make_review_id("W1", "6853", None, None, "x") == make_review_id("W1", "6853", "", "", "x")
+
+
+def test_normalize_review_frame():
+    df = pd.DataFrame({
+        "WSID": ["W1", "W1", "W2"],
+        "product_id": ["6853.0", " SKU-9 ", "12.5"],
+        "rating": ["5", "n/a", None],
+        "review_text": ["Boils fast", None, "Quiet"],
+        "reviewer_name": ["Ana", "Ben", None]
+    })
+
+    out = normalize_review_frame(df)
+
+    assert out["product_id"].tolist() == ["6853", "SKU-9", "12.5"]
+    assert out["rating"].tolist() == [5, 0, 0]
+    assert out["review_text"].tolist() == ["Boils fast", "", "Quiet"]
+    assert out["review_title"].tolist() == ["", "", ""]
+    assert not out["embedded"].any()
+    assert out["review_id"][0] == make_review_id("W1", "6853", "Ana", "", "Boils fast")
+    assert out["review_id"].is_unique
@@ -0,0 +1,17 @@
+from components.singleflight import normalize_key
+
+
+def test_question_is_case_folded_and_whitespace_collapsed():
+    assert normalize_key("ask", "W1", "6853", "neutral", question="  Is it   LOUD? ") == \
+        normalize_key("ask", "W1", "6853", "neutral", question="is it loud?")
+
+
+def test_identifiers_are_passed_through_unchanged():
+    assert normalize_key("ask", "Store-A", "SKU-1", "neutral", question="q") != \
+        normalize_key("ask", "store-a", "SKU-1", "neutral", question="q")
+    assert normalize_key("topics", "W1", "Ab C") == "topics|W1|Ab C"
+
+
+def test_missing_parts_and_no_question():
+    assert normalize_key("topics", None, 6853) == "topics||6853"
+    assert normalize_key("ask", "W1", "1", "neutral", question=None) == "ask|W1|1|neutral"
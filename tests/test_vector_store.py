@@ -0,0 +1,46 @@
+import json
+
+from components.vector_store import split_upsert_batches, acked_ids
+
+
+def vector(i, text_chars=10):
+    return (f"r{i}", [0.1] * 4, {"review_text": "x" * text_chars})
+
+
+def size(v):
+    return len(json.dumps(v))
+
+
+def test_batches_are_capped_by_count():
+    batches = list(split_upsert_batches([vector(i) for i in range(7)], max_vectors=3, max_bytes=10 ** 6))
+
+    assert [len(b) for b in batches] == [3, 3, 1]
+    assert [v[0] for b in batches for v in b] == [f"r{i}" for i in range(7)]
+
+
+def test_batches_are_capped_by_payload_size():
+    vectors = [vector(i, 100) for i in range(5)]
+    max_bytes = size(vectors[0]) * 2
+
+    batches = list(split_upsert_batches(vectors, max_vectors=100, max_bytes=max_bytes))
+
+    assert [len(b) for b in batches] == [2, 2, 1]
+    assert all(sum(size(v) for v in b) <= max_bytes for b in batches)
+
+
+def test_oversized_vector_goes_out_alone():
+    vectors = [vector(0), vector(1, 5000), vector(2)]
+
+    batches = list(split_upsert_batches(vectors, max_vectors=100, max_bytes=1000))
+
+    assert [[v[0] for v in b] for b in batches] == [["r0"], ["r1"], ["r2"]]
+
+
+def test_no_vectors_no_batches():
+    assert list(split_upsert_batches([])) == []
+
+
+def test_acked_ids_only_from_accepted_batches():
+    acks = [{"ok": True, "ids": ["a", "b"]}, {"ok": False, "ids": ["c"]}, {"ok": True, "ids": ["d"]}]
+
+    assert acked_ids(acks) == ["a", "b", "d"]